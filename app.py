@@ -2,6 +2,7 @@ import streamlit as st
 import utils
 import time
 import pandas as pd
+from furnicon import config
 
 # --- PAGE CONFIG ---
 st.set_page_config(
@@ -13,7 +14,7 @@ st.set_page_config(
 
 # --- INITIALIZE BACKEND ---
 utils.init_db()
-products = utils.get_all_products()
+total_products = utils.count_products()
 
 # --- ENTERPRISE CSS STYLING ---
 st.markdown("""
@@ -92,15 +93,22 @@ st.markdown("""
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    st.metric(label="Total SKUs", value=len(products))
+    st.metric(label="Total SKUs", value=total_products)
 
 with col2:
     # Determine Status based on client init
     status = "Active" if utils.client else "Disconnected"
+    if utils.client and config.MODEL_CLIENT != "live":
+        status = f"{status} ({config.MODEL_CLIENT})"
     st.metric(label="Gemini Engine", value=status)
 
 with col3:
-    st.metric(label="Asset Library", value=f"{len(products) * 4} Images")
+    # Billed model usage (furnicon.usage), not an estimate.
+    cost_per_sku = utils.cost_per_product()
+    st.metric(
+        label="Model Spend (Today)", value=f"${utils.spend_today():.2f}",
+        help=f"Average per published SKU: ${cost_per_sku:.3f}" if cost_per_sku is not None else None
+    )
 
 with col4:
     st.metric(label="System Version", value="v2.1 (Tier 1)")
@@ -133,17 +141,22 @@ with col_right:
 # --- RECENT DATA TABLE ---
 st.markdown("### Recent Inventory")
 
-if products:
+query = st.text_input("Search inventory", placeholder="Title, description, brand or spec")
+
+if query.strip():
+    _, recent_items = utils.search_products(query, page_size=20) # Best 20 matches
+else:
+    recent_items = utils.get_recent_products(5) if total_products else [] # Last 5 items, no image blobs
+
+if recent_items:
     # Transform data for a cleaner table view
-    recent_items = products[-5:] # Last 5 items
-    
     clean_data = []
     for p in recent_items:
         clean_data.append({
             "Product Name": p.get("title", "Untitled"),
             "Category": p.get("category", "Furniture"),
             "Price": f"${p.get('price', 0)}",
-            "Variations": len(p.get("variations", [])),
+            "Variations": p.get("variation_count", 0),
             "ID": p.get("id")
         })
     
@@ -159,5 +172,45 @@ if products:
         }
     )
 
+elif query.strip():
+    st.caption(f"No products match “{query.strip()}”.")
+else:
+    st.info("No inventory found. Initialize the database by adding products in the Admin Console.")
+
+# --- UNREADABLE SIZES ---
+# Products whose dimensions or seat sizes couldn't be parsed are missing
+# from the Storefront's size filters and sorts until re-published.
+unreadable = utils.unparsed_sizes()
+if unreadable:
+    with st.expander(f"⚠️ {len(unreadable)} products with unreadable sizes"):
+        st.dataframe(
+            pd.DataFrame([{
+                "ID": product_id,
+                "Product Name": title,
+                "Fields": ", ".join(f.replace("_str", "").replace("_", " ").title() for f in fields),
+            } for product_id, title, fields in unreadable]),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+# --- MODEL USAGE ---
+st.markdown("### Model Usage")
+
+usage_rows = utils.usage_totals()
+if usage_rows:
+    # "i2i" is image+text generation, "t2i" the text-only fallback.
+    st.dataframe(
+        pd.DataFrame([{
+            "Model": r["model"],
+            "Path": r["path"],
+            "Calls": r["calls"],
+            "Input Tokens": r["input_tokens"],
+            "Output Tokens": r["output_tokens"],
+            "Images": r["images"],
+            "Cost": f"${r['cost']:.3f}",
+        } for r in usage_rows]),
+        use_container_width=True,
+        hide_index=True,
+    )
 else:
-    st.info("No inventory found. Initialize the database by adding products in the Admin Console.")
\ No newline at end of file
+    st.caption("No model calls recorded yet.")
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Benchmark: near-duplicate lookups against index size.
+
+Fills furnicon.dedupe.HashIndex with N random 64-bit hashes, then times
+queries at DUPLICATE_MAX_DISTANCE for hashes with a planted near-duplicate
+(a few bits flipped) and for misses, against a pure-Python linear scan.
+Also times furnicon.imaging.phash_path on a 12 MP JPEG.
+
+    python benchmarks/bench_dedupe.py [--sizes 1000 10000 100000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_optimize_image import make_jpeg
+from furnicon import config
+from furnicon.dedupe import HashIndex
+from furnicon.imaging import phash_path
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def time_queries(fn, queries):
+    out = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        out.append((time.perf_counter() - start) * 1e6)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--distance", type=int, default=config.DUPLICATE_MAX_DISTANCE)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "photo.jpg")
+        make_jpeg(path, (4000, 3000))
+        phash_path(path)
+        start = time.perf_counter()
+        for _ in range(10):
+            phash_path(path)
+        print(f"phash_path, 4000x3000 JPEG: {(time.perf_counter() - start) / 10 * 1000:.1f} ms\n")
+
+    print(f"radius {args.distance}, microseconds per query")
+    print(f"{'hashes':>8} {'hit p50':>8} {'hit p99':>8} {'miss p50':>9} {'miss p99':>9} {'py scan p50':>12}")
+    for n in args.sizes:
+        index = HashIndex()
+        hashes = [rng.getrandbits(64) for _ in range(n)]
+        for i, h in enumerate(hashes):
+            index.add(i, h)
+
+        hits = []
+        for _ in range(args.queries):
+            h = rng.choice(hashes)
+            for bit in rng.sample(range(64), rng.randint(0, args.distance)):
+                h ^= 1 << bit
+            hits.append(h)
+        misses = [rng.getrandbits(64) for _ in range(args.queries)]
+
+        for q in hits[:50]:
+            assert index.query(q, args.distance), "planted near-duplicate not found"
+        hit = time_queries(lambda q: index.query(q, args.distance), hits)
+        miss = time_queries(lambda q: index.query(q, args.distance), misses)
+        scan = time_queries(
+            lambda q: [i for i, h in enumerate(hashes) if bin(h ^ q).count("1") <= args.distance],
+            misses[:max(1, min(args.queries, 2_000_000 // n))],
+        )
+        print(f"{n:>8} {percentile(hit, 0.5):>8.1f} {percentile(hit, 0.99):>8.1f} "
+              f"{percentile(miss, 0.5):>9.1f} {percentile(miss, 0.99):>9.1f} {percentile(scan, 0.5):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
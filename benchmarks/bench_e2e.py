@@ -0,0 +1,271 @@
+"""End-to-end benchmark: ingest -> generate -> publish -> storefront.
+
+Drives app.py, pages/Admin_Bot.py and pages/Storefront.py with Streamlit's
+AppTest harness against the offline fake model client
+(FURNICON_MODEL_CLIENT=fake). For each (catalog size, variation count)
+case, in a fresh subprocess with a throwaway data dir, it:
+
+  1. seeds the catalog with N products,
+  2. renders the dashboard once,
+  3. walks --products drafts through the Admin Bot (upload a photo,
+     answer with V custom angles, publish),
+  4. renders the Storefront --renders times.
+
+Per-stage latencies (optimize, analyze, generate, decode, publish,
+render), the wall time of every script rerun per page, and the peak RSS
+of the case are written as JSON. Pass --compare with an earlier results
+file to print the median deltas between the two runs.
+
+    python benchmarks/bench_e2e.py [--sizes 0 1000] [--variations 1 3 6] [--out bench_e2e.json]
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_optimize_image import make_jpeg, peak_rss_kb
+from bench_storefront import seed
+
+STAGES = ("optimize", "analyze", "generate", "decode", "publish", "render")
+
+
+# --- TIMING ---
+class Timings:
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def wrap(self, owner, attr, name):
+        fn = getattr(owner, attr)
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start)
+
+        setattr(owner, attr, timed)
+
+    def summary(self, names=None):
+        out = {}
+        for name in names or sorted(self.samples):
+            values = sorted(self.samples.get(name, []))
+            if not values:
+                out[name] = None
+                continue
+            out[name] = {
+                "count": len(values),
+                "median_ms": values[len(values) // 2] * 1000,
+                "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+                "max_ms": values[-1] * 1000,
+                "total_ms": sum(values) * 1000,
+            }
+        return out
+
+
+# --- ONE CASE (child process) ---
+def wait_for(at, status, reruns, poll, timeout):
+    # The job watchers are run_every fragments, which AppTest never fires;
+    # rerunning the script polls the job the same way.
+    deadline = time.monotonic() + timeout
+    while at.session_state["bot_status"] == status:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Admin Bot stuck in {status!r}")
+        time.sleep(poll)
+        rerun(at, reruns, "admin_bot")
+
+
+def rerun(at, timings, page, action=None):
+    start = time.perf_counter()
+    (action or at.run)()
+    timings.add(page, time.perf_counter() - start)
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].message}")
+
+
+def run_case(args, data_dir, catalog_size, variation_count):
+    from furnicon import config
+
+    # Model pacing would dominate an instant fake; lift it unless asked not to.
+    if args.rpm:
+        for limits in config.MODEL_LIMITS.values():
+            limits["rpm"] = args.rpm
+        config.DEFAULT_MODEL_LIMITS["rpm"] = args.rpm
+
+    os.chdir(ROOT)
+    from streamlit.testing.v1 import AppTest
+    import utils
+    from furnicon import imagepool, pipeline
+
+    stages, reruns = Timings(), Timings()
+    stages.wrap(pipeline.Pipeline, "optimized_image_bytes", "optimize")
+    stages.wrap(pipeline.Pipeline, "analyze", "analyze")
+    stages.wrap(pipeline.Pipeline, "generate_single_variation", "generate")
+    stages.wrap(pipeline, "save_inline_images", "decode")
+    stages.wrap(utils, "save_product_to_store", "publish")
+
+    def page(name):
+        return AppTest.from_file(os.path.join(ROOT, name), default_timeout=args.timeout)
+
+    # Spawning the image pool is a one-off per server process; keep it out
+    # of the first optimize sample and report it on its own.
+    start = time.perf_counter()
+    imagepool.run(os.getpid)
+    pool_start = time.perf_counter() - start
+
+    base_rss = peak_rss_kb()
+    started = time.perf_counter()
+
+    rerun(page("app.py"), reruns, "app")
+
+    angles = ", ".join(f"Angle {i + 1} of the product" for i in range(variation_count))
+    for n in range(args.products):
+        photo = os.path.join(data_dir, f"upload-{n}.jpg")
+        make_jpeg(photo, (args.photo_width, args.photo_width * 3 // 4), seed=n)
+        with open(photo, "rb") as f:
+            upload = (f"product-{n}.jpg", f.read(), "image/jpeg")
+
+        at = page("pages/Admin_Bot.py")
+        rerun(at, reruns, "admin_bot")
+        at.file_uploader[0].set_value(upload)
+        rerun(at, reruns, "admin_bot")
+        wait_for(at, "analyzing", reruns, args.poll, args.timeout)
+        at.chat_input[0].set_value(angles)
+        rerun(at, reruns, "admin_bot")
+        wait_for(at, "generating", reruns, args.poll, args.timeout)
+        publish = next(b for b in at.button if b.label.startswith("Publish"))
+        rerun(at, reruns, "admin_bot", publish.click().run)
+        if at.session_state["bot_status"] != "done":
+            raise RuntimeError(f"Publish did not finish (status {at.session_state['bot_status']!r})")
+
+    for _ in range(args.renders):
+        at = page("pages/Storefront.py")
+        start = time.perf_counter()
+        rerun(at, reruns, "storefront")
+        stages.add("render", time.perf_counter() - start)
+
+    return {
+        "catalog_size": catalog_size,
+        "variations": variation_count,
+        "products": args.products,
+        "wall_s": time.perf_counter() - started,
+        "image_pool_start_ms": pool_start * 1000,
+        "stages": stages.summary(STAGES),
+        "reruns": reruns.summary(),
+        "peak_rss_mb": peak_rss_kb() / 1024,
+        "peak_rss_delta_mb": (peak_rss_kb() - base_rss) / 1024,
+    }
+
+
+# --- DRIVER ---
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    # Median deltas per case, stage and page; positive is slower.
+    old_cases = {(c["catalog_size"], c["variations"]): c for c in old["cases"]}
+    print(f"\nvs {old.get('commit')} ({old.get('timestamp')})")
+    print(f"{'case':>12} {'metric':>22} {'old ms':>9} {'new ms':>9} {'delta':>8}")
+    for case in new["cases"]:
+        key = (case["catalog_size"], case["variations"])
+        prev = old_cases.get(key)
+        if prev is None:
+            continue
+        for group in ("stages", "reruns"):
+            for name, stats in case[group].items():
+                before = prev[group].get(name)
+                if not stats or not before or before["median_ms"] < 0.01:
+                    continue
+                delta = (stats["median_ms"] - before["median_ms"]) / before["median_ms"] * 100
+                print(f"{f'{key[0]}/{key[1]}':>12} {f'{group}.{name}':>22} "
+                      f"{before['median_ms']:>9.1f} {stats['median_ms']:>9.1f} {delta:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 1000])
+    parser.add_argument("--variations", type=int, nargs="+", default=[1, 3, 6])
+    parser.add_argument("--products", type=int, default=3, help="drafts published per case")
+    parser.add_argument("--renders", type=int, default=3, help="storefront renders per case")
+    parser.add_argument("--photo-width", type=int, default=4000, help="upload width in px (4:3)")
+    parser.add_argument("--latency-scale", type=float, default=0.0,
+                        help="FURNICON_FAKE_LATENCY_SCALE for the fake model (default: instant)")
+    parser.add_argument("--rpm", type=int, default=100000,
+                        help="model rate limit override; 0 keeps config.MODEL_LIMITS")
+    parser.add_argument("--poll", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--out", default="bench_e2e.json")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    parser.add_argument("--one", nargs=3, metavar=("DATA_DIR", "SIZE", "VARIATIONS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        data_dir, size, variations = args.one[0], int(args.one[1]), int(args.one[2])
+        print(json.dumps(run_case(args, data_dir, size, variations)))
+        return
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("one", "compare", "out")},
+        "cases": [],
+    }
+    print(f"{'catalog':>8} {'vars':>5} {'wall s':>7} {'analyze':>8} {'generate':>9} "
+          f"{'publish':>8} {'render':>7} {'RSS MB':>7}   (median ms)")
+    for size in args.sizes:
+        for variations in args.variations:
+            with tempfile.TemporaryDirectory() as tmp:
+                seed(tmp, size, variations)
+                env = {
+                    **os.environ,
+                    "FURNICON_DATA_DIR": tmp,
+                    "FURNICON_MODEL_CLIENT": "fake",
+                    "FURNICON_FAKE_LATENCY_SCALE": str(args.latency_scale),
+                    "FURNICON_SPECULATIVE_DEFAULTS": "0",
+                }
+                argv = [sys.executable, __file__, "--one", tmp, str(size), str(variations)]
+                for flag in ("products", "renders", "photo_width", "rpm", "poll", "timeout"):
+                    argv += [f"--{flag.replace('_', '-')}", str(getattr(args, flag))]
+                out = subprocess.run(argv, check=True, capture_output=True, text=True, env=env)
+                case = json.loads(out.stdout.strip().splitlines()[-1])
+                results["cases"].append(case)
+                median = lambda stage: (case["stages"][stage] or {}).get("median_ms", float("nan"))
+                print(f"{size:>8} {variations:>5} {case['wall_s']:>7.1f} {median('analyze'):>8.1f} "
+                      f"{median('generate'):>9.1f} {median('publish'):>8.1f} {median('render'):>7.1f} "
+                      f"{case['peak_rss_mb']:>7.0f}")
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
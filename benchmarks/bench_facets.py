@@ -0,0 +1,82 @@
+"""Benchmark: Storefront facet filtering against catalog size.
+
+Seeds a throwaway catalog with N fake-client listings (see bench_search.py)
+and times furnicon.facets.CatalogFacets: the cold build, then matching ids
+plus per-value counts for the other facets (disjunctive faceting) with 0-3
+facets selected. The same filter and counts done in SQL (WHERE ... IN and
+one GROUP BY per facet over the products table) are timed alongside.
+
+    python benchmarks/bench_facets.py [--sizes 1000 10000 100000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_search import make_product, median_ms
+from furnicon import config
+from furnicon.assets import AssetStore
+from furnicon.catalog import CatalogStore
+from furnicon.facets import CatalogFacets
+from furnicon.standin import FakeClient
+
+SELECTIONS = [
+    {},
+    {"colour": ["oak"]},
+    {"colour": ["oak", "walnut"], "category": ["stool"]},
+    {"colour": ["oak", "walnut"], "category": ["stool", "bench"], "leg_style": ["hairpin"]},
+]
+
+
+def sql_filter(catalog, filters):
+    # Matching ids and counts the way a query-per-render sidebar would.
+    def where(skip=None):
+        clauses, params = [], []
+        for facet, values in filters.items():
+            if facet != skip and values:
+                clauses.append(f"lower({facet}) IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    conn = catalog._connect()
+    sql, params = where()
+    ids = [r[0] for r in conn.execute(f"SELECT id FROM products{sql} ORDER BY id", params)]
+    counts = {}
+    for facet, _ in config.FACETS:
+        sql, params = where(skip=facet)
+        counts[facet] = dict(conn.execute(f"SELECT lower({facet}), COUNT(*) FROM products{sql} GROUP BY 1", params))
+    return ids, counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    fake = FakeClient(latency_scale=0)
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            catalog = CatalogStore(os.path.join(tmp, "catalog.db"), AssetStore(os.path.join(tmp, "assets")))
+            for i in range(n):
+                catalog.add(make_product(fake, rng, i))
+            index = CatalogFacets(catalog)
+            start = time.perf_counter()
+            index.refresh()
+            print(f"\n{n} products: cold build {time.perf_counter() - start:.2f} s")
+            print(f"{'facets':>7} {'matches':>8} {'bitmap ms':>10} {'sql ms':>7}")
+            for filters in SELECTIONS:
+                ids, _ = index.filter(filters)
+                assert ids.tolist() == sql_filter(catalog, filters)[0]
+                ours = median_ms(lambda: index.filter(filters), args.repeat)
+                theirs = median_ms(lambda: sql_filter(catalog, filters), max(3, args.repeat // 4))
+                print(f"{len(filters):>7} {len(ids):>8} {ours:>10.2f} {theirs:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark: batch image throughput against image pool size.
+
+Runs the per-photo CPU work of an ingest -- the model payload
+(optimize_path), the display derivative ladder (derivative_ladder) and
+validation of a PNG model output (decode_model_image) -- over a batch of
+synthetic photos, with furnicon.imagepool configured for 0 (inline, no
+pool), 1, 2, ... workers. Pool start-up is excluded from the timings.
+
+    python benchmarks/bench_image_pool.py [--images 24] [--megapixels 12] [--max-workers N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from bench_optimize_image import make_jpeg
+from furnicon import config, imagepool
+from furnicon.derivatives import derivative_format
+from furnicon.imaging import decode_model_image, derivative_ladder, optimize_path
+
+
+def model_png(path):
+    # Stand-in for a generated variation: a 1024 px PNG.
+    with Image.open(path) as image:
+        image.thumbnail((1024, 1024))
+        buf = BytesIO()
+        image.save(buf, "PNG")
+        return buf.getvalue()
+
+
+def run_batch(paths, pngs):
+    fmt, _ = derivative_format()
+    futures = []
+    for path, png in zip(paths, pngs):
+        futures.append(imagepool.submit(optimize_path, path))
+        futures.append(imagepool.submit(derivative_ladder, path, config.DERIVATIVE_WIDTHS, fmt, config.DERIVATIVE_QUALITY))
+        futures.append(imagepool.submit(decode_model_image, png))
+    for future in futures:
+        future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    w = int((args.megapixels * 1e6 * 4 / 3) ** 0.5)
+    size = (w, w * 3 // 4)
+    counts = [0] + sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i < args.max_workers], args.max_workers})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.images):
+            path = os.path.join(tmp, f"{i}.jpg")
+            make_jpeg(path, size, i)
+            paths.append(path)
+        pngs = [model_png(p) for p in paths]
+
+        print(f"{args.images} photos at {size[0]}x{size[1]}, {os.cpu_count()} CPU(s)")
+        print(f"{'workers':>8} {'seconds':>8} {'images/s':>9} {'speedup':>8}")
+        baseline = None
+        for n in counts:
+            imagepool.configure(n)
+            for f in [imagepool.submit(os.getpid) for _ in range(2 * n)]:
+                f.result()
+            start = time.perf_counter()
+            run_batch(paths, pngs)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            label = "inline" if n == 0 else str(n)
+            print(f"{label:>8} {elapsed:>8.2f} {args.images / elapsed:>9.2f} {baseline / elapsed:>7.2f}x")
+        imagepool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
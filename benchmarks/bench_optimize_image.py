@@ -0,0 +1,115 @@
+"""Micro-benchmark: optimize_image before/after draft-mode decoding.
+
+Compares the original copy() + thumbnail() path against
+furnicon.imaging.optimize_image_file on synthetic JPEG uploads. Each
+measurement runs in a fresh subprocess so peak RSS is not polluted by
+earlier runs.
+
+    python benchmarks/bench_optimize_image.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from furnicon.imaging import optimize_image_file, optimize_path
+
+SIZES = {
+    "2MP": (1600, 1200),
+    "12MP": (4000, 3000),
+    "24MP": (6000, 4000),
+}
+
+
+def legacy_optimize(path):
+    # utils.optimize_image as it was before memoization / draft decoding.
+    image = Image.open(path)
+    img_copy = image.copy()
+    img_copy.thumbnail((1024, 1024))
+    if img_copy.mode in ("RGBA", "P"):
+        img_copy = img_copy.convert("RGB")
+    img_byte_arr = BytesIO()
+    img_copy.save(img_byte_arr, format='JPEG', quality=85)
+    return img_byte_arr.getvalue()
+
+
+def make_jpeg(path, size, seed=0):
+    # Smooth gradients plus noise: compresses like a real photo, not a flat fill.
+    w, h = size
+    x = np.linspace(0, 255, w, dtype=np.float32)
+    y = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+    rng = np.random.default_rng(seed)
+    rgb = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    rgb += rng.normal(0, 12, rgb.shape).astype(np.float32)
+    Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8)).save(path, "JPEG", quality=90)
+
+
+def peak_rss_kb():
+    # VmHWM starts fresh at exec; ru_maxrss is inherited from the parent on
+    # Linux, which would hide the child's own peak behind ours.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_one(method, path, repeat):
+    fn = legacy_optimize if method == "legacy" else optimize_path
+    base_rss = peak_rss_kb()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(path)
+        timings.append(time.perf_counter() - start)
+    peak_rss = peak_rss_kb()
+    print(json.dumps({
+        "median_ms": sorted(timings)[len(timings) // 2] * 1000,
+        "peak_rss_delta_mb": (peak_rss - base_rss) / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--one", nargs=2, metavar=("METHOD", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        run_one(args.one[0], args.one[1], args.repeat)
+        return
+
+    # Memoized calls are a dict lookup; shown separately from the cold cost.
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'upload':>6} {'method':>8} {'median ms':>10} {'peak RSS MB':>12}")
+        for label, size in SIZES.items():
+            path = os.path.join(tmp, f"{label}.jpg")
+            make_jpeg(path, size)
+            for method in ("legacy", "draft"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--repeat", str(args.repeat), "--one", method, path],
+                    check=True, capture_output=True, text=True,
+                )
+                result = json.loads(out.stdout)
+                print(f"{label:>6} {method:>8} {result['median_ms']:>10.1f} {result['peak_rss_delta_mb']:>12.1f}")
+            optimize_image_file(path)
+            start = time.perf_counter()
+            optimize_image_file(path)
+            print(f"{label:>6} {'memo':>8} {(time.perf_counter() - start) * 1000:>10.3f} {'-':>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark: Storefront price/size range filters and sorts against catalog size.
+
+Seeds a throwaway catalog with N fake-client listings (see bench_search.py,
+sizes parsed from their "LxWxH cm" text at publish) and times
+furnicon.dimensions.CatalogRanges: the cold build, catch-up after one
+publish, range filters and first-page sorts over every product or a
+range-filtered subset. The same queries in SQL are timed alongside, on
+the bare table and with a B-tree index per column.
+
+    python benchmarks/bench_ranges.py [--sizes 1000 10000 100000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_search import make_product, median_ms
+from furnicon.assets import AssetStore
+from furnicon.catalog import CatalogStore
+from furnicon.dimensions import CatalogRanges
+from furnicon.standin import FakeClient
+
+QUERIES = [
+    ("width <= 60", {"width_cm": (None, 60)}, None),
+    ("price 100-200, height >= 90", {"price": (100, 200), "height_cm": (90, None)}, None),
+    ("sort by price", {}, ("price", False)),
+    ("width <= 60, sort by height desc", {"width_cm": (None, 60)}, ("height_cm", True)),
+]
+
+
+def sql_query(catalog, ranges, sort, limit=20):
+    # Matching ids (or the first page, when sorted) the way a query per render would.
+    clauses, params = [], []
+    for column, (low, high) in ranges.items():
+        if low is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(low)
+        if high is not None:
+            clauses.append(f"{column} <= ?")
+            params.append(high)
+    sql = "SELECT id FROM products" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+    if sort:
+        sql += f" ORDER BY {sort[0]} IS NULL, {sort[0]} {'DESC' if sort[1] else 'ASC'}, id LIMIT {limit}"
+    else:
+        sql += " ORDER BY id"
+    return [r[0] for r in catalog._connect().execute(sql, params)]
+
+
+def ours(index, ranges, sort, all_ids, limit=20):
+    ids = index.within(ranges)
+    ids = all_ids if ids is None else ids
+    return index.order(sort[0], ids, sort[1])[:limit] if sort else ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    fake = FakeClient(latency_scale=0)
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            catalog = CatalogStore(os.path.join(tmp, "catalog.db"), AssetStore(os.path.join(tmp, "assets")))
+            for i in range(n):
+                catalog.add(make_product(fake, rng, i))
+            index = CatalogRanges(catalog)
+            start = time.perf_counter()
+            index.refresh()
+            build_s = time.perf_counter() - start
+            publishes = []
+            for i in range(n, n + 50):
+                catalog.add(make_product(fake, rng, i))
+                start = time.perf_counter()
+                index.refresh()
+                publishes.append((time.perf_counter() - start) * 1000)
+            all_ids = np.array(sql_query(catalog, {}, None), dtype=np.int64)
+
+            rows = []
+            for label, ranges, sort in QUERIES:
+                got = ours(index, ranges, sort, all_ids)
+                assert got.tolist() == sql_query(catalog, ranges, sort), label
+                rows.append([label, len(index.within(ranges) if ranges else all_ids),
+                             median_ms(lambda: ours(index, ranges, sort, all_ids), args.repeat),
+                             median_ms(lambda: sql_query(catalog, ranges, sort), max(3, args.repeat // 4))])
+            conn = catalog._connect()
+            for column in ("price", "width_cm", "height_cm"):
+                conn.execute(f"CREATE INDEX bench_{column} ON products({column})")
+            conn.execute("ANALYZE")
+            for row, (_, ranges, sort) in zip(rows, QUERIES):
+                row.append(median_ms(lambda: sql_query(catalog, ranges, sort), max(3, args.repeat // 4)))
+
+            print(f"\n{n} products: cold build {build_s:.2f} s, "
+                  f"catch-up after one publish {sorted(publishes)[len(publishes) // 2]:.2f} ms")
+            print(f"{'query':>34} {'matches':>8} {'index ms':>9} {'sql ms':>7} {'sql+idx ms':>11}")
+            for label, matches, index_ms, sql_ms, sql_idx_ms in rows:
+                print(f"{label:>34} {matches:>8} {index_ms:>9.2f} {sql_ms:>7.2f} {sql_idx_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark: catalog full-text search against catalog size.
+
+Seeds a throwaway catalog with N products whose listings come from the fake
+model client (a small furniture vocabulary, so common words match a fifth
+of the catalog or more: a worst case for ranking) plus one rare SKU word
+each. Times the cold build of furnicon.search.CatalogSearch, single-product
+catch-up after a publish, and first-page queries for type-ahead prefixes,
+full words, multi-word and rare-word queries, next to SQLite FTS5 ordering
+by bm25() over the same text.
+
+    python benchmarks/bench_search.py [--sizes 1000 10000 100000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from furnicon.assets import AssetStore
+from furnicon.catalog import CatalogStore
+from furnicon.search import CatalogSearch, parse_query
+from furnicon.standin import FakeClient
+
+QUERIES = ["o", "oa", "oak", "oak s", "oak side t", "mid-century walnut", "hairpin stool", "sku4711"]
+
+
+def make_product(fake, rng, i):
+    product = fake._analysis([rng.randbytes(16)])
+    product["description"] += f" Model sku{i}."
+    product["price"] = rng.randint(50, 900)
+    return product
+
+
+def fts5_baseline(catalog):
+    # The same five search fields in an FTS5 table, ranked by weighted bm25().
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE VIRTUAL TABLE s USING fts5(title, brand, category, description, specs, prefix='1 2 3')")
+    conn.executemany(
+        "INSERT INTO s (rowid, title, brand, category, description, specs) VALUES (?, ?, ?, ?, ?, ?)",
+        [(product_id, *fields) for _, product_id, fields in catalog.changed_products()],
+    )
+    return conn
+
+
+def fts5_query(text):
+    terms = [f'"{t}"*' if prefix else f'"{t}"' for t, prefix in parse_query(text)]
+    return " ".join(terms)
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return sorted(times)[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    fake = FakeClient(latency_scale=0)
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            catalog = CatalogStore(os.path.join(tmp, "catalog.db"), AssetStore(os.path.join(tmp, "assets")))
+            for i in range(n):
+                catalog.add(make_product(fake, rng, i))
+
+            index = CatalogSearch(catalog)
+            start = time.perf_counter()
+            index.search("warm")
+            build_s = time.perf_counter() - start
+            publishes = []
+            for i in range(n, n + 50):
+                catalog.add(make_product(fake, rng, i))
+                start = time.perf_counter()
+                index.search("warm")
+                publishes.append((time.perf_counter() - start) * 1000)
+            fts = fts5_baseline(catalog)
+
+            print(f"\n{n} products: cold build {build_s:.2f} s, "
+                  f"query after one publish {sorted(publishes)[len(publishes) // 2]:.2f} ms")
+            print(f"{'query':>20} {'matches':>8} {'index ms':>9} {'fts5 ms':>8}")
+            for q in QUERIES:
+                matches = index.search(q)[0]
+                ours = median_ms(lambda: index.search(q), args.repeat)
+                sql = "SELECT rowid FROM s WHERE s MATCH ? ORDER BY bm25(s, 3, 2, 2, 1, 1.5) LIMIT 20"
+                theirs = median_ms(lambda: fts.execute(sql, (fts5_query(q),)).fetchall(), max(3, args.repeat // 4))
+                print(f"{q!r:>20} {matches:>8} {ours:>9.2f} {theirs:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
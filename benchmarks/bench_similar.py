@@ -0,0 +1,90 @@
+"""Benchmark: "more like this" queries against catalog size.
+
+Fills furnicon.similar.VectorIndex with N clustered unit vectors (real
+catalogs cluster by category and colour; uniform random vectors would make
+any IVF look bad) and times top-k queries by brute force and, once trained,
+through the IVF lists, with IVF recall against the exact answer. Also times
+incremental add() and furnicon.imaging.visual_features_path on a 12 MP JPEG.
+
+    python benchmarks/bench_similar.py [--sizes 1000 10000 100000] [--queries 500]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_optimize_image import make_jpeg
+from furnicon import config
+from furnicon.imaging import FEATURE_DIM, visual_features_path
+from furnicon.similar import VectorIndex
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def clustered(rng, n, clusters=500, spread=0.35):
+    centres = rng.standard_normal((clusters, FEATURE_DIM)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + spread * rng.standard_normal((n, FEATURE_DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def time_queries(index, vectors, picks, k):
+    out, results = [], []
+    for i in picks:
+        start = time.perf_counter()
+        results.append(index.query(vectors[i], k, exclude=int(i)))
+        out.append((time.perf_counter() - start) * 1000)
+    return out, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=config.SIMILAR_COUNT)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "photo.jpg")
+        make_jpeg(path, (4000, 3000))
+        visual_features_path(path)
+        start = time.perf_counter()
+        for _ in range(10):
+            visual_features_path(path)
+        print(f"visual_features_path, 4000x3000 JPEG: {(time.perf_counter() - start) / 10 * 1000:.1f} ms\n")
+
+    print(f"top-{args.k}, milliseconds per query; nprobe {config.SIMILAR_NPROBE}")
+    print(f"{'vectors':>8} {'add us':>7} {'brute p50':>10} {'brute p99':>10} "
+          f"{'train s':>8} {'ivf p50':>8} {'ivf p99':>8} {'recall':>7}")
+    for n in args.sizes:
+        vectors = clustered(rng, n)
+        index = VectorIndex(ivf_min=n + 1)  # no background training while filling
+        start = time.perf_counter()
+        for i, v in enumerate(vectors):
+            index.add(i, v)
+        add_us = (time.perf_counter() - start) / n * 1e6
+
+        picks = rng.integers(0, n, args.queries)
+        brute, exact = time_queries(index, vectors, picks, args.k)
+
+        start = time.perf_counter()
+        index.train()
+        train_s = time.perf_counter() - start
+        ivf, approx = time_queries(index, vectors, picks, args.k)
+        found = sum(len({i for _, i in a} & {i for _, i in e}) for a, e in zip(approx, exact))
+        recall = found / max(1, sum(len(e) for e in exact))
+
+        print(f"{n:>8} {add_us:>7.1f} {percentile(brute, 0.5):>10.2f} {percentile(brute, 0.99):>10.2f} "
+              f"{train_s:>8.2f} {percentile(ivf, 0.5):>8.2f} {percentile(ivf, 0.99):>8.2f} {recall:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
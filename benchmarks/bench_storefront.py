@@ -0,0 +1,151 @@
+"""Benchmark: Storefront render time against catalog size.
+
+Seeds a throwaway catalog with N products (one source image and three
+variations each, all sharing the same small assets) and times a full
+script run of pages/Storefront.py with Streamlit's AppTest harness. The
+pre-pagination page, which rendered every product on every rerun, is
+timed too for catalogs up to --legacy-max products. Each measurement
+runs in a fresh subprocess so st.cache_resource stores and the catalog
+connection start cold.
+
+    python benchmarks/bench_storefront.py [--sizes 10 1000 50000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image
+
+from furnicon.assets import AssetStore
+from furnicon.catalog import CatalogStore
+
+# The Storefront as it was before pagination and per-card fragments.
+LEGACY_STOREFRONT = '''
+import streamlit as st
+import utils
+import pandas as pd
+
+st.set_page_config(page_title="Furnicon Store", page_icon="🛍️", layout="wide")
+st.title("🛍️ Furnicon")
+st.markdown("---")
+
+products = utils.get_all_products()
+
+if not products:
+    st.info("Inventory Empty.")
+else:
+    for item in products:
+        col_img, col_info = st.columns([0.4, 0.6])
+        with col_img:
+            variations = item.get("variations", [])
+            tab_labels = ["Front"] + [f"View {i+1}" for i in range(len(variations))]
+            tabs = st.tabs(tab_labels)
+            with tabs[0]:
+                if item.get("image_id"): st.image(utils.asset_path(item["image_id"]), use_container_width=True)
+            for i, var_id in enumerate(variations):
+                with tabs[i+1]: st.image(utils.asset_path(var_id), use_container_width=True)
+        with col_info:
+            st.subheader(item.get("title", "Product"))
+            st.caption(f"Brand: {item.get('brand', 'Generic')}")
+            c1, c2 = st.columns([0.3, 0.7])
+            c1.markdown(f"## ${item.get('price', 0)}")
+            c2.button("Add to Cart", key=f"btn_{item['id']}")
+            st.write(item.get("description", ""))
+            st.markdown("### Technical Details")
+            spec_data = {
+                "Colour": item.get("colour"),
+                "Frame Material": item.get("frame_material"),
+                "Style": item.get("style"),
+                "Finish": item.get("furniture_finish"),
+                "Seat Height": item.get("seat_height"),
+                "Seat Width": item.get("seat_width"),
+                "Leg Style": item.get("leg_style"),
+                "Dimensions": item.get("dimensions_str")
+            }
+            clean_specs = {k: v for k, v in spec_data.items() if v}
+            st.table(pd.DataFrame(list(clean_specs.items()), columns=["Feature", "Details"]))
+        st.markdown("---")
+'''
+
+
+def make_png(color):
+    buf = BytesIO()
+    Image.new("RGB", (64, 64), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def seed(data_dir, n, variation_count=3):
+    # Same layout as furnicon.config under FURNICON_DATA_DIR=data_dir.
+    assets = AssetStore(os.path.join(data_dir, "assets"))
+    catalog = CatalogStore(os.path.join(data_dir, "catalog.db"), assets)
+    source = assets.put(make_png("white"))
+    variations = [assets.put(make_png((40 * i % 256, 90, 160))) for i in range(1, variation_count + 1)]
+    for i in range(n):
+        catalog.add({
+            "title": f"Oak Dining Chair {i}", "description": "Solid oak frame. Linen seat. Tapered legs.",
+            "brand": "Furnicon", "category": "Chair", "colour": "Natural", "frame_material": "Oak",
+            "style": "Scandinavian", "furniture_finish": "Oiled", "seat_height": "46 cm",
+            "seat_width": "44 cm", "leg_style": "Tapered", "dimensions_str": "50x52x80 cm",
+            "price": 299.99, "stock": 50, "image_id": source, "variations": variations,
+        })
+
+
+def run_one(page, data_dir, repeat):
+    os.environ["FURNICON_DATA_DIR"] = data_dir
+    os.chdir(ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    timings = []
+    for _ in range(repeat):
+        if page == "legacy":
+            at = AppTest.from_string(LEGACY_STOREFRONT, default_timeout=600)
+        else:
+            at = AppTest.from_file(os.path.join(ROOT, "pages", "Storefront.py"), default_timeout=600)
+        at.secrets["GOOGLE_API_KEY"] = "benchmark"
+        start = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    print(json.dumps({"median_ms": sorted(timings)[len(timings) // 2] * 1000}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-max", type=int, default=1000,
+                        help="skip the legacy page above this many products (default: %(default)s)")
+    parser.add_argument("--one", nargs=2, metavar=("PAGE", "DATA_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        run_one(args.one[0], args.one[1], args.repeat)
+        return
+
+    print(f"{'products':>9} {'page':>10} {'median ms':>10}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            seed(tmp, n)
+            for page in ("legacy", "paginated"):
+                if page == "legacy" and n > args.legacy_max:
+                    print(f"{n:>9} {page:>10} {'skipped':>10}")
+                    continue
+                out = subprocess.run(
+                    [sys.executable, __file__, "--repeat", str(args.repeat), "--one", page, tmp],
+                    check=True, capture_output=True, text=True,
+                )
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{n:>9} {page:>10} {result['median_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""Load harness: concurrent simulated admins and shoppers against a live server.
+
+Speaks Streamlit's websocket protocol (the same BackMsg/ForwardMsg
+protobufs the browser sends), so every simulated session is a real
+session on the server:
+
+  admins    open the Admin Bot, upload a photo, answer with the default
+            angles, wait for the background jobs and publish -- over and
+            over, one fresh session per product;
+  shoppers  open the Storefront, page through it and click "Add to
+            Cart" (a fragment rerun), with --think seconds between clicks.
+
+Reports throughput, p50/p95/p99 rerun latency per role and action,
+websocket bytes per rerun and the largest single message (images are
+fetched over plain HTTP by the browser and are not counted), and the
+server's RSS (including the image pool workers) over time; --out writes
+the raw numbers as JSON.
+
+With --launch the harness starts its own server on a throwaway data dir
+with the offline fake model (FURNICON_MODEL_CLIENT=fake); otherwise point
+--url at a running server, ideally started with the fake or replay client,
+and pass --server-pid to sample its memory (Linux /proc).
+
+    python benchmarks/load_sessions.py --launch --admins 4 --shoppers 20 --duration 120
+
+Needs the `websockets` package (installed with Streamlit's server). The
+wire format follows the installed Streamlit version.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_optimize_image import make_jpeg
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import FileUploaderState, UploadedFileInfo
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+try:
+    from websockets.sync.client import connect
+except ImportError:
+    sys.exit("load_sessions.py needs the websockets package: pip install websockets")
+
+XSRF_COOKIE = "_streamlit_xsrf"
+
+
+# --- ONE SESSION ---
+class Session:
+    """One simulated browser tab: a websocket plus the last rendered elements."""
+
+    def __init__(self, base_url, xsrf, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.xsrf = xsrf
+        self.timeout = timeout
+        self.ws = connect(
+            self.base_url.replace("http", "ws", 1) + "/_stcore/stream",
+            subprotocols=["streamlit", xsrf] if xsrf else ["streamlit"],
+            additional_headers={"Cookie": f"{XSRF_COOKIE}={xsrf}"} if xsrf else None,
+            max_size=None,
+            open_timeout=timeout,
+        )
+        self.session_id = None
+        self.page_hash = ""
+        self.query_string = ""
+        self.elements = []  # (element proto, fragment id) from the latest run
+
+    def close(self):
+        self.ws.close()
+
+    def _send(self, back):
+        self.ws.send(back.SerializeToString())
+
+    def _recv(self):
+        data = self.ws.recv(timeout=self.timeout)
+        msg = ForwardMsg()
+        msg.ParseFromString(data)
+        return msg, len(data)
+
+    def run(self, page_name="", widgets=(), fragment_id=""):
+        # One rerun, as the browser triggers it; returns its wall time and
+        # the bytes the server pushed until the run (and any st.rerun()
+        # chained to it) finished.
+        back = BackMsg()
+        state = back.rerun_script
+        state.page_script_hash = "" if page_name else self.page_hash
+        state.page_name = page_name
+        state.query_string = self.query_string
+        state.fragment_id = fragment_id
+        state.widget_states.widgets.extend(widgets)
+
+        stats = {"bytes": 0, "messages": 0, "max_message": 0, "exceptions": 0}
+        start = time.perf_counter()
+        self._send(back)
+        while True:
+            msg, size = self._recv()
+            stats["bytes"] += size
+            stats["messages"] += 1
+            stats["max_message"] = max(stats["max_message"], size)
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                if msg.new_session.initialize.session_id:
+                    self.session_id = msg.new_session.initialize.session_id
+                self.page_hash = msg.new_session.page_script_hash
+                if not fragment_id:
+                    self.elements = []
+            elif kind == "navigation":
+                # Multipage apps report the page actually running here.
+                self.page_hash = msg.navigation.page_script_hash
+            elif kind == "page_info_changed":
+                # The browser keeps st.query_params in the URL and sends it back.
+                self.query_string = msg.page_info_changed.query_string
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                if element.WhichOneof("type") == "exception":
+                    stats["exceptions"] += 1
+                self.elements.append((element, msg.delta.fragment_id))
+            elif kind == "script_finished":
+                if msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    break
+        stats["latency"] = time.perf_counter() - start
+        return stats
+
+    def find(self, kind, label=""):
+        # Newest matching widget: (proto, fragment id) or (None, "").
+        for element, fragment_id in reversed(self.elements):
+            if element.WhichOneof("type") == kind:
+                proto = getattr(element, kind)
+                if getattr(proto, "label", "").startswith(label):
+                    return proto, fragment_id
+        return None, ""
+
+    def upload(self, uploader, name, data, mime):
+        # Same two steps as the browser: ask for an upload URL, PUT the file,
+        # then report it through the uploader's widget state.
+        request_id = uuid.uuid4().hex
+        back = BackMsg()
+        back.file_urls_request.request_id = request_id
+        back.file_urls_request.file_names.append(name)
+        back.file_urls_request.session_id = self.session_id
+        self._send(back)
+        while True:
+            msg, _ = self._recv()
+            if msg.WhichOneof("type") == "file_urls_response" and msg.file_urls_response.response_id == request_id:
+                if msg.file_urls_response.error_msg:
+                    raise RuntimeError(msg.file_urls_response.error_msg)
+                urls = msg.file_urls_response.file_urls[0]
+                break
+
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"; filename=\"{name}\"\r\n"
+            f"Content-Type: {mime}\r\n\r\n"
+        ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        if self.xsrf:
+            headers.update({"X-Xsrftoken": self.xsrf, "Cookie": f"{XSRF_COOKIE}={self.xsrf}"})
+        url = urls.upload_url if urls.upload_url.startswith("http") else self.base_url + urls.upload_url
+        urllib.request.urlopen(urllib.request.Request(url, data=body, headers=headers, method="PUT"), timeout=self.timeout)
+
+        state = WidgetState(id=uploader.id)
+        state.file_uploader_state_value.CopyFrom(FileUploaderState(uploaded_file_info=[
+            UploadedFileInfo(name=name, size=len(data), file_id=urls.file_id, file_urls=urls)
+        ]))
+        return state
+
+
+# --- SCENARIOS ---
+class Recorder:
+    def __init__(self):
+        self.runs = []
+        self.events = {}
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def run(self, session, role, action, **kwargs):
+        stats = session.run(**kwargs)
+        with self._lock:
+            self.runs.append({"role": role, "action": action, "t": time.time(), **stats})
+        return stats
+
+    def event(self, name):
+        with self._lock:
+            self.events[name] = self.events.get(name, 0) + 1
+
+    def error(self, role, error):
+        with self._lock:
+            self.errors.append(f"{role}: {error!r}")
+
+
+def admin_loop(args, n, recorder, stop):
+    rng = random.Random(n)
+    photo = os.path.join(args.tmp, f"admin-{n}.jpg")
+    iteration = 0
+    while not stop.is_set():
+        iteration += 1
+        make_jpeg(photo, (args.photo_width, args.photo_width * 3 // 4), seed=n * 100000 + iteration)
+        with open(photo, "rb") as f:
+            data = f.read()
+        session = None
+        try:
+            session = Session(args.url, args.xsrf, args.timeout)
+            recorder.run(session, "admin", "open", page_name="Admin_Bot")
+            uploader, _ = session.find("file_uploader")
+            state = session.upload(uploader, f"product-{n}-{iteration}.jpg", data, "image/jpeg")
+            recorder.run(session, "admin", "upload", widgets=[state])
+
+            # The job watchers are run_every fragments the browser would
+            # fire; polling with plain reruns reaches the same state.
+            deadline = time.monotonic() + args.timeout
+            while session.find("chat_input")[0] is None:
+                if time.monotonic() > deadline:
+                    raise TimeoutError("analysis did not finish")
+                time.sleep(args.poll)
+                recorder.run(session, "admin", "poll")
+            chat, _ = session.find("chat_input")
+            state = WidgetState(id=chat.id)
+            state.chat_input_value.data = "Default"
+            recorder.run(session, "admin", "instruct", widgets=[state])
+
+            while session.find("button", "Publish")[0] is None:
+                if time.monotonic() > deadline:
+                    raise TimeoutError("generation did not finish")
+                time.sleep(args.poll)
+                recorder.run(session, "admin", "poll")
+            publish, _ = session.find("button", "Publish")
+            recorder.run(session, "admin", "publish", widgets=[WidgetState(id=publish.id, trigger_value=True)])
+            if session.find("button", "Start Over")[0] is None:
+                raise RuntimeError("publish did not reach the done step")
+            recorder.event("published")
+        except Exception as e:
+            recorder.error("admin", e)
+            stop.wait(1.0)
+        finally:
+            if session is not None:
+                session.close()
+        stop.wait(rng.uniform(0, args.think))
+
+
+def shopper_loop(args, n, recorder, stop):
+    rng = random.Random(-n - 1)
+    session = None
+    try:
+        session = Session(args.url, args.xsrf, args.timeout)
+        recorder.run(session, "shopper", "open", page_name="Storefront")
+        recorder.event("page_views")
+        while not stop.wait(rng.uniform(0, 2 * args.think)):
+            carts = [(e.button, f) for e, f in session.elements
+                     if e.WhichOneof("type") == "button" and e.button.label == "Add to Cart"]
+            pager, _ = session.find("number_input", "Page")
+            if carts and (pager is None or rng.random() < 0.6):
+                button, fragment_id = rng.choice(carts)
+                recorder.run(session, "shopper", "add_to_cart",
+                             widgets=[WidgetState(id=button.id, trigger_value=True)], fragment_id=fragment_id)
+                recorder.event("add_to_cart")
+            elif pager is not None:
+                page = rng.randint(1, max(1, int(pager.max)))
+                recorder.run(session, "shopper", "page",
+                             widgets=[WidgetState(id=pager.id, double_value=page)])
+                recorder.event("page_views")
+            else:
+                recorder.run(session, "shopper", "refresh")
+                recorder.event("page_views")
+    except Exception as e:
+        recorder.error("shopper", e)
+    finally:
+        if session is not None:
+            session.close()
+
+
+# --- SERVER ---
+def rss_kb(pid):
+    # RSS of pid plus all its descendants (the image pool workers).
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                total += next((int(line.split()[1]) for line in f if line.startswith("VmRSS:")), 0)
+            for task in os.listdir(f"/proc/{p}/task"):
+                with open(f"/proc/{p}/task/{task}/children") as f:
+                    stack.extend(int(c) for c in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def sample_memory(pid, interval, samples, stop):
+    started = time.time()
+    while True:
+        samples.append([round(time.time() - started, 2), rss_kb(pid) / 1024])
+        if stop.wait(interval):
+            return
+
+
+def launch_server(args):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = {
+        **os.environ,
+        "FURNICON_DATA_DIR": os.path.join(args.tmp, "data"),
+        "FURNICON_MODEL_CLIENT": "fake",
+        "FURNICON_FAKE_LATENCY_SCALE": str(args.latency_scale),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url + "/_stcore/health", timeout=2)
+            return proc, url
+        except OSError:
+            time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("server did not become healthy")
+
+
+def fetch_xsrf(url):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    opener.open(url + "/_stcore/health", timeout=10)
+    return next((c.value for c in jar if c.name == XSRF_COOKIE), None)
+
+
+# --- REPORT ---
+def percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))] if values else float("nan")
+
+
+def report(recorder, elapsed, memory):
+    groups = {}
+    for run in recorder.runs:
+        groups.setdefault((run["role"], run["action"]), []).append(run)
+    summary = {}
+    print(f"\n{'role':>8} {'action':>12} {'runs':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'KB/run':>8} {'max msg KB':>10}")
+    for (role, action), runs in sorted(groups.items()):
+        lat = sorted(r["latency"] * 1000 for r in runs)
+        row = {
+            "runs": len(runs),
+            "p50_ms": percentile(lat, 0.50), "p95_ms": percentile(lat, 0.95), "p99_ms": percentile(lat, 0.99),
+            "mean_kb": sum(r["bytes"] for r in runs) / len(runs) / 1024,
+            "max_message_kb": max(r["max_message"] for r in runs) / 1024,
+            "exceptions": sum(r["exceptions"] for r in runs),
+        }
+        summary[f"{role}.{action}"] = row
+        print(f"{role:>8} {action:>12} {row['runs']:>6} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['mean_kb']:>8.1f} {row['max_message_kb']:>10.1f}")
+
+    throughput = {
+        "reruns_per_s": len(recorder.runs) / elapsed,
+        **{f"{name}_per_min": count / elapsed * 60 for name, count in recorder.events.items()},
+    }
+    print("\n" + ", ".join(f"{k} {v:.2f}" for k, v in throughput.items()))
+    if memory:
+        rss = [m for _, m in memory]
+        print(f"server RSS MB: start {rss[0]:.0f}, peak {max(rss):.0f}, end {rss[-1]:.0f}")
+    exceptions = sum(r["exceptions"] for r in recorder.runs)
+    if recorder.errors or exceptions:
+        print(f"{len(recorder.errors)} session error(s), {exceptions} script exception(s); first: "
+              f"{recorder.errors[0] if recorder.errors else '-'}")
+    return {"reruns": summary, "throughput": throughput, "errors": recorder.errors}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="running server, e.g. http://localhost:8501")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, for memory sampling")
+    parser.add_argument("--launch", action="store_true", help="start a server with the offline fake model")
+    parser.add_argument("--latency-scale", type=float, default=0.1,
+                        help="FURNICON_FAKE_LATENCY_SCALE for --launch (default: %(default)s)")
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--shoppers", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds to spread session start-up over")
+    parser.add_argument("--think", type=float, default=1.0, help="mean pause between shopper clicks")
+    parser.add_argument("--photo-width", type=int, default=2000)
+    parser.add_argument("--poll", type=float, default=0.5, help="Admin Bot job polling interval")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--sample", type=float, default=1.0, help="memory sampling interval")
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+    if not args.launch and not args.url:
+        parser.error("pass --url or --launch")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        args.tmp = tmp
+        proc = None
+        if args.launch:
+            proc, args.url = launch_server(args)
+            args.server_pid = proc.pid
+            print(f"Launched {args.url} (pid {proc.pid}, fake model, latency scale {args.latency_scale})")
+        args.xsrf = fetch_xsrf(args.url)
+
+        recorder, stop, memory = Recorder(), threading.Event(), []
+        sampler = None
+        if args.server_pid:
+            sampler = threading.Thread(target=sample_memory, args=(args.server_pid, args.sample, memory, stop))
+            sampler.start()
+        roles = [(admin_loop, i) for i in range(args.admins)] + [(shopper_loop, i) for i in range(args.shoppers)]
+
+        print(f"{args.admins} admin(s), {args.shoppers} shopper(s) for {args.duration:.0f}s ...", flush=True)
+        started = time.time()
+        threads = []
+        for loop, n in roles:
+            threads.append(threading.Thread(target=loop, args=(args, n, recorder, stop), daemon=True))
+            threads[-1].start()
+            time.sleep(args.ramp / len(roles))
+        time.sleep(max(0, args.duration - (time.time() - started)))
+        stop.set()
+        for thread in threads + ([sampler] if sampler else []):
+            thread.join(timeout=args.timeout)
+        elapsed = time.time() - started
+
+        results = report(recorder, elapsed, memory)
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    if args.out:
+        results.update({
+            "settings": {k: v for k, v in vars(args).items() if k not in ("tmp", "xsrf")},
+            "memory_mb": memory,
+            "runs": recorder.runs,
+        })
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Furnicon core: storage and AI pipeline pieces shared by the Streamlit pages.
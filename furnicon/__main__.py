@@ -0,0 +1,30 @@
+import argparse
+import sys
+
+from furnicon import dedupe, ingest, similar
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m furnicon")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest.add_arguments(commands.add_parser("ingest", help="bulk-publish a folder or zip of product photos"))
+    commands.add_parser("hashes", help="store perceptual hashes for products published without one")
+    commands.add_parser("features", help="store visual features for products published without them")
+    args = parser.parse_args(argv)
+
+    if args.command == "hashes":
+        return dedupe.run(args)
+
+    if args.command == "features":
+        return similar.run(args)
+
+    if args.command == "ingest":
+        try:
+            return ingest.run(args)
+        except (RuntimeError, FileNotFoundError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from PIL import Image
+
+# Asset IDs are "<sha256 of the encoded bytes>.<ext>", so identical uploads or
+# model outputs collapse to one file on disk.
+ASSET_ID_RE = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+
+
+# --- HELPER: FORMAT SNIFFING ---
+def sniff_extension(data):
+    for signature, ext in _SIGNATURES:
+        if data.startswith(signature):
+            return ext
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "bin"
+
+
+# --- STORE ---
+class AssetStore:
+    """Content-addressed image store on the local filesystem.
+
+    Files live at <root>/<first two hex chars>/<asset id> and are never
+    rewritten, so they are safe to share across sessions and processes.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, asset_id):
+        if not ASSET_ID_RE.match(asset_id):
+            raise ValueError(f"Invalid asset id: {asset_id!r}")
+        return os.path.join(self.root, asset_id[:2], asset_id)
+
+    def exists(self, asset_id):
+        return os.path.exists(self.path(asset_id))
+
+    def put(self, data):
+        data = bytes(data)
+        asset_id = f"{hashlib.sha256(data).hexdigest()}.{sniff_extension(data)}"
+        path = self.path(asset_id)
+        if not os.path.exists(path):
+            self._write(path, data)
+        return asset_id
+
+    def _write(self, path, data):
+        # Write to a temp file and rename so readers never see a partial asset.
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # --- DERIVATIVES ---
+    # Resized/re-encoded copies of an asset (see furnicon.derivatives) live
+    # under <root>/derived/<first two hex chars>/<asset id>/<name>; like the
+    # sources they are written once and never change.
+    def derived_path(self, asset_id, name):
+        self.path(asset_id)  # validates the id
+        return os.path.join(self.root, "derived", asset_id[:2], asset_id, name)
+
+    def put_derived(self, asset_id, name, data):
+        path = self.derived_path(asset_id, name)
+        if not os.path.exists(path):
+            self._write(path, bytes(data))
+        return path
+
+    def read(self, asset_id):
+        with open(self.path(asset_id), "rb") as f:
+            return f.read()
+
+    def open_image(self, asset_id):
+        # Lazy: only the header is parsed until pixels are actually needed.
+        return Image.open(self.path(asset_id))
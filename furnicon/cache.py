@@ -0,0 +1,267 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from furnicon.db import SQLiteStore
+
+CACHE_MIGRATIONS = [
+    """
+    CREATE TABLE entries (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        accessed_at REAL NOT NULL,
+        PRIMARY KEY (namespace, key)
+    );
+    CREATE INDEX idx_entries_lru ON entries(namespace, accessed_at);
+    CREATE TABLE stats (
+        namespace TEXT PRIMARY KEY,
+        hits INTEGER NOT NULL DEFAULT 0,
+        misses INTEGER NOT NULL DEFAULT 0,
+        evictions INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+]
+
+# Hit/miss counts and LRU touches from get() are written in batches, at
+# most this many pending or this many seconds old.
+TOUCH_BATCH = 64
+TOUCH_INTERVAL = 5.0
+
+
+# --- HELPER: KEYS ---
+def make_key(*parts):
+    # Stable digest of the key parts; bytes are hashed as-is, the rest as JSON.
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            h.update(hashlib.sha256(part).digest())
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+# --- STORE ---
+class ResultCache(SQLiteStore):
+    """Persistent JSON result cache with TTL and LRU eviction.
+
+    Shared by every session and process using the same file. Entries and
+    hit/miss counters are kept per namespace. A lookup is a plain read; its
+    counters and LRU touch are batched into a later write that is skipped,
+    and retried, while another writer holds the lock.
+    """
+
+    MIGRATIONS = CACHE_MIGRATIONS
+
+    def __init__(self, path, namespace, ttl=None, max_entries=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pending_lock = threading.Lock()
+        self._touched = {}  # key -> accessed_at, not yet written
+        self._counts = {"hits": 0, "misses": 0}
+        self._flushed_at = time.time()
+        super().__init__(path)
+
+    def _bump(self, conn, counter, n=1):
+        conn.execute(
+            f"INSERT INTO stats (namespace, {counter}) VALUES (?, ?) "
+            f"ON CONFLICT(namespace) DO UPDATE SET {counter} = {counter} + excluded.{counter}",
+            (self.namespace, n),
+        )
+
+    def get(self, key, default=None):
+        now = time.time()
+        row = self._connect().execute(
+            "SELECT value, created_at FROM entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        # Expired entries are left for set() to replace or purge.
+        hit = row is not None and (self.ttl is None or now - row["created_at"] <= self.ttl)
+        with self._pending_lock:
+            self._counts["hits" if hit else "misses"] += 1
+            if hit:
+                self._touched[key] = now
+            due = (len(self._touched) >= TOUCH_BATCH or sum(self._counts.values()) >= TOUCH_BATCH
+                   or now - self._flushed_at >= TOUCH_INTERVAL)
+        if due:
+            self.flush(wait=False)
+        return json.loads(row["value"]) if hit else default
+
+    def flush(self, wait=True):
+        # Writes pending counters and touches. With wait=False, gives up at
+        # once if the database is locked and keeps them for next time.
+        touched, counts = self._take_pending()
+        if not touched and not any(counts.values()):
+            return
+        conn = self._connect()
+        timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        if not wait:
+            conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            with self.transaction() as conn:
+                self._write_pending(conn, touched, counts)
+        except sqlite3.OperationalError:
+            if wait:
+                raise
+            with self._pending_lock:
+                for key, accessed_at in touched.items():
+                    self._touched[key] = max(accessed_at, self._touched.get(key, 0))
+                for counter, n in counts.items():
+                    self._counts[counter] += n
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {timeout}")
+
+    def _take_pending(self):
+        with self._pending_lock:
+            touched, counts = self._touched, self._counts
+            self._touched, self._counts = {}, {"hits": 0, "misses": 0}
+            self._flushed_at = time.time()
+        return touched, counts
+
+    def _write_pending(self, conn, touched, counts):
+        conn.executemany(
+            "UPDATE entries SET accessed_at = MAX(accessed_at, ?) WHERE namespace = ? AND key = ?",
+            [(accessed_at, self.namespace, key) for key, accessed_at in touched.items()],
+        )
+        for counter, n in counts.items():
+            if n:
+                self._bump(conn, counter, n)
+
+    def set(self, key, value):
+        now = time.time()
+        touched, counts = self._take_pending()
+        with self.transaction() as conn:
+            # Pending touches go first, so eviction sees the real LRU order.
+            self._write_pending(conn, touched, counts)
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now, now),
+            )
+            if self.ttl is not None:
+                conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND created_at < ?",
+                    (self.namespace, now - self.ttl),
+                )
+            if self.max_entries is not None:
+                self._evict(conn)
+
+    def delete(self, key):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def _evict(self, conn):
+        size = conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        excess = size - self.max_entries
+        if excess <= 0:
+            return
+        conn.execute(
+            "DELETE FROM entries WHERE namespace = ? AND key IN ("
+            "SELECT key FROM entries WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+            (self.namespace, self.namespace, excess),
+        )
+        self._bump(conn, "evictions", excess)
+
+    def stats(self):
+        self.flush()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT hits, misses, evictions FROM stats WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        size = conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        hits, misses, evictions = tuple(row) if row else (0, 0, 0)
+        return {"hits": hits, "misses": misses, "evictions": evictions, "entries": size}
+
+
+# --- SINGLE FLIGHT ---
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution.
+
+    The first caller runs fn(); callers arriving while it is in flight
+    block on the same Future and get its result (or exception).
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+
+# --- NEGATIVE CAPABILITY CACHE ---
+class NegativeCache:
+    """Process-wide memory of requests a model has refused, per (key, error class).
+
+    After mark(), skip(key) is true until the entry's `ttl` runs out, except
+    that once every `probe_interval` seconds a single caller is let through
+    to re-check; it must then call mark() again (still refused) or clear()
+    (works again). Keys are e.g. model names.
+    """
+
+    def __init__(self, ttl, probe_interval):
+        self.ttl = ttl
+        self.probe_interval = probe_interval
+        self._entries = {}  # key -> {error class: {"since", "checked", "probing"}}
+        self._lock = threading.Lock()
+
+    def mark(self, key, error_class):
+        now = time.time()
+        with self._lock:
+            classes = self._entries.setdefault(key, {})
+            entry = classes.setdefault(error_class, {"since": now})
+            entry.update(checked=now, probing=False)
+
+    def clear(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def skip(self, key):
+        # (skip?, error class). (False, error class) means "go ahead, this is the probe".
+        now = time.time()
+        with self._lock:
+            classes = self._entries.get(key)
+            if not classes:
+                return False, None
+            for error_class, entry in list(classes.items()):
+                if now - entry["since"] > self.ttl:
+                    del classes[error_class]
+            if not classes:
+                del self._entries[key]
+                return False, None
+            error_class, entry = max(classes.items(), key=lambda item: item[1]["checked"])
+            if not entry["probing"] and now - entry["checked"] >= self.probe_interval:
+                entry["probing"] = True
+                return False, error_class
+            return True, error_class
+
+    def entries(self):
+        with self._lock:
+            return {key: {c: dict(e) for c, e in classes.items()} for key, classes in self._entries.items()}
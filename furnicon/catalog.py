@@ -0,0 +1,334 @@
+import json
+import time
+
+from furnicon import dimensions
+from furnicon.db import SQLiteStore
+
+# Typed columns on the products table. Anything else in a product dict
+# (e.g. "brand_generic" from the analysis step) is kept in the JSON `extra` column.
+TEXT_FIELDS = (
+    "title", "description", "brand", "brand_generic", "category", "colour",
+    "frame_material", "style", "furniture_finish", "seat_height", "seat_width",
+    "leg_style", "dimensions_str",
+)
+IMAGE_FIELDS = ("image_id", "variations")
+RESERVED_FIELDS = (
+    "id", "price", "stock", "created_at", "variation_count", "phash", "visual_features",
+    *dimensions.SIZE_COLUMNS, "unparsed_sizes",
+)
+# Text indexed by furnicon.search, one entry per search field; the spec
+# columns (see furnicon.specs) are searched together as "specs".
+SEARCH_SPEC_FIELDS = (
+    "colour", "frame_material", "style", "furniture_finish", "seat_height", "seat_width",
+    "leg_style", "dimensions_str",
+)
+SEARCH_COLUMNS = ("p.title", "p.brand", "p.category", "p.description",
+                  " || ' ' || ".join(f"p.{f}" for f in SEARCH_SPEC_FIELDS))
+
+# --- SCHEMA MIGRATIONS ---
+# Applied in order; PRAGMA user_version records how many have run.
+CATALOG_MIGRATIONS = [
+    """
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL DEFAULT '',
+        description TEXT NOT NULL DEFAULT '',
+        brand TEXT NOT NULL DEFAULT '',
+        brand_generic TEXT NOT NULL DEFAULT '',
+        category TEXT NOT NULL DEFAULT '',
+        colour TEXT NOT NULL DEFAULT '',
+        frame_material TEXT NOT NULL DEFAULT '',
+        style TEXT NOT NULL DEFAULT '',
+        furniture_finish TEXT NOT NULL DEFAULT '',
+        seat_height TEXT NOT NULL DEFAULT '',
+        seat_width TEXT NOT NULL DEFAULT '',
+        leg_style TEXT NOT NULL DEFAULT '',
+        dimensions_str TEXT NOT NULL DEFAULT '',
+        price REAL NOT NULL DEFAULT 0,
+        stock INTEGER NOT NULL DEFAULT 0,
+        variation_count INTEGER NOT NULL DEFAULT 0,
+        extra TEXT NOT NULL DEFAULT '{}',
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX idx_products_category ON products(category);
+    CREATE INDEX idx_products_created_at ON products(created_at);
+    CREATE TABLE product_assets (
+        product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        asset_id TEXT NOT NULL,
+        PRIMARY KEY (product_id, position)
+    );
+    CREATE INDEX idx_product_assets_asset ON product_assets(asset_id);
+    """,
+    # Perceptual hash of each product's source photo, for near-duplicate
+    # lookups (furnicon.dedupe). Stored as signed 64-bit; `id` orders
+    # inserts so indexes can catch up incrementally.
+    """
+    CREATE TABLE source_hashes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL UNIQUE REFERENCES products(id) ON DELETE CASCADE,
+        asset_id TEXT NOT NULL,
+        phash INTEGER NOT NULL
+    );
+    """,
+    # Visual feature vector (float32 bytes) of each product's source photo,
+    # for "more like this" (furnicon.similar); same incremental `id` scheme.
+    """
+    CREATE TABLE visual_features (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL UNIQUE REFERENCES products(id) ON DELETE CASCADE,
+        vector BLOB NOT NULL
+    );
+    """,
+    # Change log for the in-process search index (furnicon.search): one row
+    # per product, re-stamped with a new `id` by triggers whenever it is
+    # inserted, edited or deleted, so readers catch up from any process.
+    """
+    CREATE TABLE product_changes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL UNIQUE
+    );
+    CREATE TRIGGER products_changed_insert AFTER INSERT ON products BEGIN
+        INSERT OR REPLACE INTO product_changes (product_id) VALUES (new.id);
+    END;
+    CREATE TRIGGER products_changed_update AFTER UPDATE ON products BEGIN
+        INSERT OR REPLACE INTO product_changes (product_id) VALUES (new.id);
+    END;
+    CREATE TRIGGER products_changed_delete AFTER DELETE ON products BEGIN
+        INSERT OR REPLACE INTO product_changes (product_id) VALUES (old.id);
+    END;
+    INSERT INTO product_changes (product_id) SELECT id FROM products ORDER BY id;
+    """,
+    # Sizes parsed from the text fields, in cm (NULL = unknown), for range
+    # filters and sorts (furnicon.dimensions); `unparsed_sizes` lists the
+    # text fields that are set but couldn't be read, for the admin.
+    """
+    ALTER TABLE products ADD COLUMN width_cm REAL;
+    ALTER TABLE products ADD COLUMN depth_cm REAL;
+    ALTER TABLE products ADD COLUMN height_cm REAL;
+    ALTER TABLE products ADD COLUMN seat_height_cm REAL;
+    ALTER TABLE products ADD COLUMN seat_width_cm REAL;
+    ALTER TABLE products ADD COLUMN unparsed_sizes TEXT NOT NULL DEFAULT '';
+    CREATE INDEX idx_products_unparsed_sizes ON products(id) WHERE unparsed_sizes != '';
+    """,
+    lambda store, conn: store._parse_sizes(conn),
+]
+
+
+def _to_signed64(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _from_signed64(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+# --- STORE ---
+class CatalogStore(SQLiteStore):
+    """Shared on-disk product catalog.
+
+    One instance per process; each thread gets its own connection so several
+    Streamlit sessions can read while another publishes.
+    """
+
+    MIGRATIONS = CATALOG_MIGRATIONS
+
+    def __init__(self, path, assets):
+        self.assets = assets
+        super().__init__(path)
+
+    def _parse_sizes(self, conn):
+        rows = conn.execute("SELECT id, dimensions_str, seat_height, seat_width FROM products").fetchall()
+        conn.executemany(
+            f"UPDATE products SET {', '.join(f'{c} = ?' for c in dimensions.SIZE_COLUMNS)}, unparsed_sizes = ? "
+            f"WHERE id = ?",
+            [(*sizes.values(), ",".join(unparsed), r["id"]) for r in rows
+             for sizes, unparsed in [dimensions.measurements(dict(r))]],
+        )
+
+    # --- WRITES ---
+    def add(self, product):
+        images = []
+        if product.get("image_id"):
+            images.append(("source", product["image_id"]))
+        variations = product.get("variations") or []
+        images.extend(("variation", asset_id) for asset_id in variations)
+
+        row = {f: str(product.get(f) or "") for f in TEXT_FIELDS}
+        row["price"] = float(product.get("price") or 0)
+        row["stock"] = int(product.get("stock") or 0)
+        row["variation_count"] = len(variations)
+        sizes, unparsed = dimensions.measurements(product)
+        row.update(sizes)
+        row["unparsed_sizes"] = ",".join(unparsed)
+        row["extra"] = json.dumps({
+            k: v for k, v in product.items()
+            if k not in TEXT_FIELDS and k not in IMAGE_FIELDS and k not in RESERVED_FIELDS
+        }, default=str)
+        row["created_at"] = time.time()
+
+        columns = ", ".join(row)
+        params = ", ".join(f":{c}" for c in row)
+        with self.transaction() as conn:
+            cur = conn.execute(f"INSERT INTO products ({columns}) VALUES ({params})", row)
+            product_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO product_assets (product_id, position, role, asset_id) VALUES (?, ?, ?, ?)",
+                [(product_id, pos, role, asset_id) for pos, (role, asset_id) in enumerate(images)],
+            )
+            if product.get("phash") is not None and product.get("image_id"):
+                self._put_source_hash(conn, product_id, product["image_id"], product["phash"])
+            if product.get("visual_features") is not None:
+                self._put_visual_features(conn, product_id, product["visual_features"])
+        return product_id
+
+    def set_source_hash(self, product_id, asset_id, phash):
+        with self.transaction() as conn:
+            self._put_source_hash(conn, product_id, asset_id, phash)
+
+    def set_visual_features(self, product_id, vector):
+        with self.transaction() as conn:
+            self._put_visual_features(conn, product_id, vector)
+
+    def _put_visual_features(self, conn, product_id, vector):
+        conn.execute(
+            "INSERT OR REPLACE INTO visual_features (product_id, vector) VALUES (?, ?)", (product_id, vector)
+        )
+
+    def _put_source_hash(self, conn, product_id, asset_id, phash):
+        # Replacing gives the row a new id, so incremental readers pick it up.
+        conn.execute(
+            "INSERT OR REPLACE INTO source_hashes (product_id, asset_id, phash) VALUES (?, ?, ?)",
+            (product_id, asset_id, _to_signed64(phash)),
+        )
+
+    # --- READS ---
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def recent(self, n=5):
+        # Newest first, without the asset lists.
+        rows = self._connect().execute(
+            "SELECT * FROM products ORDER BY created_at DESC, id DESC LIMIT ?", (n,)
+        ).fetchall()
+        return [self._row_to_product(r) for r in rows]
+
+    def find_by_source(self, asset_id):
+        # Id of the product published from this source image, if any.
+        row = self._connect().execute(
+            "SELECT product_id FROM product_assets WHERE asset_id = ? AND role = 'source' LIMIT 1",
+            (asset_id,),
+        ).fetchone()
+        return row[0] if row else None
+
+    def source_hashes(self, after=0):
+        # [(row id, product id, phash)] stored after row id `after`.
+        rows = self._connect().execute(
+            "SELECT id, product_id, phash FROM source_hashes WHERE id > ? ORDER BY id", (after,)
+        ).fetchall()
+        return [(row_id, product_id, _from_signed64(phash)) for row_id, product_id, phash in rows]
+
+    def visual_features(self, after=0):
+        # [(row id, product id, float32 bytes)] stored after row id `after`.
+        return [tuple(r) for r in self._connect().execute(
+            "SELECT id, product_id, vector FROM visual_features WHERE id > ? ORDER BY id", (after,)
+        )]
+
+    def products_without_features(self):
+        # [(product id, source asset id)] published before features were stored.
+        return [tuple(r) for r in self._connect().execute(
+            "SELECT a.product_id, a.asset_id FROM product_assets a "
+            "LEFT JOIN visual_features v ON v.product_id = a.product_id "
+            "WHERE a.role = 'source' AND v.product_id IS NULL ORDER BY a.product_id"
+        )]
+
+    def products_without_hash(self):
+        # [(product id, source asset id)] published before hashes were stored.
+        return [tuple(r) for r in self._connect().execute(
+            "SELECT a.product_id, a.asset_id FROM product_assets a "
+            "LEFT JOIN source_hashes h ON h.product_id = a.product_id "
+            "WHERE a.role = 'source' AND h.product_id IS NULL ORDER BY a.product_id"
+        )]
+
+    def changed_products(self, after=0, columns=SEARCH_COLUMNS):
+        # [(change id, product id, column values or None if deleted)] for
+        # products inserted, edited or deleted after change id `after`.
+        # Columns are SQL expressions over `p` (products).
+        rows = self._connect().execute(
+            f"SELECT c.id, c.product_id, p.id IS NOT NULL, {', '.join(columns)} "
+            f"FROM product_changes c LEFT JOIN products p ON p.id = c.product_id "
+            f"WHERE c.id > ? ORDER BY c.id",
+            (after,),
+        ).fetchall()
+        return [(r[0], r[1], tuple(r[3:]) if r[2] else None) for r in rows]
+
+    def unparsed_sizes(self):
+        # [(product id, title, [text fields])] of products whose dimensions
+        # or seat sizes couldn't be read, newest first.
+        rows = self._connect().execute(
+            "SELECT id, title, unparsed_sizes FROM products WHERE unparsed_sizes != '' ORDER BY id DESC"
+        ).fetchall()
+        return [(product_id, title, fields.split(",")) for product_id, title, fields in rows]
+
+    def trace_ids(self):
+        # {trace id: product id} for products published with one (see furnicon.tracing).
+        rows = self._connect().execute(
+            "SELECT json_extract(extra, '$.trace_id'), id FROM products "
+            "WHERE json_extract(extra, '$.trace_id') IS NOT NULL"
+        ).fetchall()
+        return {trace_id: product_id for trace_id, product_id in rows}
+
+    def get(self, product_id):
+        row = self._connect().execute("SELECT * FROM products WHERE id = ?", (product_id,)).fetchone()
+        if row is None:
+            return None
+        return self._attach_assets([self._row_to_product(row)])[0]
+
+    def get_many(self, product_ids):
+        # Products in the given order; unknown ids are skipped.
+        if not product_ids:
+            return []
+        marks = ", ".join("?" for _ in product_ids)
+        rows = self._connect().execute(f"SELECT * FROM products WHERE id IN ({marks})", list(product_ids)).fetchall()
+        by_id = {p["id"]: p for p in self._attach_assets([self._row_to_product(r) for r in rows])}
+        return [by_id[i] for i in product_ids if i in by_id]
+
+    def all(self):
+        rows = self._connect().execute("SELECT * FROM products ORDER BY id").fetchall()
+        return self._attach_assets([self._row_to_product(r) for r in rows])
+
+    def page(self, offset, limit):
+        # One storefront window in `all()` order; only its assets are loaded.
+        rows = self._connect().execute(
+            "SELECT * FROM products ORDER BY id LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall()
+        return self._attach_assets([self._row_to_product(r) for r in rows])
+
+    def _row_to_product(self, row):
+        product = dict(row)
+        product.update(json.loads(product.pop("extra") or "{}"))
+        return product
+
+    def _attach_assets(self, products):
+        if not products:
+            return products
+        by_id = {p["id"]: p for p in products}
+        for p in products:
+            p["variations"] = []
+        ids = list(by_id)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            rows = self._connect().execute(
+                f"SELECT product_id, role, asset_id FROM product_assets "
+                f"WHERE product_id IN ({marks}) ORDER BY product_id, position",
+                chunk,
+            )
+            for product_id, role, asset_id in rows:
+                product = by_id[product_id]
+                if role == "source":
+                    product["image_id"] = asset_id
+                else:
+                    product["variations"].append(asset_id)
+        return products
@@ -0,0 +1,174 @@
+import os
+
+# --- PATHS ---
+DATA_DIR = os.environ.get("FURNICON_DATA_DIR", "data")
+CATALOG_PATH = os.path.join(DATA_DIR, "catalog.db")
+ASSET_DIR = os.path.join(DATA_DIR, "assets")
+SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+
+# --- MODEL CLIENT ---
+# "live" talks to Gemini; "record" does too and saves every exchange under
+# RECORDINGS_DIR; "replay" serves those recordings and "fake" synthesizes
+# answers (furnicon.standin). The last two need no API key or network.
+MODEL_CLIENT = os.environ.get("FURNICON_MODEL_CLIENT", "live")
+RECORDINGS_DIR = os.environ.get("FURNICON_RECORDINGS_DIR", os.path.join(DATA_DIR, "recordings"))
+# Replay: requests without a recording go to the fake instead of failing,
+# and recorded latencies are reproduced times this scale (0 = instant).
+REPLAY_FALLBACK_FAKE = os.environ.get("FURNICON_REPLAY_FALLBACK_FAKE", "0") == "1"
+REPLAY_LATENCY_SCALE = float(os.environ.get("FURNICON_REPLAY_LATENCY_SCALE", "0"))
+# Fake: per-model log-normal latency (seconds), scaled by FAKE_LATENCY_SCALE,
+# plus the share of calls that fail with a 429 or a 500.
+FAKE_LATENCY = {
+    "gemini-2.5-flash": {"median": 3.0, "p95": 8.0},
+    "gemini-2.5-flash-image": {"median": 8.0, "p95": 20.0},
+}
+FAKE_LATENCY_SCALE = float(os.environ.get("FURNICON_FAKE_LATENCY_SCALE", "1"))
+FAKE_RATE_LIMIT_RATE = float(os.environ.get("FURNICON_FAKE_RATE_LIMIT_RATE", "0"))
+FAKE_FAILURE_RATE = float(os.environ.get("FURNICON_FAKE_FAILURE_RATE", "0"))
+FAKE_IMAGE_SIZE = int(os.environ.get("FURNICON_FAKE_IMAGE_SIZE", "512"))
+# Fake a tier whose image model refuses image+text (I2I) requests.
+FAKE_I2I_UNSUPPORTED = os.environ.get("FURNICON_FAKE_I2I_UNSUPPORTED", "0") == "1"
+
+# --- MODEL RATE LIMITS ---
+# "concurrency" bounds in-flight requests per generation run, "rpm" is the
+# starting (and maximum) refill rate of the shared adaptive token bucket.
+DEFAULT_MODEL_LIMITS = {"concurrency": 2, "rpm": 10}
+MODEL_LIMITS = {
+    "gemini-2.5-flash": {"concurrency": 4, "rpm": 60},
+    "gemini-2.5-flash-image": {"concurrency": 3, "rpm": 30},
+}
+
+# When a model rejects image+text (I2I) requests as unsupported, variations
+# go straight to text-only for this long; one request re-probes I2I every
+# I2I_PROBE_SECONDS in the meantime.
+I2I_UNSUPPORTED_TTL = 6 * 3600
+I2I_PROBE_SECONDS = 15 * 60
+
+# "concurrent" uses the limiter above; "fixed_sleep" keeps the old one-at-a-time
+# loop with a pause after each call, for low quota tiers.
+GENERATION_MODE = os.environ.get("FURNICON_GENERATION_MODE", "concurrent")
+FIXED_SLEEP_SECONDS = 2
+
+# --- MODEL USAGE & BUDGETS ---
+# USD per million tokens (Gemini list prices; images are billed as output
+# tokens). Spend limits are in USD, 0 = unlimited. Over budget, "fail"
+# stops every model call; "downgrade" keeps BUDGET_DOWNGRADE_MODELS (the
+# cheap analysis model) running and only stops image generation.
+USAGE_PATH = os.path.join(DATA_DIR, "usage.db")
+DEFAULT_MODEL_PRICING = {"input": 0.30, "output": 2.50}
+MODEL_PRICING = {
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50},
+    "gemini-2.5-flash-image": {"input": 0.30, "output": 30.00},
+}
+SESSION_BUDGET_USD = float(os.environ.get("FURNICON_SESSION_BUDGET_USD", "0"))
+DAILY_BUDGET_USD = float(os.environ.get("FURNICON_DAILY_BUDGET_USD", "0"))
+BUDGET_ACTION = os.environ.get("FURNICON_BUDGET_ACTION", "fail")
+BUDGET_DOWNGRADE_MODELS = ("gemini-2.5-flash",)
+
+# --- RESULT CACHES ---
+CACHE_PATH = os.path.join(DATA_DIR, "cache.db")
+ANALYSIS_CACHE_TTL = 30 * 24 * 3600
+ANALYSIS_CACHE_MAX_ENTRIES = 10000
+VARIATION_CACHE_TTL = 30 * 24 * 3600
+VARIATION_CACHE_MAX_ENTRIES = 50000
+
+# --- BACKGROUND JOBS ---
+JOBS_PATH = os.path.join(DATA_DIR, "jobs.db")
+JOB_WORKERS = 4
+JOB_POLL_SECONDS = 1.0
+# A job found stale (its worker died) this many times is failed, not requeued.
+JOB_MAX_ATTEMPTS = 3
+
+# Start rendering the default angles as soon as analysis finishes, while the
+# admin is still typing instructions.
+SPECULATIVE_DEFAULTS = os.environ.get("FURNICON_SPECULATIVE_DEFAULTS", "1") != "0"
+
+# --- STOREFRONT ---
+# Products per Storefront page; only this window is read from the catalog.
+STOREFRONT_PAGE_SIZE = int(os.environ.get("FURNICON_STOREFRONT_PAGE_SIZE", "10"))
+# Sidebar filters: (catalog column, label). Values are indexed lower-cased,
+# with FACET_SYNONYMS (keys and values lower case) mapped to one spelling.
+FACETS = (
+    ("category", "Category"),
+    ("colour", "Colour"),
+    ("frame_material", "Frame Material"),
+    ("style", "Style"),
+    ("furniture_finish", "Finish"),
+    ("leg_style", "Leg Style"),
+)
+FACET_SYNONYMS = {
+    "gray": "grey",
+    "off white": "ivory",
+    "off-white": "ivory",
+    "cream": "ivory",
+    "midcentury": "mid-century",
+    "mid century": "mid-century",
+    "mid-century modern": "mid-century",
+    "scandi": "scandinavian",
+    "powder-coated": "powder coated",
+    "oil": "oiled",
+    "lacquer": "lacquered",
+    "hair pin": "hairpin",
+}
+# Range filters and sorts: (catalog column, label). Sizes are parsed from
+# the analysis text to cm (furnicon.dimensions); numbers without a unit are
+# taken as DEFAULT_LENGTH_UNIT and lengths over MAX_LENGTH_CM as misread.
+RANGES = (
+    ("price", "Price ($)"),
+    ("width_cm", "Width (cm)"),
+    ("depth_cm", "Depth (cm)"),
+    ("height_cm", "Height (cm)"),
+    ("seat_height_cm", "Seat Height (cm)"),
+)
+DEFAULT_LENGTH_UNIT = "cm"
+MAX_LENGTH_CM = 1000
+
+# --- IMAGE DERIVATIVES ---
+# Widths encoded for every published image; pages ask for a display width
+# and get the smallest rung covering it at DERIVATIVE_DPR pixels per CSS px.
+# "avif" falls back to WebP when Pillow was built without AVIF support.
+DERIVATIVE_WIDTHS = (256, 512, 1024)
+DERIVATIVE_FORMAT = os.environ.get("FURNICON_DERIVATIVE_FORMAT", "webp")
+DERIVATIVE_QUALITY = 80
+DERIVATIVE_DPR = 2
+
+# --- IMAGE PROCESS POOL ---
+# Processes for decode/resize/encode work (furnicon.imagepool); 0 runs it
+# inline on the calling thread. Each holds a few full-size images in
+# memory, so the default stays small; set FURNICON_IMAGE_WORKERS (e.g. to
+# the core count) on hosts with memory to spare.
+IMAGE_WORKERS = int(os.environ.get("FURNICON_IMAGE_WORKERS", "2"))
+
+# --- NEAR-DUPLICATE UPLOADS ---
+# Uploads whose perceptual hash is within this many of 64 bits of a
+# published product's source photo are offered that product's analysis
+# and images (resized or recompressed copies land at 0-4, unrelated
+# photos around 32).
+DUPLICATE_MAX_DISTANCE = 10
+DUPLICATE_MATCHES = 3
+
+# --- "MORE LIKE THIS" ---
+# Similar products shown per Storefront card. Up to SIMILAR_IVF_MIN
+# products a query compares against all of them (~1 ms per 10k); above it
+# the index clusters them into ~sqrt(n) lists and scans the SIMILAR_NPROBE
+# nearest ones.
+SIMILAR_COUNT = 4
+SIMILAR_IVF_MIN = 20000
+SIMILAR_NPROBE = 12
+
+# --- TRACING ---
+# Latency histogram bucket bounds (seconds) per traced stage, the number of
+# recent spans kept for the Performance page, and an optional JSON-lines
+# file every finished span is appended to.
+TRACE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 60, 120)
+TRACE_RECENT_SPANS = 5000
+TRACE_LOG = os.environ.get("FURNICON_TRACE_LOG", "")
+# The Performance page asks for this token; without one it stays closed.
+ADMIN_TOKEN = os.environ.get("FURNICON_ADMIN_TOKEN", "")
+
+# --- HEADLESS INGEST ---
+# Products processed at once by `python -m furnicon ingest`; model calls are
+# still paced by the per-model limiters above.
+INGEST_WORKERS = 4
+INGEST_PRICE = 299.99
+INGEST_STOCK = 50
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+# --- SQLITE BASE ---
+class SQLiteStore:
+    """Process-wide SQLite handle with per-thread connections (WAL mode).
+
+    Subclasses list their schema in MIGRATIONS: SQL scripts or callables
+    taking (store, conn), applied in order and tracked in PRAGMA user_version.
+    """
+
+    MIGRATIONS = []
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._migrate()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent
+        # writers queue on busy_timeout instead of failing mid-transaction.
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _migrate(self):
+        with self.transaction() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for i, script in enumerate(self.MIGRATIONS[version:], start=version + 1):
+                if callable(script):
+                    script(self, conn)
+                else:
+                    # executescript() would commit our transaction, so feed the
+                    # statements one at a time (trigger bodies contain semicolons).
+                    statement = ""
+                    for line in script.splitlines(keepends=True):
+                        statement += line
+                        if sqlite3.complete_statement(statement):
+                            conn.execute(statement)
+                            statement = ""
+                conn.execute(f"PRAGMA user_version = {i}")
@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+
+from furnicon import config, imagepool
+from furnicon.assets import AssetStore
+from furnicon.catalog import CatalogStore
+from furnicon.imaging import phash_path
+
+# Near-duplicate detection for source photos: every published product's
+# source image has a 64-bit perceptual hash (furnicon.imaging.phash) in the
+# catalog, and uploads within DUPLICATE_MAX_DISTANCE bits of one are
+# offered that product's analysis and variations instead of new model calls.
+
+HASH_BITS = 64
+
+
+def source_hash(assets, image_id):
+    return imagepool.run(phash_path, assets.path(image_id))
+
+
+def similarity(distance):
+    # Share of matching bits, in percent.
+    return round(100 * (1 - distance / HASH_BITS))
+
+
+if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+    popcount = np.bitwise_count
+else:
+    _POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(values):
+        return _POPCOUNT8[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+# --- INDEX ---
+class HashIndex:
+    """64-bit hashes in one packed uint64 array, searched by Hamming distance.
+
+    A query is a single vectorized XOR + popcount over the array, ~0.1 ms at
+    100k hashes. At that size this beats multi-index hashing or a BK-tree in
+    Python, whose per-candidate interpreter work costs more than the scan.
+    """
+
+    def __init__(self, capacity=1024):
+        self._hashes = np.empty(capacity, dtype=np.uint64)
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._slots = {}  # item id -> array position
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, item_id, value):
+        slot = self._slots.get(item_id)
+        if slot is None:
+            slot = len(self._slots)
+            if slot == len(self._hashes):
+                self._hashes = np.resize(self._hashes, 2 * slot)
+                self._ids = np.resize(self._ids, 2 * slot)
+            self._slots[item_id] = slot
+            self._ids[slot] = item_id
+        self._hashes[slot] = value
+
+    def remove(self, item_id):
+        # The last entry moves into the freed slot.
+        slot = self._slots.pop(item_id, None)
+        if slot is None:
+            return
+        last = len(self._slots)
+        if slot != last:
+            self._hashes[slot] = self._hashes[last]
+            self._ids[slot] = self._ids[last]
+            self._slots[int(self._ids[slot])] = slot
+
+    def query(self, value, max_distance):
+        # [(distance, item id)] within max_distance bits, nearest first.
+        n = len(self._slots)
+        distances = popcount(self._hashes[:n] ^ np.uint64(value))
+        hits = np.flatnonzero(distances <= max_distance)
+        return sorted((int(distances[i]), int(self._ids[i])) for i in hits)
+
+
+class DuplicateIndex:
+    """HashIndex of the catalog's source hashes, kept in step with the catalog.
+
+    Each query first pulls rows added since the last one (by this or any
+    other process, e.g. the ingest CLI), so it never goes stale.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.index = HashIndex()
+        self._seen = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            for row_id, product_id, value in self.catalog.source_hashes(after=self._seen):
+                self.index.add(product_id, value)
+                self._seen = max(self._seen, row_id)
+
+    def find(self, value, max_distance=config.DUPLICATE_MAX_DISTANCE, limit=config.DUPLICATE_MATCHES):
+        # [(distance, product id)] of published products whose source photo
+        # is within max_distance bits, nearest first.
+        self.refresh()
+        with self._lock:
+            return self.index.query(value, max_distance)[:limit]
+
+
+# --- BACKFILL ---
+def backfill(catalog, assets, on_progress=None):
+    # Hashes source photos of products published before hashes were stored.
+    # Returns how many were added.
+    missing = catalog.products_without_hash()
+    for start in range(0, len(missing), 256):
+        batch = missing[start:start + 256]
+        values = imagepool.map(phash_path, [assets.path(image_id) for _, image_id in batch])
+        for (product_id, image_id), value in zip(batch, values):
+            catalog.set_source_hash(product_id, image_id, value)
+        if on_progress:
+            on_progress(start + len(batch), len(missing))
+    return len(missing)
+
+
+# --- CLI ---
+def run(args):
+    # `python -m furnicon hashes`
+    assets = AssetStore(config.ASSET_DIR)
+    added = backfill(
+        CatalogStore(config.CATALOG_PATH, assets), assets,
+        on_progress=lambda done, total: print(f"[{done}/{total}] hashed", flush=True),
+    )
+    print(f"Done: {added} product(s) hashed", flush=True)
+    return 0
@@ -0,0 +1,60 @@
+import os
+
+from PIL import features
+
+from furnicon import config, imagepool
+from furnicon.imaging import derivative_ladder
+
+FORMATS = {"webp": ("WEBP", "webp"), "avif": ("AVIF", "avif")}
+
+
+def derivative_format(name=config.DERIVATIVE_FORMAT):
+    # (PIL format, file extension)
+    name = name.lower()
+    if name == "avif" and not features.check("avif"):
+        name = "webp"
+    return FORMATS.get(name, FORMATS["webp"])
+
+
+def derivative_name(width, ext):
+    return f"w{width}.{ext}"
+
+
+# --- ENCODE ---
+def make_derivatives(assets, asset_ids, widths=config.DERIVATIVE_WIDTHS, quality=config.DERIVATIVE_QUALITY):
+    # Encodes the missing rungs of the ladder for each asset, all assets in
+    # parallel on the image pool; returns {asset_id: {width: path}}.
+    fmt, ext = derivative_format()
+    paths, pending = {}, []
+    for asset_id in dict.fromkeys(asset_ids):
+        paths[asset_id] = {w: assets.derived_path(asset_id, derivative_name(w, ext)) for w in widths}
+        missing = [w for w, path in paths[asset_id].items() if not os.path.exists(path)]
+        if missing:
+            pending.append((asset_id, imagepool.submit(derivative_ladder, assets.path(asset_id), missing, fmt, quality)))
+    for asset_id, future in pending:
+        for width, data in future.result().items():
+            assets.put_derived(asset_id, derivative_name(width, ext), data)
+    return paths
+
+
+def make_product_derivatives(assets, product):
+    # Publish step: source image and every variation.
+    asset_ids = [product.get("image_id")] + list(product.get("variations") or [])
+    make_derivatives(assets, [a for a in asset_ids if a])
+
+
+# --- PICK ---
+def derivative_path(assets, asset_id, display_width, widths=config.DERIVATIVE_WIDTHS, dpr=config.DERIVATIVE_DPR):
+    # Smallest rung at least display_width * dpr px wide (else the largest).
+    # Rungs missing for images published before derivatives existed are
+    # encoded here once; if encoding fails the original is served.
+    wanted = display_width * dpr
+    width = next((w for w in sorted(widths) if w >= wanted), max(widths))
+    _, ext = derivative_format()
+    path = assets.derived_path(asset_id, derivative_name(width, ext))
+    if os.path.exists(path):
+        return path
+    try:
+        return make_derivatives(assets, [asset_id], widths)[asset_id][width]
+    except (OSError, ValueError):
+        return assets.path(asset_id)
@@ -0,0 +1,275 @@
+import re
+import threading
+
+import numpy as np
+
+from furnicon import config
+
+# Sizes from the analysis' free-text "dimensions_str" ("48x50x90 cm"),
+# "seat_height" and "seat_width" ("45 cm"), parsed to cm when a product is
+# published (SIZE_COLUMNS on the products table), plus a sorted index of
+# those and price for Storefront range filters and sorts.
+
+SIZE_COLUMNS = ("width_cm", "depth_cm", "height_cm", "seat_height_cm", "seat_width_cm")
+
+UNITS = {
+    "mm": 0.1, "cm": 1.0, "m": 100.0,
+    "in": 2.54, "inch": 2.54, "inches": 2.54, '"': 2.54, "″": 2.54, "''": 2.54,
+    "ft": 30.48, "feet": 30.48, "'": 30.48, "′": 30.48,
+}
+# Labelled parts, e.g. "W48 x D50 x H90 cm", "H: 90cm, W: 48cm, D: 50cm"
+# or "Ø40 x 45H cm", or a trailing legend: "48x50x90 cm (LxWxH)". L (length)
+# is the long side, i.e. the width of a piece of furniture; next to it W
+# is the depth, as in the "LxWxH" the analysis prompt asks for.
+LABELS = {
+    "l": "length", "length": "length",
+    "w": "width", "width": "width",
+    "d": "depth", "depth": "depth",
+    "h": "height", "height": "height",
+    "ø": "diameter", "dia": "diameter", "diameter": "diameter",
+}
+
+_UNIT = "|".join(re.escape(u) for u in sorted(UNITS, key=len, reverse=True))
+_LABEL = "|".join(re.escape(label) for label in sorted(LABELS, key=len, reverse=True))
+_PART = re.compile(
+    rf"(?:(?P<before>{_LABEL})\s*[:=]?\s*)?(?P<number>\d+(?:[.,]\d+)?)\s*(?P<unit>{_UNIT})?"
+    rf"(?:\s*(?P<after>{_LABEL})\b(?:\s*(?P<unit_after>{_UNIT}))?)?"
+)
+_LEGEND = re.compile(rf"\(\s*((?:{_LABEL})(?:\s*[x×*]\s*(?:{_LABEL}))+)\s*\)\s*$")
+_SEPARATORS = re.compile(r"[\sx×*,;]*")
+
+
+def _parts(text):
+    # [(label or None, number in cm)], or None unless the text is only
+    # such parts between "x" or comma separators (and an optional legend).
+    text = text.strip().lower()
+    legend = _LEGEND.search(text)
+    if legend:
+        text = text[:legend.start()]
+        legend = [LABELS[label] for label in re.split(r"\s*[x×*]\s*", legend[1])]
+    parts, end = [], 0
+    for match in _PART.finditer(text):
+        if not _SEPARATORS.fullmatch(text, end, match.start()):
+            return None
+        label = match["before"] or match["after"]
+        unit = match["unit"] or match["unit_after"]
+        parts.append((LABELS.get(label), float(match["number"].replace(",", ".")), unit))
+        end = match.end()
+    if not parts or not _SEPARATORS.fullmatch(text, end):
+        return None
+    if legend:
+        if len(legend) != len(parts) or any(label for label, _, _ in parts):
+            return None
+        parts = [(label, number, unit) for label, (_, number, unit) in zip(legend, parts)]
+    # A unit applies to the numbers before it ("48 x 50 x 90 cm").
+    unit, out = config.DEFAULT_LENGTH_UNIT, []
+    for label, number, part_unit in reversed(parts):
+        unit = part_unit or unit
+        out.append((label, number * UNITS[unit]))
+    return out[::-1]
+
+
+def _plausible(cm):
+    return 0 < cm <= config.MAX_LENGTH_CM
+
+
+def parse_length(text):
+    # One length in cm ("45 cm", "17.5in", "450mm"), or None.
+    parts = _parts(str(text or ""))
+    if not parts or len(parts) != 1 or not _plausible(parts[0][1]):
+        return None
+    return round(parts[0][1], 1)
+
+
+def parse_dimensions(text):
+    # (width, depth, height) in cm from "LxWxH" text, or None. Parts are
+    # taken in that order unless every one is labelled; a diameter counts
+    # as both width and depth.
+    parts = _parts(str(text or ""))
+    if not parts or not all(_plausible(cm) for _, cm in parts):
+        return None
+    labels = [label for label, _ in parts]
+    if "length" in labels:
+        # "L x W x H": the length is the width, W the depth.
+        rename = {"length": "width", "width": "depth"}
+        labels = [rename.get(label, label) for label in labels]
+        parts = [(label, cm) for label, (_, cm) in zip(labels, parts)]
+    if len(parts) == 3 and not all(labels):
+        sizes = {"width": parts[0][1], "depth": parts[1][1], "height": parts[2][1]}
+    elif all(labels) and len(set(labels)) == len(labels):
+        sizes = {label: cm for label, cm in parts}
+        if "diameter" in sizes:
+            sizes.setdefault("width", sizes["diameter"])
+            sizes.setdefault("depth", sizes.pop("diameter"))
+    elif len(parts) == 2 and labels[0] == "diameter" and labels[1] in (None, "height"):
+        sizes = {"width": parts[0][1], "depth": parts[0][1], "height": parts[1][1]}
+    else:
+        return None
+    if set(sizes) != {"width", "depth", "height"}:
+        return None
+    return tuple(round(sizes[k], 1) for k in ("width", "depth", "height"))
+
+
+def measurements(product):
+    # ({size column: cm or None}, [text fields that are set but unreadable]).
+    sizes, unparsed = dict.fromkeys(SIZE_COLUMNS), []
+    text = str(product.get("dimensions_str") or "").strip()
+    if text:
+        parsed = parse_dimensions(text)
+        if parsed:
+            sizes["width_cm"], sizes["depth_cm"], sizes["height_cm"] = parsed
+        else:
+            unparsed.append("dimensions_str")
+    for field in ("seat_height", "seat_width"):
+        text = str(product.get(field) or "").strip()
+        if text:
+            sizes[f"{field}_cm"] = parse_length(text)
+            if sizes[f"{field}_cm"] is None:
+                unparsed.append(field)
+    return sizes, unparsed
+
+
+def unparsed(product):
+    # Text fields of a draft whose sizes couldn't be read, for the admin.
+    return measurements(product)[1]
+
+
+# --- INDEX ---
+class RangeIndex:
+    """Per-column sorted arrays of (value, product id), for ranges and sorts.
+
+    A range filter is two binary searches and a slice; a sort walks the
+    column's order keeping the products that passed the other filters.
+    Products without a value (unknown size) are left out of the column.
+    Small batches are inserted in place (one memmove of the arrays), large
+    ones rebuild the column with one lexsort.
+    """
+
+    def __init__(self, columns=tuple(c for c, _ in config.RANGES)):
+        self.columns = columns
+        self._values = {c: np.zeros(0) for c in columns}
+        self._ids = {c: np.zeros(0, dtype=np.int64) for c in columns}
+        self._current = {}  # product id -> values in `columns` order, to undo on edit
+
+    def __len__(self):
+        return len(self._current)
+
+    # --- WRITES ---
+    def add_batch(self, items):
+        # items: [(product id, values in `columns` order, or None to remove)].
+        old, new = {}, {}
+        for product_id, values in items:
+            previous = self._current.pop(product_id, None)
+            if previous is not None and product_id not in new:
+                old.setdefault(product_id, previous)
+            new.pop(product_id, None)
+            if values is not None:
+                new[product_id] = self._current[product_id] = tuple(values)
+        for i, column in enumerate(self.columns):
+            gone = [(v[i], product_id) for product_id, v in old.items() if v[i] is not None]
+            added = [(v[i], product_id) for product_id, v in new.items() if v[i] is not None]
+            if len(gone) + len(added) > len(self._ids[column]) // 8:
+                self._rebuild(column, i)
+            else:
+                self._remove(column, gone)
+                self._insert(column, added)
+
+    def _position(self, column, value, product_id):
+        # Index of (value, id) in the column's (value, id) order.
+        values, ids = self._values[column], self._ids[column]
+        lo = np.searchsorted(values, value, "left")
+        hi = np.searchsorted(values, value, "right")
+        return int(lo + np.searchsorted(ids[lo:hi], product_id))
+
+    def _remove(self, column, entries):
+        if entries:
+            at = [self._position(column, value, product_id) for value, product_id in entries]
+            self._values[column] = np.delete(self._values[column], at)
+            self._ids[column] = np.delete(self._ids[column], at)
+
+    def _insert(self, column, entries):
+        # Positions are all taken in the old arrays; np.insert keeps the
+        # given order among equal ones.
+        if entries:
+            entries = sorted(entries)
+            at = [self._position(column, value, product_id) for value, product_id in entries]
+            self._values[column] = np.insert(self._values[column], at, [value for value, _ in entries])
+            self._ids[column] = np.insert(self._ids[column], at, [product_id for _, product_id in entries])
+
+    def _rebuild(self, column, i):
+        pairs = [(product_id, v[i]) for product_id, v in self._current.items() if v[i] is not None]
+        ids = np.array([p for p, _ in pairs], dtype=np.int64)
+        values = np.array([v for _, v in pairs], dtype=np.float64)
+        order = np.lexsort((ids, values))
+        self._values[column], self._ids[column] = values[order], ids[order]
+
+    # --- QUERIES ---
+    def bounds(self, column):
+        # (lowest, highest) value in the catalog, or None.
+        values = self._values[column]
+        return (float(values[0]), float(values[-1])) if len(values) else None
+
+    def within(self, ranges):
+        # Ids (ascending) of products inside every {column: (low, high)}
+        # range; either end may be None. None if no range is set. Costs the
+        # size of the matching slices, not of the id space.
+        inside = None
+        for column, (low, high) in ranges.items():
+            if low is None and high is None:
+                continue
+            values = self._values[column]
+            lo = 0 if low is None else np.searchsorted(values, low, "left")
+            hi = len(values) if high is None else np.searchsorted(values, high, "right")
+            hit = np.sort(self._ids[column][lo:hi])
+            inside = hit if inside is None else np.intersect1d(inside, hit, assume_unique=True)
+        return inside
+
+    def order(self, column, ids, descending=False):
+        # `ids` sorted by the column's value (ties oldest first); products
+        # without a value come last.
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return ids
+        values, ordered = self._values[column], self._ids[column]
+        keep = np.isin(ordered, ids)
+        values, ordered = values[keep], ordered[keep]
+        if descending:
+            # Stable, so equal values keep their oldest-first order.
+            ordered = ordered[np.argsort(-values, kind="stable")]
+        return np.concatenate([ordered, np.setdiff1d(ids, ordered, assume_unique=True)])
+
+class CatalogRanges:
+    """RangeIndex of the catalog, kept in step through its product_changes log.
+
+    Like furnicon.facets.CatalogFacets, every call first applies changes
+    made since the last one by any process.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.index = RangeIndex()
+        self._columns = tuple(f"p.{c}" for c in self.index.columns)
+        self._seen = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        changes = self.catalog.changed_products(after=self._seen, columns=self._columns)
+        if changes:
+            self.index.add_batch([(product_id, values) for _, product_id, values in changes])
+            self._seen = changes[-1][0]
+
+    def bounds(self):
+        # {column: (lowest, highest) or None}, e.g. for input placeholders.
+        with self._lock:
+            self.refresh()
+            return {c: self.index.bounds(c) for c in self.index.columns}
+
+    def within(self, ranges):
+        with self._lock:
+            self.refresh()
+            return self.index.within(ranges)
+
+    def order(self, column, ids, descending=False):
+        with self._lock:
+            self.refresh()
+            return self.index.order(column, ids, descending)
@@ -0,0 +1,102 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from furnicon import config
+
+# Shared process pool for CPU-bound PIL work (decode, resize, encode), so
+# it runs on every core instead of serializing on the GIL of the Streamlit
+# or ingest process. Tasks are top-level functions that take and return
+# encoded bytes or file paths -- never PIL images -- so only buffers are
+# pickled across the process boundary.
+#
+# Workers are spawned rather than forked: the server process is full of
+# threads (jobs, Streamlit, SQLite connections) that must not be copied.
+
+_lock = threading.Lock()
+_pool = None
+_workers = config.IMAGE_WORKERS
+
+
+def configure(workers):
+    # 0 runs every task inline in the calling thread (no pool).
+    global _workers
+    shutdown()
+    _workers = workers
+
+
+def workers():
+    return _workers
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def _discard(pool):
+    # A worker died (e.g. OOM on a huge upload) and broke `pool`; the next
+    # task starts a fresh one. Other threads may have replaced it already.
+    global _pool
+    with _lock:
+        if _pool is not pool:
+            return
+        _pool = None
+    pool.shutdown(wait=False)
+
+
+def _submit(fn, *args):
+    # (pool, Future); inline mode hands back no pool and a resolved Future.
+    if _workers <= 0:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return None, future
+    pool = _get_pool()
+    try:
+        return pool, pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _discard(pool)
+        pool = _get_pool()
+        return pool, pool.submit(fn, *args)
+
+
+def _result(pool, future, fn, *args):
+    # A task lost with its worker is retried once on a fresh pool.
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        _discard(pool)
+        return _submit(fn, *args)[1].result()
+
+
+def submit(fn, *args):
+    # Returns a Future; inline mode hands back one that is already resolved.
+    return _submit(fn, *args)[1]
+
+
+def run(fn, *args):
+    return _result(*_submit(fn, *args), fn, *args)
+
+
+def map(fn, items):
+    # In order; all items are in flight at once.
+    items = list(items)
+    pending = [_submit(fn, item) for item in items]
+    return [_result(pool, future, fn, item) for (pool, future), item in zip(pending, items)]
@@ -0,0 +1,171 @@
+import base64
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from furnicon import imagepool
+
+# Payload sent to Gemini: longest side <= 1024 px, JPEG q85.
+MODEL_IMAGE_BOX = (1024, 1024)
+MODEL_IMAGE_QUALITY = 85
+
+
+# --- HELPER: SIZING ---
+def fit_size(size, box):
+    # Same rule as Image.thumbnail: keep aspect ratio, never upscale.
+    w, h = size
+    scale = min(box[0] / w, box[1] / h, 1.0)
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def encode_jpeg(image, quality=MODEL_IMAGE_QUALITY):
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buf = BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+# --- OPTIMIZE ---
+def optimize_image(image, box=MODEL_IMAGE_BOX, quality=MODEL_IMAGE_QUALITY):
+    # Resizes into a new image instead of copying the full-resolution
+    # bitmap first; reducing_gap lets PIL shrink with Image.reduce before
+    # the final resample.
+    target = fit_size(image.size, box)
+    if image.size != target:
+        image = image.resize(target, Image.Resampling.BICUBIC, reducing_gap=2.0)
+    return encode_jpeg(image, quality)
+
+
+def optimize_path(path, box=MODEL_IMAGE_BOX, quality=MODEL_IMAGE_QUALITY):
+    # JPEGs are decoded in draft mode (DCT scaling), so a 24 MP photo is
+    # never fully materialized for a 1024 px payload.
+    with Image.open(path) as image:
+        if image.format == "JPEG":
+            image.draft(None, fit_size(image.size, box))
+        return optimize_image(image, box, quality)
+
+
+@lru_cache(maxsize=64)
+def optimize_image_file(path, box=MODEL_IMAGE_BOX, quality=MODEL_IMAGE_QUALITY):
+    # Memoized per path: asset paths are content hashes, so a path always
+    # maps to the same bytes. The work itself runs on the image pool.
+    return imagepool.run(optimize_path, path, box, quality)
+
+
+# --- MODEL OUTPUT ---
+def decode_model_image(data):
+    # Inline image data from the model (raw bytes or base64 text) -> the
+    # encoded bytes, after checking they really are an image. Runs on the
+    # image pool; raises on corrupt payloads.
+    if isinstance(data, str):
+        data = base64.b64decode(data)
+    with Image.open(BytesIO(data)) as image:
+        image.verify()
+    return data
+
+
+# --- DERIVATIVES ---
+def encode_image(image, fmt, quality):
+    # WebP/AVIF keep alpha; JPEG gets the same RGB conversion as encode_jpeg.
+    if fmt == "JPEG":
+        return encode_jpeg(image, quality)
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    buf = BytesIO()
+    image.save(buf, format=fmt, quality=quality)
+    return buf.getvalue()
+
+
+def derivative_ladder(path, widths, fmt, quality):
+    # One decode for the whole ladder: JPEGs are drafted down to the largest
+    # width, then each smaller width is resized from the previous step.
+    # Returns {width: encoded bytes}; widths wider than the source keep its size.
+    widths = sorted(widths, reverse=True)
+    out = {}
+    with Image.open(path) as image:
+        if image.format == "JPEG":
+            image.draft(None, fit_size(image.size, (widths[0], image.size[1])))
+        image = ImageOps.exif_transpose(image)
+        for width in widths:
+            target = fit_size(image.size, (width, image.size[1]))
+            if image.size != target:
+                image = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=2.0)
+            out[width] = encode_image(image, fmt, quality)
+    return out
+
+
+# --- PERCEPTUAL HASH ---
+PHASH_SIZE = 32
+PHASH_KEEP = 8
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n):
+    # Orthonormal DCT-II basis; coeffs = D @ block @ D.T.
+    k = np.arange(n)[:, None]
+    d = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    d[0] /= np.sqrt(2.0)
+    return d
+
+
+def phash(image):
+    # 64-bit pHash: the 8x8 lowest DCT frequencies of a 32x32 grey thumbnail,
+    # one bit per coefficient above their median (DC excluded). Resizes,
+    # recompression and small crops or colour shifts move only a few bits.
+    grey = ImageOps.exif_transpose(image).convert("L").resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.LANCZOS)
+    d = _dct_matrix(PHASH_SIZE)
+    low = (d @ np.asarray(grey, dtype=np.float64) @ d.T)[:PHASH_KEEP, :PHASH_KEEP].ravel()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def phash_path(path):
+    # JPEGs are decoded at reduced scale (draft mode, >= 64 px); hashing a
+    # 12 MP photo then costs roughly its entropy decoding, tens of ms.
+    with Image.open(path) as image:
+        if image.format == "JPEG":
+            image.draft("L", (PHASH_SIZE * 2, PHASH_SIZE * 2))
+        return phash(image)
+
+
+# --- VISUAL FEATURES ---
+# "More like this" vectors: a coarse RGB colour histogram (what it looks
+# like) plus a tiny grey thumbnail (its shape and layout), each normalized
+# and weighted, then L2-normalized so cosine similarity is a dot product.
+FEATURE_BINS = 4           # per RGB channel -> 64 histogram bins
+FEATURE_THUMB = 8          # 8x8 grey thumbnail -> 64 values
+FEATURE_DIM = FEATURE_BINS ** 3 + FEATURE_THUMB ** 2
+FEATURE_COLOUR_WEIGHT = 0.6
+
+
+def visual_features(image):
+    # float32 vector of FEATURE_DIM, unit length.
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    small = np.asarray(image.resize((64, 64), Image.Resampling.BILINEAR), dtype=np.uint8)
+    bins = (small // (256 // FEATURE_BINS)).reshape(-1, 3).astype(np.int64)
+    codes = (bins[:, 0] * FEATURE_BINS + bins[:, 1]) * FEATURE_BINS + bins[:, 2]
+    hist = np.bincount(codes, minlength=FEATURE_BINS ** 3).astype(np.float32)
+    hist = np.sqrt(hist / hist.sum())  # Hellinger: unit length, tames dominant backgrounds
+
+    thumb = np.asarray(
+        image.convert("L").resize((FEATURE_THUMB, FEATURE_THUMB), Image.Resampling.BILINEAR), dtype=np.float32
+    ).ravel()
+    thumb -= thumb.mean()
+    norm = np.linalg.norm(thumb)
+    thumb = thumb / norm if norm else thumb
+
+    vector = np.concatenate([
+        hist * np.sqrt(FEATURE_COLOUR_WEIGHT), thumb * np.sqrt(1 - FEATURE_COLOUR_WEIGHT)
+    ]).astype(np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+def visual_features_path(path):
+    # Returns the raw float32 bytes (cheap to pickle back from the pool).
+    with Image.open(path) as image:
+        if image.format == "JPEG":
+            image.draft("RGB", (128, 128))
+        return visual_features(image).tobytes()
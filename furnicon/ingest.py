@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from furnicon import config, dedupe, derivatives, pipeline, similar, specs, tracing, usage
+from furnicon.assets import AssetStore
+from furnicon.catalog import CatalogStore
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+# --- SOURCES ---
+def iter_sources(path):
+    # Yields (name, read) pairs for every product photo in a folder (recursively)
+    # or a .zip archive; read() returns the file bytes and is safe to call from
+    # worker threads.
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        lock = threading.Lock()
+
+        def reader(member):
+            def read():
+                with lock:
+                    return archive.read(member)
+            return read
+
+        for member in sorted(archive.namelist()):
+            base = os.path.basename(member)
+            if base.lower().endswith(IMAGE_EXTENSIONS) and not base.startswith("."):
+                yield member, reader(member)
+        return
+
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Not a folder or zip archive: {path}")
+
+    def reader(file_path):
+        def read():
+            with open(file_path, "rb") as f:
+                return f.read()
+        return read
+
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS) and not name.startswith("."):
+                file_path = os.path.join(root, name)
+                yield os.path.relpath(file_path, path), reader(file_path)
+
+
+# --- INGEST ---
+def ingest_one(pipe, catalog, name, read, prompts, price, stock, skip_existing=True):
+    # Same steps as the Admin Bot: store the upload, analyze, render the
+    # angles, publish. Returns (status, product_id, generation errors).
+    # Each product gets its own trace, like an Admin Bot draft.
+    with tracing.trace(tracing.new_trace_id()) as trace_id, tracing.span("ingest.product"):
+        image_id = pipe.assets.put(read())
+        if skip_existing:
+            existing = catalog.find_by_source(image_id)
+            if existing is not None:
+                return "skipped", existing, []
+
+        ai_data = pipe.analyze(image_id)
+        if not ai_data:
+            raise RuntimeError("analysis returned no data")
+
+        sets, errors = pipe.variation_sets(image_id, prompts) if prompts else ([], [])
+        variations = pipeline.flatten_variation_sets(sets)
+        if prompts and not variations:
+            variations = [image_id]
+
+        product = {
+            **ai_data,
+            "brand": ai_data.get("brand_generic", ""),
+            "price": price,
+            "stock": stock,
+            "image_id": image_id,
+            "variation_sets": sets,
+            "variations": variations,
+            "source_file": name,
+            "trace_id": trace_id,
+            "phash": dedupe.source_hash(pipe.assets, image_id),
+            "visual_features": similar.product_features(pipe.assets, image_id),
+        }
+        derivatives.make_product_derivatives(pipe.assets, product)
+        return "published", catalog.add(specs.attach_spec_table(product)), errors
+
+
+def ingest(pipe, catalog, sources, prompts, workers=config.INGEST_WORKERS,
+           price=config.INGEST_PRICE, stock=config.INGEST_STOCK, skip_existing=True, on_result=None):
+    # Processes sources on a thread pool; on_result(name, status, detail) fires
+    # as each one finishes. Returns counts per status.
+    # Model calls are billed to the "ingest" session (see furnicon.usage).
+    counts = {"published": 0, "skipped": 0, "failed": 0}
+    with usage.session("ingest"), ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {
+            pool.submit(tracing.bind(ingest_one), pipe, catalog, name, read, prompts, price, stock, skip_existing): name
+            for name, read in sources
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                status, product_id, errors = future.result()
+                detail = {"product_id": product_id, "errors": errors}
+            except Exception as e:
+                status, detail = "failed", {"error": str(e)}
+            counts[status] += 1
+            if on_result:
+                on_result(name, status, detail)
+    return counts
+
+
+# --- CLI ---
+def add_arguments(parser):
+    parser.add_argument("source", help="folder of product photos or a .zip archive")
+    parser.add_argument("--workers", type=int, default=config.INGEST_WORKERS,
+                        help="products processed in parallel (default: %(default)s)")
+    parser.add_argument("--angles", default="default",
+                        help="comma-separated variation prompts, or 'default' (default: %(default)s)")
+    parser.add_argument("--no-variations", action="store_true", help="publish without generated angles")
+    parser.add_argument("--price", type=float, default=config.INGEST_PRICE)
+    parser.add_argument("--stock", type=int, default=config.INGEST_STOCK)
+    parser.add_argument("--no-skip-existing", dest="skip_existing", action="store_false",
+                        help="republish photos already in the catalog")
+
+
+def parse_angles(angles, no_variations=False):
+    # Mirrors the Admin Bot's instruction box.
+    if no_variations:
+        return []
+    instructions = [] if angles.strip().lower() == "default" else [x.strip() for x in angles.split(",") if x.strip()]
+    return [pipeline.match_default_prompt(p) or p for p in pipeline.resolve_prompts(instructions)]
+
+
+def run(args, client=None):
+    assets = AssetStore(config.ASSET_DIR)
+    catalog = CatalogStore(config.CATALOG_PATH, assets)
+    pipe = pipeline.Pipeline.from_config(client or pipeline.make_client(), assets)
+    prompts = parse_angles(args.angles, args.no_variations)
+    sources = list(iter_sources(args.source))
+
+    total = len(sources)
+    done = [0]
+    started = time.time()
+
+    def report(name, status, detail):
+        done[0] += 1
+        if status == "failed":
+            note = detail["error"]
+        else:
+            note = f"#{detail['product_id']}"
+            if detail["errors"]:
+                note += f" ({len(detail['errors'])} angle(s) failed: {detail['errors'][0][1]})"
+        print(f"[{done[0]}/{total}] {status:<9} {name} {note}", flush=True)
+
+    print(f"Ingesting {total} photo(s) from {args.source} with {args.workers} worker(s)", flush=True)
+    counts = ingest(
+        pipe, catalog, sources, prompts, workers=args.workers,
+        price=args.price, stock=args.stock, skip_existing=args.skip_existing, on_result=report,
+    )
+    print(
+        f"Done in {time.time() - started:.1f}s: {counts['published']} published, "
+        f"{counts['skipped']} skipped, {counts['failed']} failed",
+        flush=True,
+    )
+    return 1 if counts["failed"] else 0
+
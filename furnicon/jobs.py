@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+
+from furnicon import tracing
+from furnicon.db import SQLiteStore
+
+JOB_MIGRATIONS = [
+    """
+    CREATE TABLE jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        owner TEXT NOT NULL DEFAULT '',
+        status TEXT NOT NULL DEFAULT 'queued',
+        params TEXT NOT NULL DEFAULT '{}',
+        progress REAL NOT NULL DEFAULT 0,
+        message TEXT NOT NULL DEFAULT '',
+        result TEXT,
+        error TEXT,
+        worker TEXT,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        heartbeat_at REAL
+    );
+    CREATE INDEX idx_jobs_status ON jobs(status, id);
+    CREATE INDEX idx_jobs_owner ON jobs(owner, id);
+    CREATE TABLE drafts (
+        token TEXT PRIMARY KEY,
+        state TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """,
+    # Partial results streamed by a running job (e.g. analysis fields).
+    """
+    ALTER TABLE jobs ADD COLUMN partial TEXT;
+    ALTER TABLE jobs ADD COLUMN first_partial_at REAL;
+    """,
+    # Times a job was claimed, so one that keeps killing its worker stops
+    # being requeued.
+    """
+    ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0;
+    """,
+]
+
+
+# --- QUEUE ---
+class JobQueue(SQLiteStore):
+    """Durable job table for AI work, plus the Admin Bot drafts that own the jobs.
+
+    Jobs are claimed atomically, so several worker pools (threads in one
+    server, or other processes sharing the file) can drain the same queue.
+    """
+
+    MIGRATIONS = JOB_MIGRATIONS
+
+    def __init__(self, path, stale_after=60, max_attempts=3):
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Event()
+        super().__init__(path)
+
+    def submit(self, kind, params, owner=""):
+        with self.transaction() as conn:
+            cur = conn.execute(
+                "INSERT INTO jobs (kind, owner, params, created_at) VALUES (?, ?, ?, ?)",
+                (kind, owner, json.dumps(params), time.time()),
+            )
+        self.wake()
+        return cur.lastrowid
+
+    def claim(self, worker):
+        now = time.time()
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (worker, now, now, row["id"]),
+            )
+        return self.get(row["id"])
+
+    def wake(self):
+        self._wakeup.set()
+
+    def wait_for_work(self, timeout):
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+
+    def progress(self, job_id, progress, message="", partial=None):
+        now = time.time()
+        with self.transaction() as conn:
+            if partial is None:
+                conn.execute(
+                    "UPDATE jobs SET progress = ?, message = ?, heartbeat_at = ? WHERE id = ?",
+                    (progress, message, now, job_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET progress = ?, message = ?, heartbeat_at = ?, partial = ?, "
+                    "first_partial_at = COALESCE(first_partial_at, ?) WHERE id = ?",
+                    (progress, message, now, json.dumps(partial), now, job_id),
+                )
+
+    def heartbeat(self, job_ids):
+        if not job_ids:
+            return
+        marks = ", ".join("?" for _ in job_ids)
+        with self.transaction() as conn:
+            conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({marks})", [time.time(), *job_ids]
+            )
+
+    def complete(self, job_id, result):
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', progress = 1, result = ?, finished_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                (json.dumps(result), time.time(), job_id),
+            )
+
+    def fail(self, job_id, error):
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                (error, time.time(), job_id),
+            )
+
+    def cancel(self, job_id):
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id),
+            )
+
+    def requeue_stale(self):
+        # Jobs whose worker stopped heartbeating (server restart, crash)
+        # go back to the queue instead of hanging in "running" forever,
+        # unless they have used up max_attempts: then they fail.
+        now = time.time()
+        cutoff = now - self.stale_after
+        with self.transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', worker = NULL, finished_at = ?, "
+                "error = 'Gave up after ' || attempts || ' attempts: the worker stopped responding.' "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (now, cutoff, self.max_attempts),
+            )
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL "
+                "WHERE status = 'running' AND heartbeat_at < ?",
+                (cutoff,),
+            )
+        if cur.rowcount:
+            self.wake()
+        return cur.rowcount
+
+    def get(self, job_id):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def active(self, owner=None):
+        sql = "SELECT * FROM jobs WHERE status IN ('queued', 'running')"
+        params = []
+        if owner is not None:
+            sql += " AND owner = ?"
+            params.append(owner)
+        rows = self._connect().execute(sql + " ORDER BY id", params).fetchall()
+        return [self._row_to_job(r) for r in rows]
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["partial"] = json.loads(job["partial"]) if job["partial"] is not None else None
+        return job
+
+    # --- DRAFTS ---
+    def save_draft(self, token, state):
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO drafts (token, state, updated_at) VALUES (?, ?, ?)",
+                (token, json.dumps(state), time.time()),
+            )
+
+    def load_draft(self, token):
+        row = self._connect().execute("SELECT state FROM drafts WHERE token = ?", (token,)).fetchone()
+        return json.loads(row["state"]) if row else None
+
+    def delete_draft(self, token):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM drafts WHERE token = ?", (token,))
+
+
+# --- WORKERS ---
+class JobContext:
+    # Handed to job handlers: progress reporting and cooperative cancellation.
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+
+    def report(self, progress, message="", partial=None):
+        self.queue.progress(self.job_id, progress, message, partial)
+
+    def cancelled(self):
+        job = self.queue.get(self.job_id)
+        return job is None or job["status"] == "cancelled"
+
+
+class JobWorkers:
+    """Background threads that drain a JobQueue.
+
+    `handlers` maps job kind -> fn(params, ctx) returning a JSON-able
+    result; ctx is a JobContext for progress and cancellation checks.
+    """
+
+    def __init__(self, queue, handlers, workers=4, poll_interval=1.0, heartbeat_interval=10.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.name = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"furnicon-job-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        self._threads.append(threading.Thread(target=self._beat, name="furnicon-job-heartbeat", daemon=True))
+        queue.requeue_stale()
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self._stop.set()
+        self.queue.wake()
+
+    def _work(self):
+        while not self._stop.is_set():
+            job = self.queue.claim(self.name)
+            if job is None:
+                self.queue.wait_for_work(self.poll_interval)
+                continue
+            with self._lock:
+                self._running.add(job["id"])
+            # Jobs carry the trace id of the product they work on, if any.
+            trace_id = job["params"].get("trace_id")
+            tracing.TRACER.record(
+                f"job.{job['kind']}.queued", job["started_at"] - job["created_at"], trace_id=trace_id
+            )
+            try:
+                handler = self.handlers[job["kind"]]
+                with tracing.trace(trace_id), tracing.span(f"job.{job['kind']}"):
+                    result = handler(job["params"], JobContext(self.queue, job["id"]))
+                self.queue.complete(job["id"], result)
+            except Exception as e:
+                self.queue.fail(job["id"], f"{e}\n\n{traceback.format_exc()}")
+            finally:
+                with self._lock:
+                    self._running.discard(job["id"])
+
+    def _beat(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                running = list(self._running)
+            try:
+                self.queue.heartbeat(running)
+                self.queue.requeue_stale()
+            except Exception:
+                traceback.print_exc()
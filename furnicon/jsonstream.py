@@ -0,0 +1,109 @@
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+# --- INCREMENTAL PARSER ---
+class JSONObjectStream:
+    """Incremental parser for a streamed top-level JSON object.
+
+    feed() takes the next chunk of text and returns the members whose
+    values completed in it, e.g. {"title": "..."} as soon as the closing
+    quote of the title arrives. Nested values are returned whole once
+    their closing bracket is seen. Text before the opening brace (such as
+    a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self._pos = 0
+        self._state = "start"   # start -> key -> colon -> value -> comma ... -> end
+        self._key = None
+        self._value_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text):
+        self.buffer += text
+        completed = {}
+        buf = self.buffer
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+            state = self._state
+
+            if state == "start":
+                if ch == "{":
+                    self._state = "key"
+            elif state == "key":
+                if ch == '"':
+                    self._value_start = self._pos
+                    self._state = "key_string"
+                elif ch == "}":
+                    self._state = "end"
+            elif state == "key_string":
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._key = json.loads(buf[self._value_start:self._pos + 1])
+                    self._state = "colon"
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value"
+            elif state == "value":
+                if ch not in _WHITESPACE:
+                    self._value_start = self._pos
+                    self._depth = 0
+                    self._in_string = False
+                    self._state = "value_body"
+                    continue
+            elif state == "value_body":
+                done_at = self._scan_value(ch)
+                if done_at is not None:
+                    raw = buf[self._value_start:done_at].strip()
+                    value = json.loads(raw)
+                    self.fields[self._key] = completed[self._key] = value
+                    self._state = "comma"
+                    if done_at == self._pos:
+                        # Scalar ended by the delimiter itself; re-read it.
+                        continue
+            elif state == "comma":
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "end"
+            self._pos += 1
+        return completed
+
+    def _scan_value(self, ch):
+        # Returns the end offset (exclusive) once the current value is complete.
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    return self._pos + 1
+            return None
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            if self._depth == 0:
+                return self._pos
+            self._depth -= 1
+            if self._depth == 0:
+                return self._pos + 1
+        elif ch == "," and self._depth == 0:
+            return self._pos
+        return None
+
+    @property
+    def done(self):
+        return self._state == "end"
@@ -0,0 +1,438 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from furnicon import config, imagepool, standin, tracing, usage
+from furnicon.assets import AssetStore
+from furnicon.cache import NegativeCache, ResultCache, SingleFlight, make_key
+from furnicon.imaging import decode_model_image, optimize_image_file
+from furnicon.jsonstream import JSONObjectStream
+from furnicon.ratelimit import call_with_limiter, limits_for
+from furnicon.usage import UsageLedger
+
+try:
+    from google import genai
+    from google.genai import types
+except ImportError:  # reported by make_client(); the pages stop earlier in utils
+    genai = types = None
+
+# --- 1. TEXT ANALYST (Gemini 2.5 Flash) ---
+# Bump ANALYSIS_PROMPT_VERSION whenever ANALYSIS_PROMPT changes so cached
+# results from the old prompt are no longer served.
+ANALYSIS_MODEL = 'gemini-2.5-flash'
+ANALYSIS_PROMPT_VERSION = 1
+ANALYSIS_FIELDS = [
+    "title", "description", "brand_generic", "category", "colour", "frame_material", "style",
+    "furniture_finish", "seat_height", "seat_width", "leg_style", "dimensions_str",
+]
+ANALYSIS_PROMPT = """
+Analyze this product image for an Amazon listing.
+Return a pure JSON object with these EXACT keys:
+{
+    "title": "SEO Product Title",
+    "description": "3-sentence technical description",
+    "brand_generic": "Suggested Brand Name",
+    "category": "General Category (e.g. Chair)",
+    "colour": "Main Color",
+    "frame_material": "Material",
+    "style": "Style",
+    "furniture_finish": "Finish",
+    "seat_height": "Height",
+    "seat_width": "Width",
+    "leg_style": "Leg Type",
+    "dimensions_str": "LxWxH cm"
+}
+"""
+
+# --- 2. IMAGE GENERATION (Gemini 2.5 Flash Image) ---
+# STRICTLY USING GEMINI 2.5 FLASH IMAGE
+GENERATION_MODEL = 'gemini-2.5-flash-image'
+DEFAULT_VARIATION_PROMPTS = [
+    "View from the left side profile",
+    "View from the right side profile",
+    "Close up texture detail"
+]
+
+
+# --- CLIENT ---
+def load_api_key(secrets_path=config.SECRETS_PATH):
+    # Same key the Streamlit app reads via st.secrets; the environment wins.
+    key = os.environ.get("GOOGLE_API_KEY")
+    if key or not os.path.exists(secrets_path):
+        return key
+    with open(secrets_path, "rb") as f:
+        raw = f.read()
+    try:
+        import tomllib
+        return tomllib.loads(raw.decode("utf-8")).get("GOOGLE_API_KEY")
+    except ImportError:  # Python < 3.11
+        match = re.search(r'^\s*GOOGLE_API_KEY\s*=\s*["\']([^"\']*)["\']', raw.decode("utf-8"), re.M)
+        return match.group(1) if match else None
+
+
+def make_fake_client():
+    return standin.FakeClient(
+        latency_scale=config.FAKE_LATENCY_SCALE, failure_rate=config.FAKE_FAILURE_RATE,
+        rate_limit_rate=config.FAKE_RATE_LIMIT_RATE, image_size=config.FAKE_IMAGE_SIZE,
+        i2i_unsupported=config.FAKE_I2I_UNSUPPORTED,
+    )
+
+
+def make_client(api_key=None, mode=None):
+    # mode defaults to config.MODEL_CLIENT; "replay" and "fake" work offline.
+    mode = mode or config.MODEL_CLIENT
+    if genai is None:
+        raise RuntimeError("Library missing. Please run: pip install -r requirements.txt")
+    if mode == "fake":
+        return make_fake_client()
+    if mode == "replay":
+        return standin.ReplayClient(
+            config.RECORDINGS_DIR,
+            fallback=make_fake_client() if config.REPLAY_FALLBACK_FAKE else None,
+            latency_scale=config.REPLAY_LATENCY_SCALE,
+        )
+    if mode not in ("live", "record"):
+        raise RuntimeError(f"Unknown model client {mode!r} (live, record, replay or fake)")
+    api_key = api_key or load_api_key()
+    if not api_key:
+        raise RuntimeError(f"Missing GOOGLE_API_KEY (set the env var or {config.SECRETS_PATH})")
+    client = genai.Client(api_key=api_key)
+    if mode == "record":
+        return standin.RecordingClient(client, config.RECORDINGS_DIR)
+    return client
+
+
+# --- HELPER: PROMPTS ---
+def normalize_prompt(user_prompt):
+    return " ".join(user_prompt.lower().split()).rstrip(".")
+
+
+def match_default_prompt(user_prompt):
+    # "Left side profile" -> "View from the left side profile", so custom
+    # instructions can reuse speculative default renders. Only unambiguous
+    # matches of two or more words count.
+    wanted = normalize_prompt(user_prompt)
+    defaults = [(d, normalize_prompt(d)) for d in DEFAULT_VARIATION_PROMPTS]
+    for default, norm in defaults:
+        if wanted == norm:
+            return default
+    if len(wanted.split()) < 2:
+        return None
+    matches = [d for d, norm in defaults if f" {wanted} " in f" {norm} "]
+    return matches[0] if len(matches) == 1 else None
+
+
+def resolve_prompts(user_instructions=None):
+    if user_instructions and len(user_instructions) > 0:
+        return list(user_instructions)
+    return list(DEFAULT_VARIATION_PROMPTS)
+
+
+def flatten_variation_sets(sets):
+    return [a for _, ids in sets for a in ids]
+
+
+# --- HELPER: CAPABILITY ERRORS ---
+def unsupported_error_class(error):
+    # "400 INVALID_ARGUMENT"-style class for API errors that reject the
+    # request itself (and will again); None for throttling, server errors,
+    # timeouts and anything else worth retrying as-is.
+    code = getattr(error, "code", None)
+    if code not in (400, 403, 404):
+        return None
+    return f"{code} {getattr(error, 'status', None) or ''}".strip()
+
+
+# Models that refused image+text input, shared by every Pipeline in the
+# process so one refusal spares all later prompts the doomed request.
+I2I_REFUSALS = NegativeCache(config.I2I_UNSUPPORTED_TTL, config.I2I_PROBE_SECONDS)
+
+
+# --- HELPER: MODEL IMAGE OUTPUT ---
+def save_inline_images(response, assets):
+    # Model output goes straight to the asset store as encoded bytes; base64
+    # decoding and validation run on the image pool, off this thread's GIL.
+    payloads = []
+    if hasattr(response, 'parts'):
+        for part in response.parts:
+            if part.inline_data:
+                payloads.append(part.inline_data.data)
+    with tracing.span("decode", images=len(payloads)):
+        return [assets.put(data) for data in imagepool.map(decode_model_image, payloads)]
+
+
+# --- PIPELINE ---
+class Pipeline:
+    """Analysis and variation generation, independent of Streamlit.
+
+    Takes an injectable genai-style client (anything with
+    `models.generate_content` / `models.generate_content_stream`) plus the
+    stores it reads and writes. Methods raise or return errors instead of
+    reporting them, and accept progress callbacks, so the same code backs
+    the Admin Bot jobs and the headless ingest CLI. With a UsageLedger,
+    every model call is billed and checked against the spend limits.
+    """
+
+    def __init__(self, client, assets, analysis_cache, variation_cache, usage=None):
+        self.client = client
+        self.assets = assets
+        self.analysis_cache = analysis_cache
+        self.variation_cache = variation_cache
+        self.usage = usage
+        self.i2i_refusals = I2I_REFUSALS
+        # Identical (image, prompt, model) requests in flight at the same time --
+        # e.g. a speculative default angle and the user's real request -- share one call.
+        self.variation_flights = SingleFlight()
+
+    @classmethod
+    def from_config(cls, client, assets=None):
+        return cls(
+            client,
+            assets or AssetStore(config.ASSET_DIR),
+            ResultCache(
+                config.CACHE_PATH, "analysis",
+                ttl=config.ANALYSIS_CACHE_TTL, max_entries=config.ANALYSIS_CACHE_MAX_ENTRIES,
+            ),
+            ResultCache(
+                config.CACHE_PATH, "variations",
+                ttl=config.VARIATION_CACHE_TTL, max_entries=config.VARIATION_CACHE_MAX_ENTRIES,
+            ),
+            UsageLedger(config.USAGE_PATH),
+        )
+
+    # --- USAGE ---
+    def check_budget(self, model):
+        # Raises usage.BudgetExceeded before a call that would overspend.
+        if self.usage is not None:
+            self.usage.check(model)
+
+    def bill(self, model, path, response):
+        if self.usage is not None:
+            self.usage.record(model, path, response)
+
+    def optimized_image_bytes(self, image_id):
+        # Computed once per source asset (see furnicon.imaging.optimize_image_file)
+        # and shared by analysis and every generation call.
+        with tracing.span("optimize"):
+            return optimize_image_file(self.assets.path(image_id))
+
+    # --- ANALYSIS ---
+    def analyze(self, image_id, on_fields=None):
+        # The response is streamed and on_fields(fields_so_far) fires as each
+        # key completes.
+        if not self.client: return {}
+
+        with tracing.span("analyze") as span:
+            return self._analyze(image_id, on_fields, span)
+
+    def _analyze(self, image_id, on_fields, span):
+        image_bytes = self.optimized_image_bytes(image_id)
+
+        cache_key = make_key(image_bytes, ANALYSIS_PROMPT_VERSION, ANALYSIS_MODEL)
+        cached = self.analysis_cache.get(cache_key)
+        span.attrs["cache"] = "hit" if cached is not None else "miss"
+        if cached is not None:
+            if on_fields: on_fields(cached)
+            return cached
+
+        def stream_analysis():
+            parser = JSONObjectStream()
+            text = ""
+            chunk = None
+            for chunk in self.client.models.generate_content_stream(
+                model=ANALYSIS_MODEL,
+                contents=[
+                    types.Content(
+                        role="user",
+                        parts=[
+                            types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg"),
+                            types.Part.from_text(text=ANALYSIS_PROMPT)
+                        ]
+                    )
+                ],
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json"
+                )
+            ):
+                if not chunk.text:
+                    continue
+                text += chunk.text
+                if parser.feed(chunk.text) and on_fields:
+                    on_fields(dict(parser.fields))
+            # The last chunk carries the usage totals for the whole stream.
+            self.bill(ANALYSIS_MODEL, "analyze", chunk)
+            return text
+
+        self.check_budget(ANALYSIS_MODEL)
+        ai_data = json.loads(call_with_limiter(ANALYSIS_MODEL, tracing.timed("analyze.model", stream_analysis)))
+        if ai_data:
+            self.analysis_cache.set(cache_key, ai_data)
+        return ai_data
+
+    # --- GENERATION ---
+    def generate_single_variation(self, image_bytes, user_prompt, target_model=GENERATION_MODEL):
+        full_prompt = f"Generate a photorealistic product image of THIS exact object. {user_prompt}. White background. Maintain same colors and materials. High Fidelity."
+        self.check_budget(target_model)
+
+        def text_to_image():
+            # Text-to-Image fallback with the same model, for tiers or inputs
+            # where the model rejects the input image bytes.
+            response = call_with_limiter(target_model, tracing.timed("generate.t2i", lambda: self.client.models.generate_content(
+                model=target_model,
+                contents=[
+                    types.Content(
+                        role="user",
+                        parts=[
+                            types.Part.from_text(text=full_prompt)
+                        ]
+                    )
+                ],
+                config={ "response_modalities": ["IMAGE"] }
+            )))
+            self.bill(target_model, "t2i", response)
+            return save_inline_images(response, self.assets), "t2i"
+
+        # Once the model has refused I2I as unsupported, skip the doomed
+        # request until the refusal expires or a periodic probe gets through.
+        skip_i2i, refused = self.i2i_refusals.skip(target_model)
+        if skip_i2i:
+            tracing.event("generate.i2i_skipped", model=target_model, error=refused)
+            return text_to_image()
+        probe = {"probe": refused} if refused else {}
+
+        try:
+            # We attempt to send the image + text.
+            # If 2.5-flash-image supports I2I on your tier, this works best.
+            # If it fails (400), we catch it and try text-only below.
+            response = call_with_limiter(target_model, tracing.timed("generate.i2i", lambda: self.client.models.generate_content(
+                model=target_model,
+                contents=[
+                    types.Content(
+                        role="user",
+                        parts=[
+                            types.Part.from_text(text=full_prompt),
+                            types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg")
+                        ]
+                    )
+                ],
+                config={ "response_modalities": ["IMAGE"] }
+            ), **probe))
+
+            self.bill(target_model, "i2i", response)
+            if refused:
+                self.i2i_refusals.clear(target_model)
+
+            # --- PARSING LOGIC FOR GEMINI 2.5 ---
+            # Gemini returns images in parts[].inline_data, NOT .generated_images
+            return save_inline_images(response, self.assets), "i2i"
+
+        except Exception as e:
+            # A failed probe keeps the refusal (and pushes the next probe
+            # out) even when this particular error was transient.
+            error_class = unsupported_error_class(e) or refused
+            if error_class:
+                self.i2i_refusals.mark(target_model, error_class)
+            return text_to_image()
+
+    def variation_cache_key(self, image_bytes, user_prompt, target_model, mode):
+        return make_key(image_bytes, normalize_prompt(user_prompt), target_model, mode)
+
+    def cached_variation(self, image_bytes, user_prompt, target_model):
+        # Prefer an image+text result; fall back to a cached text-only one.
+        for mode in ("i2i", "t2i"):
+            asset_ids = self.variation_cache.get(
+                self.variation_cache_key(image_bytes, user_prompt, target_model, mode)
+            )
+            if asset_ids and all(self.assets.exists(a) for a in asset_ids):
+                return asset_ids
+        return None
+
+    def variation_sets(self, image_id, prompts, regenerate=(), on_progress=None, should_cancel=None):
+        # Returns ([[prompt, [asset ids]], ...], [[prompt, error], ...]) in prompt
+        # order. Prompts already generated for this source image are served from
+        # the variation cache unless listed in `regenerate`. on_progress(done, total)
+        # fires per prompt and prompts not yet started are skipped once
+        # should_cancel() returns True.
+        if not self.client: return [[p, []] for p in prompts], []
+
+        image_bytes = self.optimized_image_bytes(image_id)
+        regenerate = {normalize_prompt(p) for p in regenerate}
+        target_model = GENERATION_MODEL
+
+        def produce(user_prompt):
+            asset_ids, mode = self.generate_single_variation(image_bytes, user_prompt, target_model)
+            if asset_ids:
+                self.variation_cache.set(
+                    self.variation_cache_key(image_bytes, user_prompt, target_model, mode), asset_ids
+                )
+            return asset_ids
+
+        def run(user_prompt):
+            fresh = normalize_prompt(user_prompt) in regenerate
+            if not fresh:
+                hit = self.cached_variation(image_bytes, user_prompt, target_model)
+                if hit:
+                    return hit, None
+            if should_cancel and should_cancel():
+                return [], None
+            try:
+                if fresh:
+                    return produce(user_prompt), None
+                flight_key = make_key(image_bytes, normalize_prompt(user_prompt), target_model)
+                return self.variation_flights.do(flight_key, lambda: produce(user_prompt)), None
+            except Exception as e:
+                return [], e
+            finally:
+                if config.GENERATION_MODE == "fixed_sleep":
+                    time.sleep(config.FIXED_SLEEP_SECONDS) # Pause for rate limits
+
+        # Fan out; the shared per-model limiter paces admissions and
+        # results are slotted back by index to keep prompt order.
+        if config.GENERATION_MODE == "fixed_sleep":
+            workers = 1
+        else:
+            workers = max(1, min(limits_for(target_model)["concurrency"], len(prompts)))
+        results = [None] * len(prompts)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(tracing.bind(run), p): i for i, p in enumerate(prompts)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if on_progress:
+                    on_progress(done, len(prompts))
+
+        sets, errors = [], []
+        for user_prompt, (asset_ids, error) in zip(prompts, results):
+            if error is not None:
+                errors.append([user_prompt, str(error)])
+            sets.append([user_prompt, asset_ids])
+        return sets, errors
+
+    # --- BACKGROUND JOB HANDLERS ---
+    # Jobs bill their model calls to params["session"], the submitting
+    # browser session.
+    def analysis_job(self, params, ctx):
+        ctx.report(0.1, "Analyzing geometry & specs")
+        total = len(ANALYSIS_FIELDS)
+        with usage.session(params.get("session")):
+            return self.analyze(
+                params["image_id"],
+                on_fields=lambda fields: ctx.report(
+                    min(len(fields) / total, 0.99), f"{len(fields)}/{total} fields", partial=fields
+                ),
+            )
+
+    def generation_job(self, params, ctx):
+        prompts = params["prompts"]
+        ctx.report(0.0, f"0/{len(prompts)} angles")
+        with usage.session(params.get("session")):
+            sets, errors = self.variation_sets(
+                params["image_id"], prompts, params.get("regenerate", ()),
+                on_progress=lambda done, total: ctx.report(done / total, f"{done}/{total} angles"),
+                should_cancel=ctx.cancelled,
+            )
+        return {"sets": sets, "errors": errors}
+
+    def job_handlers(self):
+        return {"analyze": self.analysis_job, "generate": self.generation_job}
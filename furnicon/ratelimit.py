@@ -0,0 +1,104 @@
+import re
+import threading
+import time
+
+from furnicon import config, tracing
+
+
+# --- HELPER: THROTTLE DETECTION ---
+# A 429 in the message only counts as the leading status code or next to a
+# status keyword, so ids, sizes or prices containing "429" aren't mistaken
+# for throttling.
+_STATUS_429 = re.compile(
+    r"^\s*429\b|\b(?:HTTP|status|code|error)\W{0,3}429\b|\b429\s+Too Many Requests\b", re.IGNORECASE
+)
+
+
+def is_rate_limit_error(error):
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    text = str(error)
+    return "RESOURCE_EXHAUSTED" in text or _STATUS_429.search(text) is not None
+
+
+# --- TOKEN BUCKET ---
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate adapts to the quota the API actually grants.
+
+    Starts at the configured RPM, halves on every 429/RESOURCE_EXHAUSTED and
+    creeps back up by 10% of the ceiling per successful call (AIMD).
+    """
+
+    def __init__(self, rpm, burst=1, min_rpm=1):
+        self.max_rate = rpm / 60.0
+        self.min_rate = min(min_rpm, rpm) / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+    def on_throttle(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * 0.5)
+            # Drop any saved-up burst so in-flight workers back off too.
+            self.tokens = min(self.tokens, 0.0)
+
+    @property
+    def rpm(self):
+        return self.rate * 60.0
+
+
+# --- REGISTRY ---
+# One limiter per model per process, shared by every session and worker.
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limits_for(model):
+    return {**config.DEFAULT_MODEL_LIMITS, **config.MODEL_LIMITS.get(model, {})}
+
+
+def limiter_for(model):
+    with _limiters_lock:
+        if model not in _limiters:
+            limits = limits_for(model)
+            _limiters[model] = AdaptiveRateLimiter(limits["rpm"], burst=limits["concurrency"])
+        return _limiters[model]
+
+
+def call_with_limiter(model, fn, retries=3):
+    limiter = limiter_for(model)
+    for attempt in range(retries + 1):
+        with tracing.span("ratelimit.wait", model=model):
+            limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            if is_rate_limit_error(e) and attempt < retries:
+                limiter.on_throttle()
+                continue
+            raise
+        limiter.on_success()
+        return result
@@ -0,0 +1,227 @@
+import threading
+
+import numpy as np
+
+from furnicon import config, imagepool
+from furnicon.assets import AssetStore
+from furnicon.catalog import CatalogStore
+from furnicon.imaging import FEATURE_DIM, visual_features_path
+
+# "More like this": every published product has a visual feature vector
+# (furnicon.imaging.visual_features) in the catalog; the Storefront asks
+# SimilarIndex for the nearest ones by cosine similarity.
+
+
+def product_features(assets, image_id):
+    # float32 bytes for the catalog, computed on the image pool.
+    return imagepool.run(visual_features_path, assets.path(image_id))
+
+
+def _top_k(scores, rows, k):
+    # (scores, rows) of the k best, best first.
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        scores, rows = scores[best], rows[best]
+    order = np.argsort(-scores, kind="stable")
+    return scores[order], rows[order]
+
+
+# --- INDEX ---
+class VectorIndex:
+    """Unit vectors in one growable float32 matrix, searched by inner product.
+
+    Below `ivf_min` vectors a query is one brute-force matmul. From there an
+    IVF layer is trained (k-means on a sample, ~sqrt(n) lists) on a
+    background thread, and queries scan only the `nprobe` lists whose
+    centroids are nearest; until it is ready, brute force keeps serving.
+    add() appends the row and files it under its nearest centroid -- no
+    rebuild -- and the lists are retrained only once the index has grown
+    by `retrain_growth` since the last training.
+    """
+
+    def __init__(self, dim=FEATURE_DIM, ivf_min=config.SIMILAR_IVF_MIN, nprobe=config.SIMILAR_NPROBE,
+                 retrain_growth=2.0, capacity=1024, seed=0):
+        self.dim = dim
+        self.ivf_min = ivf_min
+        self.nprobe = nprobe
+        self.retrain_growth = retrain_growth
+        self.seed = seed
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.full(capacity, -1, dtype=np.int64)  # -1: replaced row
+        self._rows = {}  # item id -> row
+        self._size = 0
+        self._lock = threading.Lock()
+        # IVF state, swapped in whole by the trainer.
+        self._centroids = None
+        self._assign = np.empty(0, dtype=np.int32)  # IVF list of each row
+        self._lists = None  # list id -> np.array of rows (built lazily)
+        self._trained_size = 0
+        self._training = False
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def mode(self):
+        return "ivf" if self._centroids is not None else "brute"
+
+    # --- WRITES ---
+    def add(self, item_id, vector):
+        vector = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            old = self._rows.get(item_id)
+            if old is not None:
+                self._ids[old] = -1
+            if self._size == len(self._vectors):
+                grow = len(self._vectors)
+                self._vectors = np.concatenate([self._vectors, np.zeros((grow, self.dim), dtype=np.float32)])
+                self._ids = np.concatenate([self._ids, np.full(grow, -1, dtype=np.int64)])
+            row = self._size
+            self._vectors[row] = vector
+            self._ids[row] = item_id
+            self._rows[item_id] = row
+            self._size += 1
+            if self._centroids is not None:
+                nearest = int(np.argmax(self._centroids @ vector))
+                self._assign = np.append(self._assign, np.int32(nearest))
+                if self._lists is not None:
+                    self._lists[nearest] = np.append(self._lists[nearest], row)
+        self._maybe_train()
+
+    # --- QUERIES ---
+    def vector(self, item_id):
+        row = self._rows.get(item_id)
+        return None if row is None else self._vectors[row]
+
+    def query(self, vector, k, exclude=None):
+        # [(score, item id)] of the k most similar, best first.
+        vector = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            size, vectors, ids = self._size, self._vectors, self._ids
+            centroids, lists = self._centroids, self._ivf_lists()
+        if centroids is None:
+            rows = np.arange(size)
+            scores = vectors[:size] @ vector
+        else:
+            probe = np.argpartition(-(centroids @ vector), min(self.nprobe, len(centroids)) - 1)[:self.nprobe]
+            rows = np.concatenate([lists[p] for p in probe])
+            scores = vectors[rows] @ vector
+        live = ids[rows] >= 0
+        if exclude is not None:
+            live &= ids[rows] != exclude
+        scores, rows = _top_k(scores[live], rows[live], k)
+        return [(float(s), int(ids[r])) for s, r in zip(scores, rows)]
+
+    def _ivf_lists(self):
+        # Called with the lock held.
+        if self._centroids is None:
+            return None
+        if self._lists is None:
+            order = np.argsort(self._assign, kind="stable")
+            bounds = np.searchsorted(self._assign[order], np.arange(len(self._centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        return self._lists
+
+    # --- IVF TRAINING ---
+    def _maybe_train(self):
+        with self._lock:
+            size = len(self._rows)
+            due = size >= self.ivf_min and (
+                self._centroids is None or size >= self._trained_size * self.retrain_growth
+            )
+            if not due or self._training:
+                return
+            self._training = True
+        threading.Thread(target=self._train, name="furnicon-similar-ivf", daemon=True).start()
+
+    def train(self):
+        # Synchronous training, for benchmarks and CLIs.
+        with self._lock:
+            self._training = True
+        self._train()
+
+    def _train(self, sample=20000, iterations=10):
+        try:
+            with self._lock:
+                size = self._size
+                vectors = self._vectors[:size].copy()
+            rng = np.random.default_rng(self.seed)
+            nlist = max(1, int(np.sqrt(size)))
+            pick = rng.choice(size, min(size, max(sample, nlist * 8)), replace=False)
+            train = vectors[pick]
+            centroids = train[rng.choice(len(train), nlist, replace=False)].copy()
+            for _ in range(iterations):
+                nearest = np.argmax(train @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, nearest, train)
+                counts = np.bincount(nearest, minlength=nlist)[:, None]
+                # Spherical k-means; empty lists keep their old centroid.
+                centroids = np.where(counts > 0, sums, centroids)
+                centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+            assign = np.empty(size, dtype=np.int32)
+            for start in range(0, size, 8192):
+                assign[start:start + 8192] = np.argmax(vectors[start:start + 8192] @ centroids.T, axis=1)
+            with self._lock:
+                # Rows added while training get filed under the new centroids.
+                if self._size > size:
+                    extra = self._vectors[size:self._size] @ centroids.T
+                    assign = np.concatenate([assign, np.argmax(extra, axis=1).astype(np.int32)])
+                self._centroids, self._assign, self._lists = centroids, assign, None
+                self._trained_size = len(self._rows)
+        finally:
+            with self._lock:
+                self._training = False
+
+
+class SimilarIndex:
+    """VectorIndex of the catalog's visual features, kept in step with it.
+
+    Like dedupe.DuplicateIndex, each query first pulls rows stored since the
+    last one, so products published by any process show up incrementally.
+    """
+
+    def __init__(self, catalog, index=None):
+        self.catalog = catalog
+        self.index = index or VectorIndex()
+        self._seen = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        with self._lock:
+            for row_id, product_id, vector in self.catalog.visual_features(after=self._seen):
+                self.index.add(product_id, np.frombuffer(vector, dtype=np.float32))
+                self._seen = max(self._seen, row_id)
+
+    def similar(self, product_id, k=config.SIMILAR_COUNT):
+        # [(score, product id)] most like product_id, excluding itself.
+        self.refresh()
+        vector = self.index.vector(product_id)
+        if vector is None:
+            return []
+        return self.index.query(vector, k, exclude=product_id)
+
+
+# --- BACKFILL ---
+def backfill(catalog, assets, on_progress=None):
+    # Features for products published before they were stored.
+    missing = catalog.products_without_features()
+    for start in range(0, len(missing), 256):
+        batch = missing[start:start + 256]
+        vectors = imagepool.map(visual_features_path, [assets.path(image_id) for _, image_id in batch])
+        for (product_id, _), vector in zip(batch, vectors):
+            catalog.set_visual_features(product_id, vector)
+        if on_progress:
+            on_progress(start + len(batch), len(missing))
+    return len(missing)
+
+
+# --- CLI ---
+def run(args):
+    # `python -m furnicon features`
+    assets = AssetStore(config.ASSET_DIR)
+    added = backfill(
+        CatalogStore(config.CATALOG_PATH, assets), assets,
+        on_progress=lambda done, total: print(f"[{done}/{total}] featurized", flush=True),
+    )
+    print(f"Done: {added} product(s) featurized", flush=True)
+    return 0
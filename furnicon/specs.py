@@ -0,0 +1,47 @@
+import html
+
+# "Technical Details" rows shown on the Storefront, in display order.
+# Bump SPEC_TABLE_VERSION whenever the labels or markup change so tables
+# stored with older products are rebuilt on render.
+SPEC_TABLE_VERSION = 1
+SPEC_LABELS = [
+    ("colour", "Colour"),
+    ("frame_material", "Frame Material"),
+    ("style", "Style"),
+    ("furniture_finish", "Finish"),
+    ("seat_height", "Seat Height"),
+    ("seat_width", "Seat Width"),
+    ("leg_style", "Leg Style"),
+    ("dimensions_str", "Dimensions"),
+]
+
+
+def spec_rows(product):
+    # Empty values are dropped, as the old per-render DataFrame did.
+    return [[label, str(product[key])] for key, label in SPEC_LABELS if product.get(key)]
+
+
+def render_spec_table(rows):
+    body = "".join(
+        f"<tr><th>{html.escape(label)}</th><td>{html.escape(value)}</td></tr>" for label, value in rows
+    )
+    return (
+        '<table class="spec-table"><thead><tr><th>Feature</th><th>Details</th></tr></thead>'
+        f"<tbody>{body}</tbody></table>"
+    )
+
+
+def attach_spec_table(product):
+    # Called once at publish time; the rows and markup are stored with the product.
+    product["spec_rows"] = spec_rows(product)
+    product["spec_table"] = render_spec_table(product["spec_rows"])
+    product["spec_version"] = SPEC_TABLE_VERSION
+    return product
+
+
+def spec_table(product):
+    # Stored markup when it is current, otherwise rebuilt from the fields
+    # (products published before the table was precomputed).
+    if product.get("spec_version") == SPEC_TABLE_VERSION and product.get("spec_table"):
+        return product["spec_table"]
+    return render_spec_table(spec_rows(product))
@@ -0,0 +1,319 @@
+import base64
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from io import BytesIO
+from math import exp, log
+
+from PIL import Image
+
+from furnicon import config
+
+try:
+    from google.genai import errors, types
+except ImportError:  # make_client() reports the missing library
+    errors = types = None
+
+# Stand-ins for the genai client, selected with FURNICON_MODEL_CLIENT (see
+# pipeline.make_client). Each exposes the two calls the pipeline makes,
+# `models.generate_content` and `models.generate_content_stream`, and
+# returns real google.genai response types, so nothing downstream can tell
+# it is not talking to Gemini.
+
+
+# --- HELPER: REQUEST KEYS ---
+def _jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return value
+
+
+def request_key(kind, model, contents, config=None):
+    # Same request (including inline image bytes) -> same key.
+    payload = {"kind": kind, "model": model, "contents": _jsonable(contents), "config": _jsonable(config)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _request_parts(contents):
+    # (texts, image bytes) from a request's contents.
+    texts, images = [], []
+    for content in contents or []:
+        for part in getattr(content, "parts", None) or []:
+            if part.text:
+                texts.append(part.text)
+            if part.inline_data:
+                images.append(part.inline_data.data)
+    return texts, images
+
+
+def _api_error(code, message):
+    status = {429: "RESOURCE_EXHAUSTED", 400: "INVALID_ARGUMENT"}.get(code, "INTERNAL")
+    cls = errors.ClientError if code < 500 else errors.ServerError
+    return cls(code, {"error": {"code": code, "message": message, "status": status}})
+
+
+# --- RECORDINGS ---
+class Recordings:
+    """Request/response pairs on disk, one JSON file per request key.
+
+    Files live at <root>/<first two hex chars>/<key>.json and hold the
+    response (or API error) as google.genai serializes it, inline image
+    data included as base64, plus the observed latency.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self.path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, record):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class _Models:
+    # Routes the client's `models.*` calls to the owning stand-in.
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, model, contents, config=None):
+        return self._owner.generate_content(model, contents, config)
+
+    def generate_content_stream(self, model, contents, config=None):
+        return self._owner.generate_content_stream(model, contents, config)
+
+
+class RecordingClient:
+    """Passes calls through to a live client and records every exchange."""
+
+    def __init__(self, client, root):
+        self.client = client
+        self.recordings = Recordings(root)
+        self.models = _Models(self)
+
+    def _record(self, key, model, started, response=None, chunks=None, error=None):
+        record = {"model": model, "latency": time.monotonic() - started}
+        if error is not None:
+            record["error"] = {"code": getattr(error, "code", None) or 500, "message": str(error)}
+        elif chunks is not None:
+            record["chunks"] = [_jsonable(c) for c in chunks]
+        else:
+            record["response"] = _jsonable(response)
+        self.recordings.put(key, record)
+
+    def generate_content(self, model, contents, config=None):
+        key = request_key("generate", model, contents, config)
+        started = time.monotonic()
+        try:
+            response = self.client.models.generate_content(model=model, contents=contents, config=config)
+        except Exception as e:
+            self._record(key, model, started, error=e)
+            raise
+        self._record(key, model, started, response=response)
+        return response
+
+    def generate_content_stream(self, model, contents, config=None):
+        key = request_key("stream", model, contents, config)
+        started = time.monotonic()
+        chunks = []
+        try:
+            for chunk in self.client.models.generate_content_stream(model=model, contents=contents, config=config):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            self._record(key, model, started, error=e)
+            raise
+        self._record(key, model, started, chunks=chunks)
+
+
+class ReplayClient:
+    """Serves recorded responses; never touches the network.
+
+    Requests with no recording raise, or go to `fallback` (e.g. a
+    FakeClient) when one is given. With `latency_scale` > 0 each reply is
+    delayed by its recorded latency times the scale.
+    """
+
+    def __init__(self, root, fallback=None, latency_scale=0.0):
+        self.recordings = Recordings(root)
+        self.fallback = fallback
+        self.latency_scale = latency_scale
+        self.models = _Models(self)
+
+    def _lookup(self, kind, model, contents, config):
+        record = self.recordings.get(request_key(kind, model, contents, config))
+        if record is None:
+            if self.fallback is None:
+                raise LookupError(f"No recording for this {model} request in {self.recordings.root}")
+            return None
+        if self.latency_scale > 0:
+            time.sleep(record.get("latency", 0) * self.latency_scale)
+        if "error" in record:
+            raise _api_error(record["error"]["code"], record["error"]["message"])
+        return record
+
+    def generate_content(self, model, contents, config=None):
+        record = self._lookup("generate", model, contents, config)
+        if record is None:
+            return self.fallback.models.generate_content(model=model, contents=contents, config=config)
+        return types.GenerateContentResponse.model_validate(record["response"])
+
+    def generate_content_stream(self, model, contents, config=None):
+        record = self._lookup("stream", model, contents, config)
+        if record is None:
+            yield from self.fallback.models.generate_content_stream(model=model, contents=contents, config=config)
+            return
+        for chunk in record["chunks"]:
+            yield types.GenerateContentResponse.model_validate(chunk)
+
+
+# --- SYNTHETIC FAKE ---
+# Token accounting as Gemini reports it: a fixed charge per input image, and
+# generated images billed as output tokens.
+FAKE_TOKENS_PER_IMAGE_INPUT = 258
+FAKE_TOKENS_PER_IMAGE_OUTPUT = 1290
+
+FAKE_ANALYSIS_VALUES = {
+    "category": ["Chair", "Stool", "Armchair", "Bench", "Side Table"],
+    "colour": ["Walnut", "Oak", "Black", "Grey", "Ivory"],
+    "frame_material": ["Solid Oak", "Steel", "Beech", "Rattan", "Walnut Veneer"],
+    "style": ["Mid-Century", "Scandinavian", "Industrial", "Contemporary"],
+    "furniture_finish": ["Matte", "Oiled", "Lacquered", "Powder Coated"],
+    "leg_style": ["Tapered", "Hairpin", "Sled", "Turned"],
+}
+
+
+class FakeClient:
+    """Synthetic Gemini: plausible answers with configurable timing and faults.
+
+    Latency per call is log-normal with the given median and p95 (seconds,
+    per model, times latency_scale). A `rate_limit_rate` share of calls
+    raise 429 RESOURCE_EXHAUSTED and a `failure_rate` share raise 500s.
+    Analysis answers are derived from the image bytes, so the same photo
+    always gets the same listing; image calls return a PNG of image_size px.
+    Responses carry usage_metadata with Gemini-like token counts. With
+    i2i_unsupported, image requests that include an input image are refused
+    with a 400, like tiers without image+text support.
+    """
+
+    def __init__(self, latency=None, latency_scale=1.0, failure_rate=0.0, rate_limit_rate=0.0,
+                 image_size=512, stream_chunks=8, seed=None, i2i_unsupported=False):
+        self.latency = config.FAKE_LATENCY if latency is None else latency
+        self.latency_scale = latency_scale
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.image_size = image_size
+        self.i2i_unsupported = i2i_unsupported
+        self.stream_chunks = max(1, stream_chunks)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.models = _Models(self)
+
+    def _delay(self, model):
+        spec = self.latency.get(model) or self.latency.get("default") or {"median": 0, "p95": 0}
+        if self.latency_scale <= 0 or spec["median"] <= 0:
+            return 0.0
+        sigma = log(max(spec["p95"], spec["median"]) / spec["median"]) / 1.645
+        with self._lock:
+            return spec["median"] * exp(self._rng.gauss(0, sigma)) * self.latency_scale
+
+    def _maybe_fail(self, model):
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            raise _api_error(429, f"Resource has been exhausted (fake quota for {model}).")
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise _api_error(500, f"Internal error encountered (fake failure for {model}).")
+
+    def _analysis(self, images):
+        digest = hashlib.sha256(images[0] if images else b"").digest()
+        pick = lambda field, i: FAKE_ANALYSIS_VALUES[field][digest[i] % len(FAKE_ANALYSIS_VALUES[field])]
+        category, colour, material = pick("category", 0), pick("colour", 1), pick("frame_material", 2)
+        style = pick("style", 3)
+        height, width = 40 + digest[4] % 40, 40 + digest[5] % 20
+        return {
+            "title": f"{style} {colour} {material} {category}",
+            "description": (
+                f"A {style.lower()} {category.lower()} with a {material.lower()} frame in {colour.lower()}. "
+                f"Seat height {height} cm. Ships flat-packed with all fittings."
+            ),
+            "brand_generic": "Furnicon Basics",
+            "category": category,
+            "colour": colour,
+            "frame_material": material,
+            "style": style,
+            "furniture_finish": pick("furniture_finish", 6),
+            "seat_height": f"{height} cm",
+            "seat_width": f"{width} cm",
+            "leg_style": pick("leg_style", 7),
+            "dimensions_str": f"{width + 8}x{width + 10}x{height + 40} cm",
+        }
+
+    def _usage(self, texts, images, output_tokens):
+        input_tokens = FAKE_TOKENS_PER_IMAGE_INPUT * len(images) + sum(len(t) for t in texts) // 4
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=input_tokens, candidates_token_count=output_tokens,
+            total_token_count=input_tokens + output_tokens,
+        )
+
+    def _image(self, texts):
+        digest = hashlib.sha256("\n".join(texts).encode("utf-8")).digest()
+        buf = BytesIO()
+        Image.new("RGB", (self.image_size, self.image_size), tuple(digest[:3])).save(buf, "PNG")
+        return buf.getvalue()
+
+    def generate_content(self, model, contents, config=None):
+        texts, images = _request_parts(contents)
+        if images and self.i2i_unsupported:
+            time.sleep(self._delay(model) * 0.1)
+            raise _api_error(400, f"Image input is not supported for {model} on this tier (fake).")
+        time.sleep(self._delay(model))
+        self._maybe_fail(model)
+        part = types.Part.from_bytes(data=self._image(texts), mime_type="image/png")
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))],
+            usage_metadata=self._usage(texts, images, FAKE_TOKENS_PER_IMAGE_OUTPUT),
+        )
+
+    def generate_content_stream(self, model, contents, config=None):
+        texts, images = _request_parts(contents)
+        total = self._delay(model)
+        self._maybe_fail(model)
+        text = json.dumps(self._analysis(images))
+        size = -(-len(text) // self.stream_chunks)
+        for start in range(0, len(text), size):
+            time.sleep(total / self.stream_chunks)
+            part = types.Part.from_text(text=text[start:start + size])
+            last = start + size >= len(text)
+            yield types.GenerateContentResponse(
+                candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))],
+                usage_metadata=self._usage(texts, images, len(text) // 4) if last else None,
+            )
@@ -0,0 +1,249 @@
+import bisect
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from furnicon import config
+
+# Lightweight per-stage tracing. Every span feeds an in-process latency
+# histogram for its stage and lands in a ring buffer of recent spans, tagged
+# with the current trace id (one per product, from upload to publish).
+# Nothing here talks to the network; pages/Performance.py reads the
+# histograms and exports them as Prometheus text or JSON lines.
+
+_trace_id = contextvars.ContextVar("furnicon_trace_id", default=None)
+
+
+# --- TRACE IDS ---
+def new_trace_id():
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+@contextmanager
+def trace(trace_id):
+    # Spans opened inside belong to trace_id; None keeps the current one.
+    if trace_id is None:
+        yield current_trace_id()
+        return
+    token = _trace_id.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _trace_id.reset(token)
+
+
+def bind(fn):
+    # Carries the caller's trace id (and any other context variables) into
+    # fn when it runs on another thread; thread pools do not inherit them.
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+# --- HISTOGRAMS ---
+class Histogram:
+    """Cumulative latency histogram with fixed bucket bounds (seconds).
+
+    Quantiles are estimated by linear interpolation inside the bucket that
+    holds the rank, as Prometheus' histogram_quantile does.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def snapshot(self):
+        copy = Histogram(self.bounds)
+        copy.counts, copy.count, copy.sum, copy.max = list(self.counts), self.count, self.sum, self.max
+        return copy
+
+
+# --- REGISTRY ---
+class Tracer:
+    """Histograms per (stage, status) plus the most recent spans.
+
+    One instance per process (TRACER below), shared by every session, job
+    worker and ingest thread. With `log_path` set, finished spans are also
+    appended to that file as JSON lines.
+    """
+
+    def __init__(self, bounds=config.TRACE_BUCKETS, recent=config.TRACE_RECENT_SPANS, log_path=None):
+        self.bounds = tuple(bounds)
+        self.histograms = {}
+        self.recent = deque(maxlen=recent)
+        self.log_path = log_path
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, status="ok", trace_id=None, start=None, attrs=None):
+        record = {
+            "trace_id": trace_id,
+            "stage": stage,
+            "status": status,
+            "start": start if start is not None else time.time() - seconds,
+            "duration_ms": round(seconds * 1000, 3),
+        }
+        if attrs:
+            record["attrs"] = attrs
+        with self._lock:
+            key = (stage, status)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self.bounds)
+            self.histograms[key].observe(seconds)
+            self.recent.append(record)
+            if self.log_path:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.recent.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        # {(stage, status): Histogram} copied under the lock.
+        with self._lock:
+            return {key: h.snapshot() for key, h in self.histograms.items()}
+
+    def spans(self, trace_id=None):
+        with self._lock:
+            spans = list(self.recent)
+        if trace_id is not None:
+            spans = [s for s in spans if s["trace_id"] == trace_id]
+        return spans
+
+    def summary(self):
+        # One row per stage: counts and latency percentiles in ms, all statuses merged.
+        merged = {}
+        for (stage, status), h in self.snapshot().items():
+            row = merged.setdefault(stage, {"stage": stage, "errors": 0, "hist": Histogram(self.bounds)})
+            if status != "ok":
+                row["errors"] += h.count
+            row["hist"].counts = [a + b for a, b in zip(row["hist"].counts, h.counts)]
+            row["hist"].count += h.count
+            row["hist"].sum += h.sum
+            row["hist"].max = max(row["hist"].max, h.max)
+        rows = []
+        for stage in sorted(merged):
+            h = merged[stage].pop("hist")
+            rows.append({
+                **merged[stage],
+                "count": h.count,
+                "mean_ms": h.sum / h.count * 1000,
+                "p50_ms": h.quantile(0.5) * 1000,
+                "p95_ms": h.quantile(0.95) * 1000,
+                "p99_ms": h.quantile(0.99) * 1000,
+                "max_ms": h.max * 1000,
+            })
+        return rows
+
+    # --- EXPORT ---
+    def prometheus_text(self, name="furnicon_stage_duration_seconds"):
+        lines = [
+            f"# HELP {name} Time spent per pipeline stage.",
+            f"# TYPE {name} histogram",
+        ]
+        for (stage, status), h in sorted(self.snapshot().items()):
+            labels = f'stage="{_escape_label(stage)}",status="{_escape_label(status)}"'
+            cumulative = 0
+            for bound, n in zip(self.bounds + (float("inf"),), h.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum!r}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def json_lines(self, trace_id=None):
+        return "".join(json.dumps(s) + "\n" for s in self.spans(trace_id))
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+TRACER = Tracer(log_path=config.TRACE_LOG or None)
+
+
+# --- SPANS ---
+class Span:
+    # Started on creation; finish() records it once. Prefer span() unless
+    # the start and end live in different places (e.g. a page rerun).
+
+    def __init__(self, stage, trace_id=None, tracer=None, **attrs):
+        self.stage = stage
+        self.attrs = attrs
+        self.tracer = tracer or TRACER
+        self.trace_id = trace_id or current_trace_id()
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.seconds = None
+
+    def finish(self, status="ok"):
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self._started
+            self.tracer.record(self.stage, self.seconds, status, self.trace_id, self.start, self.attrs)
+        return self.seconds
+
+
+@contextmanager
+def span(stage, **attrs):
+    # Streamlit's rerun/stop signals are BaseExceptions, not failures.
+    s = Span(stage, **attrs)
+    try:
+        yield s
+    except Exception:
+        s.finish("error")
+        raise
+    finally:
+        s.finish()
+
+
+def timed(stage, fn, **attrs):
+    # fn wrapped in a span; for callables handed to call_with_limiter and pools.
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with span(stage, **attrs):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def event(stage, **attrs):
+    # Zero-length span: counts something that happened (e.g. a skipped call).
+    TRACER.record(stage, 0.0, trace_id=current_trace_id(), attrs=attrs)
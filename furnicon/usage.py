@@ -0,0 +1,159 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+from furnicon import config, tracing
+from furnicon.db import SQLiteStore
+
+USAGE_MIGRATIONS = [
+    """
+    CREATE TABLE model_calls (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        at REAL NOT NULL,
+        model TEXT NOT NULL,
+        path TEXT NOT NULL,
+        trace_id TEXT NOT NULL DEFAULT '',
+        session TEXT NOT NULL DEFAULT '',
+        input_tokens INTEGER NOT NULL DEFAULT 0,
+        output_tokens INTEGER NOT NULL DEFAULT 0,
+        images INTEGER NOT NULL DEFAULT 0,
+        cost REAL NOT NULL DEFAULT 0
+    );
+    CREATE INDEX idx_model_calls_at ON model_calls(at);
+    CREATE INDEX idx_model_calls_session ON model_calls(session, at);
+    CREATE INDEX idx_model_calls_trace ON model_calls(trace_id);
+    """,
+]
+
+# Session the current model calls are billed to (an Admin Bot browser
+# session, or "ingest"); the product is the current tracing trace id.
+_session = contextvars.ContextVar("furnicon_usage_session", default=None)
+
+
+@contextmanager
+def session(name):
+    # None keeps the current one.
+    if name is None:
+        yield current_session()
+        return
+    token = _session.set(name)
+    try:
+        yield name
+    finally:
+        _session.reset(token)
+
+
+def current_session():
+    return _session.get()
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+# --- PRICING ---
+def call_cost(model, input_tokens, output_tokens):
+    # USD, from config.MODEL_PRICING (per million tokens).
+    price = config.MODEL_PRICING.get(model) or config.DEFAULT_MODEL_PRICING
+    return (input_tokens * price["input"] + output_tokens * price["output"]) / 1e6
+
+
+def response_usage(response):
+    # (input tokens, output tokens incl. thinking, inline images) of a
+    # response; for a stream pass the last chunk, which carries the totals.
+    meta = getattr(response, "usage_metadata", None)
+    input_tokens = getattr(meta, "prompt_token_count", None) or 0
+    output_tokens = (getattr(meta, "candidates_token_count", None) or 0) + (
+        getattr(meta, "thoughts_token_count", None) or 0
+    )
+    images = sum(1 for part in (getattr(response, "parts", None) or []) if part.inline_data)
+    return input_tokens, output_tokens, images
+
+
+def day_start(now=None):
+    # Local midnight; daily budgets reset there.
+    t = time.localtime(now)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+# --- LEDGER ---
+class UsageLedger(SQLiteStore):
+    """Tokens, images and cost of every model call, by product, session and model.
+
+    Also enforces the spend limits in config: check() raises BudgetExceeded
+    once a session or the whole day is over budget. With BUDGET_ACTION
+    "downgrade", models in BUDGET_DOWNGRADE_MODELS (the cheap text model)
+    keep running and only the others are stopped. Limits are checked before
+    each call, so calls already in flight can overshoot by up to the
+    model's concurrency.
+    """
+
+    MIGRATIONS = USAGE_MIGRATIONS
+
+    def __init__(self, path, session_budget=None, daily_budget=None, action=None):
+        self.session_budget = config.SESSION_BUDGET_USD if session_budget is None else session_budget
+        self.daily_budget = config.DAILY_BUDGET_USD if daily_budget is None else daily_budget
+        self.action = action or config.BUDGET_ACTION
+        super().__init__(path)
+
+    def record(self, model, path, response):
+        input_tokens, output_tokens, images = response_usage(response)
+        cost = call_cost(model, input_tokens, output_tokens)
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO model_calls (at, model, path, trace_id, session, input_tokens, output_tokens, "
+                "images, cost) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), model, path, tracing.current_trace_id() or "", current_session() or "",
+                 input_tokens, output_tokens, images, cost),
+            )
+        return cost
+
+    # --- BUDGETS ---
+    def spent(self, session=None, since=None):
+        sql, params = "SELECT COALESCE(SUM(cost), 0) FROM model_calls WHERE at >= ?", [since or 0]
+        if session is not None:
+            sql += " AND session = ?"
+            params.append(session)
+        return self._connect().execute(sql, params).fetchone()[0]
+
+    def over_budget(self, session=None):
+        # Reason string when a limit is hit, else None. 0 means no limit.
+        session = session if session is not None else current_session()
+        if self.daily_budget:
+            today = self.spent(since=day_start())
+            if today >= self.daily_budget:
+                return f"daily model budget of ${self.daily_budget:.2f} used (${today:.2f})"
+        if self.session_budget and session:
+            used = self.spent(session)
+            if used >= self.session_budget:
+                return f"session model budget of ${self.session_budget:.2f} used (${used:.2f})"
+        return None
+
+    def check(self, model):
+        # Called before every model request.
+        if not (self.daily_budget or self.session_budget):
+            return
+        if self.action == "downgrade" and model in config.BUDGET_DOWNGRADE_MODELS:
+            return
+        reason = self.over_budget()
+        if reason:
+            raise BudgetExceeded(f"Budget exceeded: {reason}; {model} calls are paused.")
+
+    # --- REPORTS ---
+    def totals(self, since=None, group_by=("model", "path")):
+        cols = ", ".join(group_by)
+        rows = self._connect().execute(
+            f"SELECT {cols}, COUNT(*) AS calls, SUM(input_tokens) AS input_tokens, "
+            f"SUM(output_tokens) AS output_tokens, SUM(images) AS images, SUM(cost) AS cost "
+            f"FROM model_calls WHERE at >= ? GROUP BY {cols} ORDER BY cost DESC",
+            (since or 0,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def product_costs(self, since=None):
+        # {trace_id: cost}; products carry their trace id (see Admin Bot / ingest).
+        rows = self._connect().execute(
+            "SELECT trace_id, SUM(cost) FROM model_calls WHERE at >= ? AND trace_id != '' GROUP BY trace_id",
+            (since or 0,),
+        ).fetchall()
+        return {trace_id: cost for trace_id, cost in rows}
@@ -1,7 +1,9 @@
 import streamlit as st
 import utils
-from PIL import Image
+import time
+import uuid
 import pandas as pd
+from furnicon import config, specs
 
 st.set_page_config(page_title="Admin Bot", page_icon="🍌")
 st.title("Furnicon Chat")
@@ -15,49 +17,228 @@ if "global_error" in st.session_state:
         del st.session_state["global_error"]
         st.rerun()
 
+# --- MODEL BUDGET ---
+# Over the session or daily limit, jobs fail fast (or, with
+# FURNICON_BUDGET_ACTION=downgrade, only image generation stops).
+over_budget = utils.budget_status()
+if over_budget:
+    paused = "Image generation is" if config.BUDGET_ACTION == "downgrade" else "Model calls are"
+    st.warning(f"💸 {over_budget[0].upper()}{over_budget[1:]}. {paused} paused.")
+
+# --- DRAFT PERSISTENCE ---
+# Chat, status and job ids are saved under a token kept in the URL, so a
+# browser refresh reattaches to the same draft and its background jobs.
+DRAFT_KEYS = (
+    "messages", "bot_status", "draft_data", "pending_job", "pending_note", "speculative_jobs", "step_started_at",
+    "duplicates"
+)
+
+if "draft_token" not in st.session_state:
+    token = st.query_params.get("draft")
+    saved = utils.load_draft(token) if token else None
+    if saved:
+        st.session_state.update(saved)
+    else:
+        token = uuid.uuid4().hex[:12]
+    st.session_state.draft_token = token
+    st.query_params["draft"] = token
+
+def persist_draft():
+    utils.save_draft(
+        st.session_state.draft_token,
+        {k: st.session_state[k] for k in DRAFT_KEYS if k in st.session_state}
+    )
+
+def trace_id():
+    # One trace per product, minted at upload and carried by its jobs.
+    return st.session_state.get("draft_data", {}).get("trace_id")
+
+def advance(status):
+    # Each state-machine step (waits on background jobs and the admin
+    # included) is recorded as one span under the product's trace.
+    now = time.time()
+    utils.tracer.record(
+        f"admin_bot.{st.session_state.bot_status}",
+        now - st.session_state.get("step_started_at", now), trace_id=trace_id()
+    )
+    render.finish()
+    st.session_state.bot_status = status
+    st.session_state.step_started_at = now
+    persist_draft()
+    st.rerun()
+
+def new_draft():
+    # The current draft stays saved (with any running jobs) under its token.
+    for k in DRAFT_KEYS + ("draft_token",):
+        st.session_state.pop(k, None)
+    st.query_params.clear()
+    st.rerun()
+
+def job_finished(job):
+    if job and job["status"] == "failed":
+        utils.log_error(f"Background {job['kind']} job", job["error"])
+    st.session_state.pending_job = None
+    return (job or {}).get("result")
+
+@st.fragment(run_every=config.JOB_POLL_SECONDS)
+def watch_pending_job(on_done, render_partial=None):
+    # Polls the job row only; the full page reruns once, when the job ends.
+    job = utils.get_job(st.session_state.pending_job)
+    if job and job["status"] in ("queued", "running"):
+        st.progress(job["progress"], text=job["message"] or "Queued...")
+        if render_partial and job["partial"]:
+            render_partial(job["partial"])
+        return
+    on_done(job_finished(job))
+
+FIELD_LABELS = {
+    "title": "Title", "description": "Description", "brand_generic": "Brand",
+    "category": "Category", "colour": "Colour", "frame_material": "Material",
+    "style": "Style", "furniture_finish": "Finish", "seat_height": "Seat Height",
+    "seat_width": "Seat Width", "leg_style": "Leg Style", "dimensions_str": "Dimensions"
+}
+
+def render_analysis_fields(fields):
+    # Streamed analysis: fields show up here as soon as the model emits them.
+    st.markdown("\n".join(f"- **{FIELD_LABELS.get(k, k)}:** {v}" for k, v in fields.items()))
+
+# --- JOBS IN FLIGHT ---
+with st.sidebar:
+    st.caption(f"Model spend this session: ${utils.session_spend():.3f}")
+    st.markdown("### Drafts in flight")
+    if st.button("➕ New product"):
+        new_draft()
+
+    @st.fragment(run_every=config.JOB_POLL_SECONDS * 5)
+    def show_active_jobs():
+        jobs = utils.get_active_jobs()
+        if not jobs:
+            st.caption("No background jobs running.")
+        for job in jobs:
+            kind = "Prefetch" if job["params"].get("speculative") else job["kind"].title()
+            label = f"{kind} · {job['message'] or job['status']}"
+            if job["owner"] == st.session_state.draft_token:
+                st.caption(f"▶ {label} (this draft)")
+            else:
+                st.markdown(f"[{label}](?draft={job['owner']})")
+
+    show_active_jobs()
+
 # --- CHAT STATE ---
 if "messages" not in st.session_state:
     st.session_state.messages = [{"role": "assistant", "content": "👋 Hi! Upload a product image to start."}]
 if "bot_status" not in st.session_state:
     st.session_state.bot_status = "awaiting_upload" 
+    st.session_state.step_started_at = time.time()
 if "draft_data" not in st.session_state:
     st.session_state.draft_data = {}
 
+render = utils.page_span("admin_bot", trace_id(), step=st.session_state.bot_status)
+
 # --- RENDER HISTORY ---
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.write(msg["content"])
-        if msg.get("image_data"): st.image(msg["image_data"], width=250)
+        if msg.get("image_id"): st.image(utils.image_path(msg["image_id"], 250), width=250)
         if msg.get("variations"):
             cols = st.columns(3)
-            for i, var_img in enumerate(msg["variations"]):
-                with cols[i]: st.image(var_img, use_container_width=True)
+            for i, var_id in enumerate(msg["variations"]):
+                with cols[i % 3]: st.image(utils.image_path(var_id, 240), use_container_width=True)
 
 # =================================================
 # STEP 1: UPLOAD IMAGE
 # =================================================
+# Set at upload and carried through every later rewrite of draft_data.
+UPLOAD_KEYS = ("image_id", "trace_id", "phash")
+
+def start_analysis():
+    # Bot Analysis (background job)
+    st.session_state.pending_job = utils.submit_job(
+        "analyze", {"image_id": st.session_state.draft_data["image_id"], "trace_id": trace_id()},
+        owner=st.session_state.draft_token
+    )
+    advance("analyzing")
+
 if st.session_state.bot_status == "awaiting_upload":
     uploaded_file = st.file_uploader("Upload Product", type=['png', 'jpg', 'jpeg'], label_visibility="collapsed")
     
     if uploaded_file:
-        image = Image.open(uploaded_file)
+        # Only the asset id stays in session state; the bytes live on disk.
+        image_id = utils.save_asset(uploaded_file.getvalue())
+        phash = utils.source_hash(image_id)
         
         # Log User Action
-        st.session_state.messages.append({"role": "user", "content": "Here is the source image.", "image_data": image})
-        
-        # Bot Analysis
-        with st.chat_message("assistant"):
-            with st.spinner("Analyzing Geometry & Specs (Gemini 2.5 Flash)..."):
-                ai_data = utils.analyze_image_mock(image)
-                st.session_state.draft_data = ai_data
-                st.session_state.draft_data["image_obj"] = image
-            
-            response_text = f"✅ I've analyzed the **{ai_data.get('category', 'item')}**.\n\n**How should I generate the variations?**\n\nType your instructions below (separated by commas). \n*Example: 'Top view, Back view, Zoom on leg'* \n\nOr just type **'Default'** for standard angles."
-            st.write(response_text)
-            
-            st.session_state.messages.append({"role": "assistant", "content": response_text})
-            st.session_state.bot_status = "awaiting_instructions"
-            st.rerun()
+        st.session_state.messages.append({"role": "user", "content": "Here is the source image.", "image_id": image_id})
+        st.session_state.draft_data = {"image_id": image_id, "trace_id": utils.new_trace_id(), "phash": phash}
+
+        # A resized or re-shot copy of a published product can reuse its
+        # analysis and images instead of paying for new model calls.
+        st.session_state.duplicates = utils.find_duplicates(phash)
+        if st.session_state.duplicates:
+            advance("duplicate_found")
+        start_analysis()
+
+if st.session_state.bot_status == "duplicate_found":
+    def reuse_product(product):
+        # New source photo, everything else from the published product.
+        keep = {k: st.session_state.draft_data.get(k) for k in UPLOAD_KEYS}
+        st.session_state.draft_data = {
+            **{k: product[k] for k in utils.ANALYSIS_FIELDS if k in product},
+            "variation_sets": product.get("variation_sets", []),
+            "variations": product.get("variations", []),
+            "reused_from": product["id"],
+            **keep,
+        }
+        st.session_state.messages.append({
+            "role": "assistant",
+            "content": f"♻️ Reused the analysis and images of **{product.get('title', 'Untitled')}** (#{product['id']}). Please verify the details below to publish.",
+            "variations": st.session_state.draft_data["variations"]
+        })
+        advance("review_data")
+
+    with st.chat_message("assistant"):
+        st.write("🔎 This looks like a product that is already in the catalog:")
+        for distance, product_id in st.session_state.duplicates:
+            product = utils.get_product(product_id)
+            if not product:
+                continue
+            c1, c2 = st.columns([0.25, 0.75])
+            if product.get("image_id"): c1.image(utils.image_path(product["image_id"], 120), width=120)
+            c2.markdown(f"**{product.get('title', 'Untitled')}** · #{product_id} · {utils.duplicate_similarity(distance)}% similar")
+            if c2.button("Reuse its analysis & images", key=f"reuse_{product_id}"):
+                reuse_product(product)
+        if st.button("No, analyze as a new product"):
+            start_analysis()
+
+if st.session_state.bot_status == "analyzing":
+    def on_analysis_done(ai_data):
+        ai_data = ai_data or {}
+        st.session_state.draft_data = {
+            **ai_data, **{k: st.session_state.draft_data.get(k) for k in UPLOAD_KEYS}
+        }
+
+        # Speculatively render the default angles while the admin types;
+        # one job per angle so unneeded ones can be cancelled individually.
+        if config.SPECULATIVE_DEFAULTS and ai_data:
+            st.session_state.speculative_jobs = {
+                p: utils.submit_job(
+                    "generate",
+                    {
+                        "image_id": st.session_state.draft_data["image_id"], "prompts": [p],
+                        "speculative": True, "trace_id": trace_id()
+                    },
+                    owner=st.session_state.draft_token
+                )
+                for p in utils.DEFAULT_VARIATION_PROMPTS
+            }
+
+        response_text = f"✅ I've analyzed the **{ai_data.get('category', 'item')}**.\n\n**How should I generate the variations?**\n\nType your instructions below (separated by commas). \n*Example: 'Top view, Back view, Zoom on leg'* \n\nOr just type **'Default'** for standard angles."
+        st.session_state.messages.append({"role": "assistant", "content": response_text})
+        advance("awaiting_instructions")
+
+    with st.chat_message("assistant"):
+        st.write("Analyzing Geometry & Specs (Gemini 2.5 Flash)...")
+        watch_pending_job(on_analysis_done, render_analysis_fields)
 
 # =================================================
 # STEP 2: USER GIVES INSTRUCTIONS
@@ -71,36 +252,51 @@ if st.session_state.bot_status == "awaiting_instructions":
         # Log User Input
         st.session_state.messages.append({"role": "user", "content": user_input})
         
-        with st.chat_message("assistant"):
-            # Parse Instructions
-            if user_input.lower() == "default":
-                instructions = [] # Will trigger default in utils
-                st.write("👍 Using Standard E-Commerce Angles.")
-            else:
-                instructions = [x.strip() for x in user_input.split(',')]
-                st.write(f"👍 Generating {len(instructions)} custom shots: {', '.join(instructions)}")
-            
-            # Generate
-            with st.spinner("Rendering images (Gemini 2.5 Flash Image)..."):
-                variations = utils.generate_product_variations(
-                    st.session_state.draft_data["image_obj"], 
-                    user_instructions=instructions
-                )
-                st.session_state.draft_data["variations"] = variations
-            
-            st.write("**Here are the results:**")
-            cols = st.columns(3)
-            for i, var_img in enumerate(variations):
-                with cols[i]: st.image(var_img, use_container_width=True)
-            
-            st.session_state.messages.append({
-                "role": "assistant", 
-                "content": "Images generated. Please verify the technical details below to publish.",
-                "variations": variations
-            })
-            
-            st.session_state.bot_status = "review_data"
-            st.rerun()
+        # Parse Instructions
+        if user_input.lower() == "default":
+            instructions = [] # Will trigger default in utils
+            reply = "👍 Using Standard E-Commerce Angles."
+        else:
+            instructions = [x.strip() for x in user_input.split(',')]
+            reply = f"👍 Generating {len(instructions)} custom shots: {', '.join(instructions)}"
+        st.session_state.messages.append({"role": "assistant", "content": reply})
+        
+        # Custom angles that match a default reuse its speculative render
+        # (cached or joined in flight); the other speculative jobs are cancelled.
+        prompts = [utils.match_default_prompt(p) or p for p in utils.resolve_prompts(instructions)]
+        for p, job_id in st.session_state.pop("speculative_jobs", {}).items():
+            if p not in prompts:
+                utils.cancel_job(job_id)
+
+        # Generate (per-angle sets are kept so single angles can be redone later)
+        st.session_state.pending_job = utils.submit_job(
+            "generate",
+            {"image_id": st.session_state.draft_data["image_id"], "prompts": prompts, "trace_id": trace_id()},
+            owner=st.session_state.draft_token
+        )
+        st.session_state.pending_note = "Images generated. Please verify the technical details below to publish."
+        advance("generating")
+
+if st.session_state.bot_status == "generating":
+    def on_generation_done(result):
+        result = result or {"sets": [], "errors": []}
+        for user_prompt, error in result["errors"]:
+            utils.log_error(f"Gen Angle '{user_prompt}'", error)
+
+        image_id = st.session_state.draft_data["image_id"]
+        variations = utils.variations_from_sets(image_id, result["sets"])
+        st.session_state.draft_data["variation_sets"] = result["sets"]
+        st.session_state.draft_data["variations"] = variations
+        st.session_state.messages.append({
+            "role": "assistant", 
+            "content": st.session_state.pending_note,
+            "variations": variations
+        })
+        advance("review_data")
+
+    with st.chat_message("assistant"):
+        st.write("Rendering images (Gemini 2.5 Flash Image)...")
+        watch_pending_job(on_generation_done)
 
 # =================================================
 # STEP 3: DATA REVIEW & PUBLISH
@@ -109,7 +305,33 @@ if st.session_state.bot_status == "review_data":
     
     with st.chat_message("assistant"):
         st.write("📝 **Final Review**")
+
+        # Partial regeneration: only the picked angles hit the model,
+        # the rest come back from the variation cache.
+        variation_sets = st.session_state.draft_data.get("variation_sets", [])
+        if variation_sets:
+            with st.expander("🔁 Regenerate specific angles"):
+                picked = st.multiselect("Angles to redo", [p for p, _ in variation_sets])
+                if st.button("Regenerate selected", disabled=not picked):
+                    st.session_state.pending_job = utils.submit_job(
+                        "generate",
+                        {
+                            "image_id": st.session_state.draft_data["image_id"],
+                            "prompts": [p for p, _ in variation_sets],
+                            "regenerate": picked,
+                            "trace_id": trace_id()
+                        },
+                        owner=st.session_state.draft_token
+                    )
+                    st.session_state.pending_note = f"🔁 Regenerated: {', '.join(picked)}"
+                    advance("generating")
         
+        # Sizes that can't be parsed keep the product out of size filters and sorts.
+        unreadable = utils.unparsed_size_fields(st.session_state.draft_data)
+        if unreadable:
+            st.warning(f"⚠️ Couldn't read sizes from: {', '.join(FIELD_LABELS[f] for f in unreadable)}. "
+                       "Use e.g. “48x50x90 cm” or “45 cm”, or the product won't show up in size filters.")
+
         with st.form("amazon_form"):
             title = st.text_input("Title", value=st.session_state.draft_data.get("title", ""))
             desc = st.text_area("Description", value=st.session_state.draft_data.get("description", ""))
@@ -129,11 +351,13 @@ if st.session_state.bot_status == "review_data":
             dims = c3.text_input("Dimensions", value=st.session_state.draft_data.get("dimensions_str", ""))
             brand = c4.text_input("Brand", value=st.session_state.draft_data.get("brand_generic", ""))
 
+            c5, c6 = st.columns(2)
+            seat_h = c5.text_input("Seat Height", value=st.session_state.draft_data.get("seat_height", ""))
+            seat_w = c6.text_input("Seat Width", value=st.session_state.draft_data.get("seat_width", ""))
+
             # Hidden fields preservation
             style = st.session_state.draft_data.get("style", "")
             finish = st.session_state.draft_data.get("furniture_finish", "")
-            seat_h = st.session_state.draft_data.get("seat_height", "")
-            seat_w = st.session_state.draft_data.get("seat_width", "")
             legs = st.session_state.draft_data.get("leg_style", "")
 
             if st.form_submit_button("Publish to Storefront 🚀"):
@@ -144,12 +368,19 @@ if st.session_state.bot_status == "review_data":
                     "style": style, "furniture_finish": finish, "seat_height": seat_h, 
                     "seat_width": seat_w, "leg_style": legs
                 })
-                
+
+                # The Storefront's spec table is built once here, not per render.
+                specs.attach_spec_table(full_data)
                 utils.save_product_to_store(full_data)
                 
                 st.session_state.messages.append({"role": "assistant", "content": "🎉 Published! You can view it in the Storefront."})
-                st.session_state.bot_status = "done"
-                st.rerun()
+                unreadable = utils.unparsed_size_fields(full_data)
+                if unreadable:
+                    st.session_state.messages.append({"role": "assistant", "content": (
+                        f"⚠️ Couldn't read {', '.join(FIELD_LABELS[f] for f in unreadable)}; "
+                        "it's listed on the dashboard until fixed."
+                    )})
+                advance("done")
 
 # =================================================
 # STEP 4: DONE / LOOP
@@ -158,7 +389,6 @@ if st.session_state.bot_status == "done":
     with st.chat_message("assistant"):
         st.write("✅ Ready for next item.")
         if st.button("Start Over"):
-            st.session_state.messages = [{"role": "assistant", "content": "👋 Ready. Upload image."}]
-            st.session_state.bot_status = "awaiting_upload"
-            st.session_state.draft_data = {}
-            st.rerun()
\ No newline at end of file
+            new_draft()
+
+render.finish()
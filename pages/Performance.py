@@ -0,0 +1,104 @@
+import hmac
+import time
+import streamlit as st
+import pandas as pd
+import utils
+from furnicon import config
+
+st.set_page_config(page_title="Performance", page_icon="⏱️", layout="wide")
+st.title("⏱️ Performance")
+
+# --- ADMIN GATE ---
+# Admin-only: the token (FURNICON_ADMIN_TOKEN) is asked once per session,
+# and without one configured the page doesn't open at all.
+if not config.ADMIN_TOKEN:
+    st.error("This page is disabled. Set FURNICON_ADMIN_TOKEN on the server to enable it.")
+    st.stop()
+if not st.session_state.get("is_admin"):
+    token = st.text_input("Admin token", type="password")
+    if token and hmac.compare_digest(token, config.ADMIN_TOKEN):
+        st.session_state.is_admin = True
+        st.rerun()
+    if token:
+        st.error("Wrong token.")
+    st.stop()
+
+tracer = utils.tracer
+st.caption(
+    "Latency per traced stage since this server process started "
+    "(or since the last reset). Percentiles are estimated from histogram buckets."
+)
+
+# --- LIVE PERCENTILES ---
+@st.fragment(run_every=config.JOB_POLL_SECONDS * 5)
+def show_stages():
+    rows = tracer.summary()
+    if not rows:
+        st.info("No spans recorded yet. Publish a product or open the Storefront.")
+        return
+    df = pd.DataFrame(rows)[
+        ["stage", "count", "errors", "p50_ms", "p95_ms", "p99_ms", "mean_ms", "max_ms"]
+    ]
+    uptime = time.time() - tracer.started_at
+    st.caption(f"{int(df['count'].sum())} spans over {uptime / 60:.1f} min")
+    st.dataframe(
+        df,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            c: st.column_config.NumberColumn(format="%.1f") for c in ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "max_ms")
+        },
+    )
+
+show_stages()
+
+# Models currently sent straight to the text-only fallback.
+for model, refusals in utils.i2i_refusals().items():
+    for error_class, entry in refusals.items():
+        next_probe = entry["checked"] + config.I2I_PROBE_SECONDS - time.time()
+        st.warning(
+            f"Image+text disabled for `{model}` ({error_class}) since "
+            f"{time.strftime('%H:%M', time.localtime(entry['since']))}; "
+            f"next probe in {max(0, next_probe) / 60:.0f} min."
+        )
+
+# --- TRACES ---
+# Every span of one product: upload, jobs, model calls, publish.
+st.markdown("### Trace")
+trace_ids = list(dict.fromkeys(s["trace_id"] for s in reversed(tracer.spans()) if s["trace_id"]))
+if not trace_ids:
+    st.caption("No product traces yet.")
+else:
+    picked = st.selectbox("Recent traces (newest first)", trace_ids)
+    spans = tracer.spans(picked)
+    first = min(s["start"] for s in spans)
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "stage": s["stage"],
+                "status": s["status"],
+                "offset_s": round(s["start"] - first, 3),
+                "duration_ms": s["duration_ms"],
+                "attrs": ", ".join(f"{k}={v}" for k, v in (s.get("attrs") or {}).items()),
+            }
+            for s in sorted(spans, key=lambda s: s["start"])
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+# --- EXPORT ---
+st.markdown("### Export")
+c1, c2, c3 = st.columns(3)
+c1.download_button(
+    "Prometheus text", tracer.prometheus_text(), file_name="furnicon_metrics.txt", mime="text/plain"
+)
+c2.download_button(
+    "Recent spans (JSON lines)", tracer.json_lines(), file_name="furnicon_spans.jsonl",
+    mime="application/x-ndjson"
+)
+if c3.button("Reset histograms"):
+    tracer.reset()
+    st.rerun()
+if config.TRACE_LOG:
+    st.caption(f"Spans are also appended to `{config.TRACE_LOG}`.")
@@ -1,57 +1,150 @@
+import math
 import streamlit as st
 import utils
-import pandas as pd
+from furnicon import config, specs
 
 st.set_page_config(page_title="Furnicon Store", page_icon="🛍️", layout="wide")
 
+render = utils.page_span("storefront")
+
 st.title("🛍️ Furnicon")
 st.markdown("---")
 
-products = utils.get_all_products()
+if "cart" not in st.session_state:
+    st.session_state.cart = []
+
+# --- PRODUCT CARD ---
+# Each card is a fragment: switching views or clicking "Add to Cart" reruns
+# only that card, not the whole page.
+@st.fragment
+def product_card(item):
+    col_img, col_info = st.columns([0.4, 0.6])
+
+    with col_img:
+        # Only the selected view is sent to the browser.
+        images = ([item["image_id"]] if item.get("image_id") else []) + item.get("variations", [])
+        labels = ["Front"] + [f"View {i+1}" for i in range(len(images) - 1)]
+        view = 0
+        if len(images) > 1:
+            view = st.radio(
+                "View", range(len(images)), format_func=lambda i: labels[i],
+                horizontal=True, key=f"view_{item['id']}", label_visibility="collapsed"
+            )
+        if images: st.image(utils.image_path(images[view], 560), use_container_width=True)
+
+    with col_info:
+        st.subheader(item.get("title", "Product"))
+        st.caption(f"Brand: {item.get('brand', 'Generic')}")
+
+        c1, c2 = st.columns([0.3, 0.7])
+        c1.markdown(f"## ${item.get('price', 0)}")
+        if c2.button("Add to Cart", key=f"btn_{item['id']}"):
+            st.session_state.cart.append(item["id"])
+            st.toast(f"🛒 Added {item.get('title', 'item')} ({len(st.session_state.cart)} in cart)")
+
+        st.write(item.get("description", ""))
+
+        st.markdown("### Technical Details")
+
+        # The Amazon Table, pre-built at publish time (see furnicon.specs)
+        st.markdown(specs.spec_table(item), unsafe_allow_html=True)
+
+        # Looked up only when opened; toggling reruns just this card.
+        if st.toggle("More like this", key=f"similar_{item['id']}"):
+            similar = utils.similar_products(item["id"])
+            if not similar:
+                st.caption("Nothing similar yet.")
+            for col, other in zip(st.columns(config.SIMILAR_COUNT), similar):
+                if other.get("image_id"): col.image(utils.image_path(other["image_id"], 120), width=120)
+                col.caption(f"{other.get('title', 'Product')} · ${other.get('price', 0)}")
+
+# --- SEARCH & FILTERS ---
+# Matches titles, descriptions, brands and specs; the last word is
+# completed as a prefix, so partial words already find products.
+def reset_page():
+    st.session_state.store_page = 1
 
-if not products:
-    st.info("Inventory Empty.")
+def clear_filters():
+    for facet, _ in config.FACETS:
+        st.session_state[f"facet_{facet}"] = []
+    for column, _ in config.RANGES:
+        st.session_state[f"min_{column}"] = st.session_state[f"max_{column}"] = None
+    reset_page()
+
+# (column, descending) or None for best match / catalog order.
+SORTS = [None] + [(column, descending) for column, _ in config.RANGES for descending in (False, True)]
+RANGE_LABELS = dict(config.RANGES)
+
+def sort_label(sort):
+    if sort is None:
+        return "Best match"
+    return f"{RANGE_LABELS[sort[0]]}, {'high to low' if sort[1] else 'low to high'}"
+
+# A trailing space marks the last word as complete, so the text is passed on as typed.
+c_query, c_sort = st.columns([0.75, 0.25])
+query = c_query.text_input(
+    "Search", key="store_query", placeholder="Search products, e.g. oak side table", on_change=reset_page
+)
+if not query.strip():
+    query = ""
+sort = c_sort.selectbox("Sort by", SORTS, format_func=sort_label, key="store_sort", on_change=reset_page)
+
+# Sidebar filters read their selection before they are drawn, so the counts
+# shown next to each value already reflect it. Ranges are (min, max), either
+# left empty for no limit, e.g. only a max width for "fits under 80 cm".
+filters = {facet: st.session_state.get(f"facet_{facet}", []) for facet, _ in config.FACETS}
+ranges = {
+    column: (st.session_state.get(f"min_{column}"), st.session_state.get(f"max_{column}"))
+    for column, _ in config.RANGES
+}
+filtered = any(filters.values()) or any(v is not None for r in ranges.values() for v in r)
+total, items, counts = utils.browse_products(query, filters, ranges, sort, st.session_state.get("store_page", 1))
+
+with st.sidebar:
+    st.header("Filters")
+    for facet, label in config.FACETS:
+        options = sorted(set(counts[facet]) | set(filters[facet]), key=utils.facet_label)
+        st.multiselect(
+            label, options, key=f"facet_{facet}", on_change=reset_page,
+            format_func=lambda value, facet=facet: f"{utils.facet_label(value)} ({counts[facet].get(value, 0)})",
+        )
+    st.subheader("Price & Size")
+    bounds = utils.range_bounds()
+    for column, label in config.RANGES:
+        # Placeholders show the catalog's lowest and highest value.
+        low, high = bounds[column] or (None, None)
+        c1, c2 = st.columns(2)
+        c1.number_input(
+            label, min_value=0.0, value=None, step=1.0, format="%g", key=f"min_{column}",
+            placeholder="Min" if low is None else f"Min {low:g}", on_change=reset_page,
+        )
+        c2.number_input(
+            label, min_value=0.0, value=None, step=1.0, format="%g", key=f"max_{column}",
+            placeholder="Max" if high is None else f"Max {high:g}", on_change=reset_page,
+            label_visibility="hidden",
+        )
+    if filtered:
+        st.button("Clear filters", on_click=clear_filters)
+
+# --- PAGINATION ---
+# Only the visible window is read from the catalog.
+if not total:
+    st.info("No products match your search or filters." if query or filtered else "Inventory Empty.")
 else:
-    for item in products:
-        col_img, col_info = st.columns([0.4, 0.6])
-        
-        with col_img:
-            variations = item.get("variations", [])
-            tab_labels = ["Front"] + [f"View {i+1}" for i in range(len(variations))]
-            tabs = st.tabs(tab_labels)
-            
-            with tabs[0]:
-                if "image_obj" in item: st.image(item["image_obj"], use_container_width=True)
-            
-            for i, var_img in enumerate(variations):
-                with tabs[i+1]: st.image(var_img, use_container_width=True)
-
-        with col_info:
-            st.subheader(item.get("title", "Product"))
-            st.caption(f"Brand: {item.get('brand', 'Generic')}")
-            
-            c1, c2 = st.columns([0.3, 0.7])
-            c1.markdown(f"## ${item.get('price', 0)}")
-            c2.button("Add to Cart", key=f"btn_{item['id']}")
-            
-            st.write(item.get("description", ""))
-            
-            st.markdown("### Technical Details")
-            
-            # The Amazon Table
-            spec_data = {
-                "Colour": item.get("colour"),
-                "Frame Material": item.get("frame_material"),
-                "Style": item.get("style"),
-                "Finish": item.get("furniture_finish"),
-                "Seat Height": item.get("seat_height"),
-                "Seat Width": item.get("seat_width"),
-                "Leg Style": item.get("leg_style"),
-                "Dimensions": item.get("dimensions_str")
-            }
-            # Filter empty
-            clean_specs = {k: v for k, v in spec_data.items() if v}
-            
-            st.table(pd.DataFrame(list(clean_specs.items()), columns=["Feature", "Details"]))
-            
-        st.markdown("---")
\ No newline at end of file
+    page_size = config.STOREFRONT_PAGE_SIZE
+    pages = math.ceil(total / page_size)
+    if st.session_state.get("store_page", 1) > pages:
+        st.session_state.store_page = pages
+        total, items, counts = utils.browse_products(query, filters, ranges, sort, pages)
+
+    c1, c2 = st.columns([0.2, 0.8])
+    page = c1.number_input("Page", min_value=1, max_value=pages, step=1, key="store_page")
+    first = (page - 1) * page_size
+    c2.caption(f"Showing {first + 1}–{min(first + page_size, total)} of {total} products")
+    st.markdown("---")
+
+    for item in items:
+        product_card(item)
+        st.markdown("---")
+
+render.finish()
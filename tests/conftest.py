@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Set before anything imports furnicon.config: the suite runs offline on the
+# synthetic model client, with image work inline and data in a scratch dir.
+os.environ["FURNICON_MODEL_CLIENT"] = "fake"
+os.environ["FURNICON_IMAGE_WORKERS"] = "0"
+os.environ["FURNICON_DATA_DIR"] = tempfile.mkdtemp(prefix="furnicon-tests-")
@@ -0,0 +1,58 @@
+import sqlite3
+import time
+
+from furnicon import cache
+from furnicon.cache import ResultCache, make_key
+
+
+def test_make_key_is_stable_and_order_sensitive():
+    assert make_key("analysis", b"\x89PNG", {"b": 1, "a": 2}) == make_key("analysis", b"\x89PNG", {"a": 2, "b": 1})
+    assert make_key("a", "b") != make_key("b", "a")
+
+
+def test_get_set_and_stats(tmp_path):
+    results = ResultCache(str(tmp_path / "cache.db"), "analysis")
+    assert results.get("k", "missing") == "missing"
+    results.set("k", {"title": "Chair"})
+
+    assert results.get("k") == {"title": "Chair"}
+    assert results.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1}
+
+
+def test_expired_entries_miss(tmp_path, monkeypatch):
+    results = ResultCache(str(tmp_path / "cache.db"), "analysis", ttl=60)
+    results.set("k", 1)
+    later = time.time() + 61
+    monkeypatch.setattr(cache.time, "time", lambda: later)
+
+    assert results.get("k") is None
+    results.set("other", 2)  # purges expired entries
+    assert results.stats()["entries"] == 1
+
+
+def test_eviction_follows_lookups(tmp_path):
+    results = ResultCache(str(tmp_path / "cache.db"), "variations", max_entries=2)
+    results.set("old", 1)
+    results.set("new", 2)
+    results.get("old")  # touch is pending, and written before the next eviction
+    results.set("newest", 3)
+
+    assert results.get("old") == 1 and results.get("new") is None
+    assert results.stats()["evictions"] == 1
+
+
+def test_lookups_do_not_wait_for_a_writer(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.db")
+    results = ResultCache(path, "analysis")
+    results.set("k", "v")
+    monkeypatch.setattr(cache, "TOUCH_BATCH", 1)  # every lookup tries to flush
+
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    started = time.perf_counter()
+    assert [results.get("k") for _ in range(3)] == ["v", "v", "v"]
+    assert time.perf_counter() - started < 1
+    writer.execute("ROLLBACK")
+
+    # The skipped counts are written once the lock is free.
+    assert results.stats()["hits"] == 3
@@ -0,0 +1,75 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw
+
+from furnicon import config, dedupe
+from furnicon.assets import AssetStore
+from furnicon.catalog import CatalogStore
+from furnicon.dedupe import DuplicateIndex, HashIndex
+
+
+def photo(shapes, size=(640, 480), fmt="PNG", quality=90):
+    # A product-ish photo: light backdrop, dark shapes.
+    image = Image.new("RGB", (640, 480), (235, 230, 220))
+    draw = ImageDraw.Draw(image)
+    for box in shapes:
+        draw.rectangle(box, fill=(90, 60, 40))
+    buf = BytesIO()
+    image.resize(size).save(buf, fmt, quality=quality)
+    return buf.getvalue()
+
+
+CHAIR = [(200, 80, 260, 400), (200, 240, 440, 280), (400, 240, 440, 400)]
+LAMP = [(300, 60, 340, 420), (220, 40, 420, 120), (260, 400, 380, 440)]
+
+
+@pytest.fixture
+def stores(tmp_path):
+    assets = AssetStore(str(tmp_path / "assets"))
+    return assets, CatalogStore(str(tmp_path / "catalog.db"), assets)
+
+
+def test_hash_index_query_replace_and_remove():
+    index = HashIndex(capacity=2)
+    index.add(1, 0b0000)
+    index.add(2, 0b0111)
+    index.add(3, 2**64 - 1)  # top bit set: stored signed in SQLite
+    index.add(2, 0b0011)  # replaces
+
+    assert index.query(0b0001, 2) == [(1, 1), (1, 2)]
+    assert index.query(2**64 - 2, 0) == []
+    assert index.query(2**64 - 2, 1) == [(1, 3)]
+    index.remove(1)  # id 3 moves into its slot
+    index.remove(99)
+    assert len(index) == 2
+    assert index.query(0, 64) == [(2, 2), (64, 3)]
+
+
+def test_resized_recompressed_photo_is_a_near_duplicate(stores):
+    assets, _ = stores
+    original = dedupe.source_hash(assets, assets.put(photo(CHAIR)))
+    copy = dedupe.source_hash(assets, assets.put(photo(CHAIR, size=(320, 240), fmt="JPEG", quality=60)))
+    other = dedupe.source_hash(assets, assets.put(photo(LAMP)))
+
+    assert bin(original ^ copy).count("1") <= config.DUPLICATE_MAX_DISTANCE
+    assert bin(original ^ other).count("1") > config.DUPLICATE_MAX_DISTANCE
+
+
+def test_duplicate_index_follows_the_catalog(stores):
+    assets, catalog = stores
+    index = DuplicateIndex(catalog)
+    chair = assets.put(photo(CHAIR))
+    chair_hash = dedupe.source_hash(assets, chair)
+    assert index.find(chair_hash) == []
+
+    product_id = catalog.add({"title": "Chair", "image_id": chair, "phash": chair_hash})
+    catalog.add({"title": "Lamp", "image_id": assets.put(photo(LAMP))})  # published without a hash
+
+    upload = dedupe.source_hash(assets, assets.put(photo(CHAIR, size=(800, 600), fmt="JPEG")))
+    [(distance, found)] = index.find(upload)
+    assert found == product_id and dedupe.similarity(distance) >= 80
+
+    assert dedupe.backfill(catalog, assets) == 1
+    assert catalog.products_without_hash() == []
+    assert len(index.find(upload, max_distance=64)) == 2
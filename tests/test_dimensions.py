@@ -0,0 +1,68 @@
+import pytest
+
+from furnicon.dimensions import RangeIndex, measurements, parse_dimensions, parse_length
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("48x50x90 cm", (48.0, 50.0, 90.0)),
+    ("48 × 50 × 90cm", (48.0, 50.0, 90.0)),
+    ("48x50x90", (48.0, 50.0, 90.0)),
+    ("48 cm x 50 cm x 90 cm", (48.0, 50.0, 90.0)),
+    ("480x500x900mm", (48.0, 50.0, 90.0)),
+    ("1.2m x 60cm x 75cm", (120.0, 60.0, 75.0)),
+    ("48,5 x 50 x 90 cm", (48.5, 50.0, 90.0)),
+    ('19" x 20" x 35"', (48.3, 50.8, 88.9)),
+    # Labelled: with an L, W is the depth, as in the prompt's "LxWxH".
+    ("L 120cm x W 60cm x H 75cm", (120.0, 60.0, 75.0)),
+    ("48x50x90cm (LxWxH)", (48.0, 50.0, 90.0)),
+    ("48 x 50 x 90 cm (W x D x H)", (48.0, 50.0, 90.0)),
+    ("90 x 48 x 50 cm (H x W x D)", (48.0, 50.0, 90.0)),
+    ("H: 90cm, W: 48cm, D: 50cm", (48.0, 50.0, 90.0)),
+    ("W48 x D50 x H90 cm", (48.0, 50.0, 90.0)),
+    ("48W x 50D x 90H cm", (48.0, 50.0, 90.0)),
+    ("Ø40 x 45 cm", (40.0, 40.0, 45.0)),
+    ("ø40 x 45h cm", (40.0, 40.0, 45.0)),
+])
+def test_parse_dimensions(text, expected):
+    assert parse_dimensions(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "", "LxWxH cm", "48x50 cm", "approx 48x50x90 cm", "4800x50x90",
+    "W48 x W50 x H90 cm", "48x50x90 cm (LxW)",
+])
+def test_parse_dimensions_unreadable(text):
+    assert parse_dimensions(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("45 cm", 45.0), ("45", 45.0), ("450mm", 45.0), ("17.5in", 44.5), ("18 in H", 45.7),
+    ("Height", None), ("45 cm seat", None), ("", None),
+])
+def test_parse_length(text, expected):
+    assert parse_length(text) == expected
+
+
+def test_measurements_flags_only_unreadable_fields():
+    sizes, unparsed = measurements({"dimensions_str": "L 120cm x W 60cm x H 75cm", "seat_height": "Height"})
+    assert (sizes["width_cm"], sizes["depth_cm"], sizes["height_cm"]) == (120.0, 60.0, 75.0)
+    assert sizes["seat_height_cm"] is None and sizes["seat_width_cm"] is None
+    assert unparsed == ["seat_height"]
+
+
+def test_range_index_within_and_order_after_edits():
+    index = RangeIndex(("price", "width_cm"))
+    index.add_batch([(i, (float(i % 7), None if i % 3 == 0 else float(100 - i))) for i in range(1, 41)])
+    index.add_batch([(5, (99.0, 10.0)), (6, None), (5, (3.0, 60.0))])  # edit, remove, edit again
+    rows = {i: (float(i % 7), None if i % 3 == 0 else float(100 - i)) for i in range(1, 41)}
+    rows[5] = (3.0, 60.0)
+    del rows[6]
+
+    assert index.within({"price": (None, None)}) is None
+    inside = [i for i, (price, width) in rows.items() if 2 <= price <= 4 and width is not None and width >= 70]
+    assert index.within({"price": (2, 4), "width_cm": (70, None)}).tolist() == inside
+
+    ids = [7, 9, 5, 12, 30]  # 9, 12 and 30 have no width
+    assert index.order("width_cm", ids).tolist() == [5, 7, 9, 12, 30]
+    assert index.order("width_cm", ids, descending=True).tolist() == [7, 5, 9, 12, 30]
+    assert index.order("price", [14, 7, 21, 1]).tolist() == [7, 14, 21, 1]
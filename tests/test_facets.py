@@ -0,0 +1,81 @@
+import numpy as np
+
+from furnicon.assets import AssetStore
+from furnicon.catalog import CatalogStore
+from furnicon.facets import CatalogFacets, FacetIndex, bitmap_ids, normalize_value
+
+FACETS = ("category", "colour", "frame_material")
+
+
+def catalog(index):
+    index.add_batch([
+        (1, ("Chairs", "Grey", "Oak")),
+        (2, ("Chairs", "gray ", "Walnut")),
+        (3, ("Tables", "Ivory", "Oak")),
+        (4, ("Chairs", "Cream", "Oak")),
+        (70, ("Sofas", "", "Walnut")),  # past the first 64-bit word
+    ])
+    return index
+
+
+def ids(index, filters, base=None):
+    return bitmap_ids(index.bitmap(filters, base)).tolist()
+
+
+def test_values_are_normalized():
+    assert normalize_value("  Mid  Century ") == "mid-century"
+    assert normalize_value(None) == ""
+
+
+def test_filters_and_within_a_facet_or_across_facets():
+    index = catalog(FacetIndex(FACETS))
+    assert ids(index, {}) == [1, 2, 3, 4, 70]
+    assert ids(index, {"frame_material": ["oak", "walnut"]}) == [1, 2, 3, 4, 70]
+    assert ids(index, {"category": ["chairs"], "frame_material": ["oak"]}) == [1, 4]
+    assert ids(index, {"colour": ["grey"], "frame_material": ["teak"]}) == []
+
+
+def test_counts_are_disjunctive():
+    index = catalog(FacetIndex(FACETS))
+    assert index.counts({})["colour"] == {"grey": 2, "ivory": 2}
+
+    counts = index.counts({"category": ["chairs"], "frame_material": ["oak"]})
+    # A facet's own selection doesn't narrow its counts; the others' do.
+    assert counts["frame_material"] == {"oak": 2, "walnut": 1}
+    assert counts["category"] == {"chairs": 2, "tables": 1, "sofas": 0}
+    assert counts["colour"] == {"grey": 1, "ivory": 1}
+
+
+def test_counts_within_a_base_set():
+    index = catalog(FacetIndex(FACETS))
+    base = index.to_bitmap([2, 3, 70])
+    assert ids(index, {}, base) == [2, 3, 70]
+    assert index.counts({"frame_material": ["walnut"]}, base)["category"] == {"chairs": 1, "tables": 0, "sofas": 1}
+
+
+def test_edits_and_removals_move_counts():
+    index = catalog(FacetIndex(FACETS))
+    index.add_batch([(1, ("Chairs", "Grey", "Walnut")), (3, None)])
+
+    assert len(index) == 4
+    assert index.counts({})["frame_material"] == {"oak": 1, "walnut": 3}
+    assert ids(index, {"frame_material": ["oak"]}) == [4]
+    # Repeated ids in one batch (published and edited since the last
+    # refresh) count once.
+    index.add_batch([(5, ("Stools", "Grey", "Oak")), (5, ("Stools", "Grey", "Oak"))])
+    assert index.counts({})["category"]["stools"] == 1
+
+
+def test_catalog_facets_follow_the_change_log(tmp_path):
+    catalog = CatalogStore(str(tmp_path / "catalog.db"), AssetStore(str(tmp_path / "assets")))
+    facets = CatalogFacets(catalog)
+    chair = catalog.add({"title": "Chair", "category": "Chairs", "colour": "Grey"})
+    table = catalog.add({"title": "Table", "category": "Tables", "colour": "Gray"})
+
+    matched, counts = facets.filter({"colour": ["grey"]}, base_ids=np.array([table]))
+    assert matched.tolist() == [table]
+    assert counts["category"] == {"chairs": 0, "tables": 1}
+
+    catalog.add({"title": "Stool", "category": "Stools", "colour": "Ivory"})
+    assert facets.filter({"category": ["chairs", "stools"]})[1]["colour"] == {"grey": 1, "ivory": 1}
+    assert chair in facets.filter({})[0]
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from furnicon import imagepool
+
+
+def crash_once(marker):
+    # Kills its worker the first time it runs.
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return os.getpid()
+
+
+def crash(_):
+    os._exit(1)
+
+
+@pytest.fixture
+def pool():
+    imagepool.configure(1)
+    yield
+    imagepool.configure(0)
+
+
+def test_inline_mode_runs_in_process():
+    assert imagepool.workers() == 0
+    assert imagepool.run(os.getpid) == os.getpid()
+    assert imagepool.map(abs, [-1, 2, -3]) == [1, 2, 3]
+
+
+def test_task_lost_with_its_worker_is_retried_on_a_fresh_pool(pool, tmp_path):
+    assert imagepool.run(crash_once, str(tmp_path / "crashed")) != os.getpid()
+    assert imagepool.map(abs, [-1, 2]) == [1, 2]
+
+
+def test_second_crash_is_raised(pool):
+    with pytest.raises(imagepool.BrokenProcessPool):
+        imagepool.run(crash, None)
+    assert imagepool.run(abs, -4) == 4
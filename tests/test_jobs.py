@@ -0,0 +1,70 @@
+from furnicon.jobs import JobQueue
+
+
+def queue(tmp_path, **kwargs):
+    return JobQueue(str(tmp_path / "jobs.db"), **kwargs)
+
+
+def test_claim_takes_queued_jobs_in_order(tmp_path):
+    jobs = queue(tmp_path)
+    first = jobs.submit("analysis", {"image_id": "a"}, owner="draft-1")
+    second = jobs.submit("generation", {"image_id": "b"})
+
+    job = jobs.claim("w1")
+    assert (job["id"], job["status"], job["worker"], job["attempts"]) == (first, "running", "w1", 1)
+    assert job["params"] == {"image_id": "a"}
+    assert jobs.claim("w2")["id"] == second
+    assert jobs.claim("w3") is None
+    assert [j["id"] for j in jobs.active("draft-1")] == [first]
+
+
+def test_cancel_stops_queued_and_running_jobs_only(tmp_path):
+    jobs = queue(tmp_path)
+    running, queued, done = (jobs.submit("analysis", {}) for _ in range(3))
+    jobs.claim("w1")
+    jobs.cancel(queued)
+    jobs.cancel(running)
+    # The worker finishing afterwards doesn't undo the cancel.
+    jobs.complete(running, {"ok": True})
+
+    assert jobs.get(running)["status"] == "cancelled" and jobs.get(running)["result"] is None
+    assert jobs.get(queued)["status"] == "cancelled"
+    assert jobs.claim("w1")["id"] == done
+    jobs.complete(done, {"ok": True})
+    jobs.cancel(done)
+    assert jobs.get(done)["status"] == "done"
+
+
+def test_stale_jobs_are_requeued_until_max_attempts(tmp_path):
+    # stale_after=-1: every running job counts as stale.
+    jobs = queue(tmp_path, stale_after=-1, max_attempts=2)
+    job_id = jobs.submit("generation", {})
+
+    jobs.claim("crashed-1")
+    assert jobs.requeue_stale() == 1
+    assert jobs.get(job_id)["status"] == "queued" and jobs.get(job_id)["worker"] is None
+
+    jobs.claim("crashed-2")
+    assert jobs.requeue_stale() == 0
+    job = jobs.get(job_id)
+    assert (job["status"], job["attempts"]) == ("failed", 2)
+    assert "2 attempts" in job["error"] and job["finished_at"]
+    assert jobs.claim("w1") is None
+
+
+def test_fresh_jobs_are_not_requeued(tmp_path):
+    jobs = queue(tmp_path, stale_after=60)
+    job_id = jobs.submit("analysis", {})
+    jobs.claim("w1")
+
+    assert jobs.requeue_stale() == 0
+    assert jobs.get(job_id)["status"] == "running"
+
+
+def test_drafts_round_trip(tmp_path):
+    jobs = queue(tmp_path)
+    jobs.save_draft("t1", {"bot_status": "review", "draft_data": {"title": "Chair"}})
+
+    assert jobs.load_draft("t1") == {"bot_status": "review", "draft_data": {"title": "Chair"}}
+    jobs.delete_draft("t1")
+    assert jobs.load_draft("t1") is None
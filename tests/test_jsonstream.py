@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from furnicon.jsonstream import JSONObjectStream
+
+OBJECT = (
+    '{"title": "Oak \\"Shaker\\" Chair", "path": "C:\\\\chairs\\\\", "brand": "Caf\\u00e9 Co",'
+    ' "price": 129.5, "stock": 3, "in_stock": true, "finish": null,'
+    ' "specs": {"legs": ["oak", "ash"], "seat": {"height": "45 cm", "note": "}] inside"}},'
+    ' "tags": [1, [2, 3], {"a": "b"}]}'
+)
+DOC = f"```json\n{OBJECT}\n```"  # as the model streams it
+
+
+def feed_chunks(text, size):
+    stream, seen = JSONObjectStream(), []
+    for i in range(0, len(text), size):
+        seen.append(stream.feed(text[i:i + size]))
+    return stream, seen
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, len(DOC)])
+def test_any_chunking_yields_the_parsed_object(size):
+    stream, seen = feed_chunks(DOC, size)
+    expected = json.loads(OBJECT)
+
+    assert stream.done and stream.fields == expected
+    merged = {}
+    for completed in seen:
+        assert not set(completed) & set(merged)  # each member reported once
+        merged.update(completed)
+    assert merged == expected
+
+
+def test_members_are_reported_as_soon_as_they_complete():
+    stream = JSONObjectStream()
+    assert stream.feed('{"title": "Oak Ch') == {}
+    assert stream.feed('air", "price": 12') == {"title": "Oak Chair"}
+    # A number isn't complete until its delimiter arrives.
+    assert stream.feed("9") == {}
+    assert stream.feed(', "specs": {"legs": "oak"') == {"price": 129}
+    assert stream.feed("}}") == {"specs": {"legs": "oak"}}
+    assert stream.done
+
+
+def test_chunk_boundary_inside_an_escape():
+    stream = JSONObjectStream()
+    assert stream.feed('{"title": "18\\') == {}
+    assert stream.feed('" stool", "note": "a\\\\') == {"title": '18" stool'}
+    assert stream.feed('"}') == {"note": "a\\"}
+
+
+def test_truncated_stream_keeps_only_completed_members():
+    stream = JSONObjectStream()
+    stream.feed('{"title": "Oak Chair", "specs": {"legs": "oak", "seat": "4')
+
+    assert not stream.done
+    assert stream.fields == {"title": "Oak Chair"}
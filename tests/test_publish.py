@@ -0,0 +1,44 @@
+from io import BytesIO
+
+from PIL import Image
+
+import utils
+from furnicon import specs
+
+
+def upload(colour):
+    buf = BytesIO()
+    Image.new("RGB", (64, 48), colour).save(buf, "PNG")
+    return utils.get_assets().put(buf.getvalue())
+
+
+def test_published_draft_round_trips_through_the_draft_store():
+    draft = {
+        "title": "Round Trip Chair", "price": 120.0, "stock": 3, "dimensions_str": "48 x 50 x 90 cm",
+        "image_id": upload((120, 80, 40)), "variations": [upload((40, 80, 120))],
+    }
+    specs.attach_spec_table(draft)
+    utils.save_product_to_store(draft)
+
+    # As the Admin Bot persists its session after publishing.
+    utils.save_draft("round-trip", {"bot_status": "done", "draft_data": draft})
+    saved = utils.load_draft("round-trip")["draft_data"]
+    assert saved == draft
+    assert "visual_features" not in saved
+
+    product = utils.get_catalog().get_many([draft["id"]])[0]
+    assert product["title"] == "Round Trip Chair"
+    assert product["image_id"] == draft["image_id"] and product["variations"] == draft["variations"]
+
+
+def test_published_products_are_similar_to_their_look_alikes():
+    # Features are computed at publish, so "more like this" needs no backfill.
+    ids = []
+    for title, colour in [("Red Chair", (200, 30, 30)), ("Red Stool", (190, 40, 35)), ("Blue Sofa", (20, 40, 200))]:
+        product = {"title": title, "image_id": upload(colour)}
+        utils.save_product_to_store(product)
+        ids.append(product["id"])
+
+    similar = [p["id"] for p in utils.similar_products(ids[0], k=10)]
+    assert ids[0] not in similar
+    assert similar.index(ids[1]) < similar.index(ids[2])
@@ -0,0 +1,40 @@
+import pytest
+
+from furnicon.ratelimit import AdaptiveRateLimiter, is_rate_limit_error
+
+
+class APIError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+@pytest.mark.parametrize("error", [
+    APIError("quota", code=429),
+    APIError("429 RESOURCE_EXHAUSTED. {'error': {'code': 429}}"),
+    APIError("Resource has been exhausted: RESOURCE_EXHAUSTED"),
+    APIError("HTTP 429 Too Many Requests"),
+    APIError("Upstream returned status: 429"),
+    APIError("error 429 from the image model"),
+])
+def test_rate_limit_errors(error):
+    assert is_rate_limit_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    APIError("500 INTERNAL", code=500),
+    APIError("Image 4290x3000 is too large"),
+    APIError("Timed out after 1429 ms"),
+    APIError("No product with SKU 429"),
+    APIError("400 INVALID_ARGUMENT: seat height 42.9 cm"),
+])
+def test_other_errors(error):
+    assert not is_rate_limit_error(error)
+
+
+def test_limiter_backs_off_and_recovers():
+    limiter = AdaptiveRateLimiter(rpm=60)
+    limiter.on_throttle()
+    assert limiter.rpm == pytest.approx(30)
+    limiter.on_success()
+    assert limiter.rpm == pytest.approx(36)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from furnicon.search import SearchIndex, parse_query
+
+
+def doc(title, description=""):
+    # Field texts in catalog.SEARCH_COLUMNS order.
+    return (title, "", "Chairs", description, "")
+
+
+def test_parse_query_prefixes_only_the_last_word():
+    assert parse_query("Oak cha") == [("oak", False), ("cha", True)]
+    assert parse_query("oak chair ") == [("oak", False), ("chair", False)]
+    assert parse_query("  ") == []
+
+
+def test_edited_product_still_matches():
+    index = SearchIndex()
+    others = [(i, doc(f"Oak Stool {i}", "Turned legs, waxed finish.")) for i in range(2, 9)]
+    index.add_batch([(1, doc("Oak Dining Chair"))] + others)
+    # Small enough not to be merged with the first batch, which keeps
+    # the old postings around.
+    index.add_batch([(1, doc("Oak Dining Chair", "Solid oak."))])
+    index.add_batch([(1, doc("Oak Dining Chair", "Solid oak, oiled."))])
+
+    assert index.search("Oak Dining Chair ") == (1, [1])
+    assert sorted(index.matches("oak")) == list(range(1, 9))
+    assert len(index) == 8
+
+
+def test_repeated_doc_in_one_batch_keeps_the_last_version():
+    index = SearchIndex()
+    index.add_batch([(1, doc("Walnut Table")), (2, doc("Walnut Desk")), (1, doc("Walnut Armchair"))])
+
+    assert sorted(index.matches("walnut")) == [1, 2]
+    assert index.search("table ") == (0, [])
+    assert index.search("armch") == (1, [1])
+
+
+def test_removed_product_stops_matching():
+    index = SearchIndex()
+    index.add_batch([(1, doc("Teak Lounger")), (2, doc("Teak Side Table"))])
+    index.add_batch([(1, None)])
+
+    assert index.matches("teak").tolist() == [2]
+    assert index.search("lounger") == (0, [])
+
+
+def test_ranking_prefers_title_matches_and_respects_allowed():
+    index = SearchIndex()
+    index.add_batch([
+        (1, doc("Linen Sofa")),
+        (2, doc("Armchair", "Upholstered in linen.")),
+        (3, doc("Linen Ottoman")),
+    ])
+    total, ids = index.search("linen")
+    assert total == 3 and ids[-1] == 2
+
+    allowed = np.array([False, False, True, False])  # by doc id
+    assert index.search("linen", allowed=allowed) == (1, [2])
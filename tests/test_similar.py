@@ -0,0 +1,50 @@
+import numpy as np
+
+from furnicon.similar import VectorIndex
+
+
+def unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def clusters(n, dim=16, centres=20, seed=1):
+    # Unit vectors around `centres` random directions.
+    rng = np.random.default_rng(seed)
+    centre = unit(rng.normal(size=(centres, dim)))
+    return unit(centre[rng.integers(centres, size=n)] + 0.05 * rng.normal(size=(n, dim)))
+
+
+def test_brute_force_query_with_replace_and_exclude():
+    index = VectorIndex(dim=3, ivf_min=100)
+    index.add(1, unit([1, 0, 0]))
+    index.add(2, unit([1, 1, 0]))
+    index.add(3, unit([0, 0, 1]))
+    index.add(3, unit([1, 0.1, 0]))  # replaced: the old vector no longer matches
+
+    assert index.mode == "brute" and len(index) == 3
+    assert [i for _, i in index.query(unit([1, 0, 0]), 3)] == [1, 3, 2]
+    assert [i for _, i in index.query(unit([1, 0, 0]), 2, exclude=1)] == [3, 2]
+    assert index.query(unit([0, 0, 1]), 1)[0][0] < 0.5
+
+
+def test_ivf_finds_the_same_neighbours_as_brute_force():
+    vectors = clusters(2000)
+    brute = VectorIndex(dim=16, ivf_min=10**9)
+    ivf = VectorIndex(dim=16, ivf_min=10**9, nprobe=8)
+    for i, v in enumerate(vectors):
+        brute.add(i, v)
+        ivf.add(i, v)
+    ivf.train()
+    assert ivf.mode == "ivf"
+
+    later = clusters(50, seed=2)
+    for i, v in enumerate(later, start=len(vectors)):  # filed under the trained lists
+        brute.add(i, v)
+        ivf.add(i, v)
+    found = expected = 0
+    for query in list(vectors[:50]) + list(later[:10]):
+        best = {i for _, i in brute.query(query, 5)}
+        found += len(best & {i for _, i in ivf.query(query, 5)})
+        expected += len(best)
+    assert found / expected >= 0.95
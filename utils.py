@@ -1,28 +1,32 @@
 import streamlit as st
-import json
-import time
-import traceback
-import base64
-from PIL import Image
-from io import BytesIO
+
+from furnicon import config, dedupe, derivatives, dimensions, facets, pipeline, search, similar, tracing, usage
+from furnicon.assets import AssetStore
+from furnicon.cache import ResultCache
+from furnicon.catalog import CatalogStore
+from furnicon.jobs import JobQueue, JobWorkers
+from furnicon.usage import UsageLedger
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # --- CONFIGURATION ---
-try:
-    GOOGLE_API_KEY = st.secrets["GOOGLE_API_KEY"]
-except (FileNotFoundError, KeyError):
-    st.error("Missing .streamlit/secrets.toml")
-    st.stop()
+# FURNICON_MODEL_CLIENT=replay|fake runs fully offline, without a key.
+OFFLINE = config.MODEL_CLIENT in ("replay", "fake")
 
-try:
-    from google import genai
-    from google.genai import types
-except ImportError:
+GOOGLE_API_KEY = None
+if not OFFLINE:
+    try:
+        GOOGLE_API_KEY = st.secrets["GOOGLE_API_KEY"]
+    except (FileNotFoundError, KeyError):
+        st.error("Missing .streamlit/secrets.toml")
+        st.stop()
+
+if pipeline.genai is None:
     st.error("Library missing. Please run: pip install -r requirements.txt")
     st.stop()
 
 # Initialize Client
 try:
-    client = genai.Client(api_key=GOOGLE_API_KEY)
+    client = pipeline.make_client(GOOGLE_API_KEY)
 except Exception as e:
     st.error(f"Client Error: {e}")
     client = None
@@ -33,164 +37,280 @@ def log_error(context, error):
     st.session_state["global_error"] = error_msg
     # print(f"[{context}] {error}")
 
-# --- HELPER: OPTIMIZE IMAGE ---
-def optimize_image(image):
-    img_copy = image.copy()
-    img_copy.thumbnail((1024, 1024))
-    if img_copy.mode in ("RGBA", "P"):
-        img_copy = img_copy.convert("RGB")
-    img_byte_arr = BytesIO()
-    img_copy.save(img_byte_arr, format='JPEG', quality=85)
-    return img_byte_arr.getvalue()
-
 # --- 1. TEXT ANALYST (Gemini 2.5 Flash) ---
-def analyze_image_mock(image):
-    if not client: return {}
+# The prompts, caching and fan-out live in furnicon.pipeline, which has no
+# Streamlit dependency; these wrappers add the UI-side error reporting.
+ANALYSIS_FIELDS = pipeline.ANALYSIS_FIELDS
 
-    try:
-        image_bytes = optimize_image(image)
-        
-        prompt = """
-        Analyze this product image for an Amazon listing.
-        Return a pure JSON object with these EXACT keys:
-        {
-            "title": "SEO Product Title",
-            "description": "3-sentence technical description",
-            "brand_generic": "Suggested Brand Name",
-            "category": "General Category (e.g. Chair)",
-            "colour": "Main Color",
-            "frame_material": "Material",
-            "style": "Style",
-            "furniture_finish": "Finish",
-            "seat_height": "Height",
-            "seat_width": "Width",
-            "leg_style": "Leg Type",
-            "dimensions_str": "LxWxH cm"
-        }
-        """
-
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=[
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg"),
-                        types.Part.from_text(text=prompt)
-                    ]
-                )
-            ],
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json"
-            )
-        )
-        return json.loads(response.text)
+def run_analysis(image_id, on_fields=None):
+    # Raises on failure; safe to call from job worker threads.
+    return get_pipeline().analyze(image_id, on_fields)
 
+def analyze_image_mock(image_id):
+    try:
+        return run_analysis(image_id)
     except Exception as e:
         log_error("Gemini 2.5 Text Analysis", e)
         return {}
 
 # --- 2. IMAGE GENERATION (Gemini 2.5 Flash Image) ---
-def generate_product_variations(original_image, user_instructions=None):
-    if not client: return [original_image]
+DEFAULT_VARIATION_PROMPTS = pipeline.DEFAULT_VARIATION_PROMPTS
+match_default_prompt = pipeline.match_default_prompt
+resolve_prompts = pipeline.resolve_prompts
 
-    image_bytes = optimize_image(original_image)
-    generated_images = []
-    
-    # 1. Determine Prompts
-    if user_instructions and len(user_instructions) > 0:
-        prompts = user_instructions
-    else:
-        prompts = [
-            "View from the left side profile",
-            "View from the right side profile",
-            "Close up texture detail"
-        ]
+def run_variation_sets(image_id, prompts, regenerate=(), on_progress=None, should_cancel=None):
+    return get_pipeline().variation_sets(image_id, prompts, regenerate, on_progress, should_cancel)
 
+def generate_variation_sets(image_id, prompts, regenerate=()):
     st.toast(f"🎨 Generating {len(prompts)} Variations (Gemini 2.5 Image)...")
-    
-    # STRICTLY USING GEMINI 2.5 FLASH IMAGE
-    target_model = 'gemini-2.5-flash-image'
+    sets, errors = run_variation_sets(image_id, prompts, regenerate)
+    for user_prompt, error in errors:
+        log_error(f"Gen Angle '{user_prompt}'", error)
+    return sets
 
-    for i, user_prompt in enumerate(prompts):
-        
-        full_prompt = f"Generate a photorealistic product image of THIS exact object. {user_prompt}. White background. Maintain same colors and materials. High Fidelity."
-        
-        try:
-            # We attempt to send the image + text. 
-            # If 2.5-flash-image supports I2I on your tier, this works best.
-            # If it fails (400), we catch it and try text-only in the next block.
-            response = client.models.generate_content(
-                model=target_model,
-                contents=[
-                    types.Content(
-                        role="user",
-                        parts=[
-                            types.Part.from_text(text=full_prompt),
-                            types.Part.from_bytes(data=image_bytes, mime_type="image/jpeg")
-                        ]
-                    )
-                ],
-                config={ "response_modalities": ["IMAGE"] }
-            )
-            
-            # --- PARSING LOGIC FOR GEMINI 2.5 ---
-            # Gemini returns images in parts[].inline_data, NOT .generated_images
-            if hasattr(response, 'parts'):
-                for part in response.parts:
-                    if part.inline_data:
-                        img_data = part.inline_data.data
-                        # Decode if it comes as a base64 string
-                        if isinstance(img_data, str):
-                            img_data = base64.b64decode(img_data)
-                        
-                        img = Image.open(BytesIO(img_data))
-                        generated_images.append(img)
-
-        except Exception as e:
-            # If I2I fails, try Text-to-Image fallback with same model
-            # This handles cases where the model rejects the input image bytes
-            try:
-                response = client.models.generate_content(
-                    model=target_model,
-                    contents=[
-                        types.Content(
-                            role="user",
-                            parts=[
-                                types.Part.from_text(text=full_prompt)
-                            ]
-                        )
-                    ],
-                    config={ "response_modalities": ["IMAGE"] }
-                )
-                
-                if hasattr(response, 'parts'):
-                    for part in response.parts:
-                        if part.inline_data:
-                            img_data = part.inline_data.data
-                            if isinstance(img_data, str):
-                                img_data = base64.b64decode(img_data)
-                            img = Image.open(BytesIO(img_data))
-                            generated_images.append(img)
-            except Exception as e2:
-                log_error(f"Gen Angle '{user_prompt}'", e2)
-
-        time.sleep(2) # Pause for rate limits
+def variations_from_sets(image_id, sets):
+    generated_images = pipeline.flatten_variation_sets(sets)
 
     if not generated_images:
         st.warning("⚠️ Generation Failed. Returning original.")
-        return [original_image]
+        return [image_id]
         
     return generated_images
 
+def generate_product_variations(image_id, user_instructions=None):
+    if not client: return [image_id]
+
+    # 1. Determine Prompts
+    prompts = resolve_prompts(user_instructions)
+
+    return variations_from_sets(image_id, generate_variation_sets(image_id, prompts))
+
 # --- 3. DATABASE ---
+@st.cache_resource
+def get_assets():
+    return AssetStore(config.ASSET_DIR)
+
+@st.cache_resource
+def get_catalog():
+    # One SQLite-backed store per server process, shared by every session.
+    return CatalogStore(config.CATALOG_PATH, get_assets())
+
+@st.cache_resource
+def get_analysis_cache():
+    return ResultCache(
+        config.CACHE_PATH, "analysis",
+        ttl=config.ANALYSIS_CACHE_TTL, max_entries=config.ANALYSIS_CACHE_MAX_ENTRIES,
+    )
+
+@st.cache_resource
+def get_variation_cache():
+    return ResultCache(
+        config.CACHE_PATH, "variations",
+        ttl=config.VARIATION_CACHE_TTL, max_entries=config.VARIATION_CACHE_MAX_ENTRIES,
+    )
+
+@st.cache_resource
+def get_usage():
+    return UsageLedger(config.USAGE_PATH)
+
+@st.cache_resource
+def get_pipeline():
+    return pipeline.Pipeline(client, get_assets(), get_analysis_cache(), get_variation_cache(), get_usage())
+
 def init_db():
-    if "db_products" not in st.session_state:
-        st.session_state.db_products = []
+    get_catalog()
 
 def save_product_to_store(product_data):
-    product_data["id"] = len(st.session_state.db_products) + 1
-    st.session_state.db_products.append(product_data)
+    # Display-size derivatives are encoded once here, before shoppers see it.
+    with tracing.trace(product_data.get("trace_id")), tracing.span("publish"):
+        with tracing.span("publish.derivatives"):
+            derivatives.make_product_derivatives(get_assets(), product_data)
+        # The feature bytes go to the catalog only: product_data is the
+        # Admin Bot's session draft, which is saved as JSON.
+        row = dict(product_data)
+        if product_data.get("image_id"):
+            with tracing.span("publish.features"):
+                row["visual_features"] = similar.product_features(get_assets(), product_data["image_id"])
+        with tracing.span("publish.catalog"):
+            product_data["id"] = get_catalog().add(row)
 
 def get_all_products():
-    return st.session_state.get("db_products", [])
\ No newline at end of file
+    return get_catalog().all()
+
+def get_products_page(page, page_size=config.STOREFRONT_PAGE_SIZE):
+    # Pages are 1-based, as shown in the Storefront.
+    with tracing.span("catalog.page"):
+        return get_catalog().page((page - 1) * page_size, page_size)
+
+def count_products():
+    return get_catalog().count()
+
+# Full-text search over titles, descriptions, brands and specs (furnicon.search).
+@st.cache_resource
+def get_search_index():
+    return search.CatalogSearch(get_catalog())
+
+def search_products(text, page=1, page_size=config.STOREFRONT_PAGE_SIZE):
+    # (number of matches, products on this 1-based page), best match first.
+    with tracing.span("catalog.search"):
+        total, ids = get_search_index().search(text, (page - 1) * page_size, page_size)
+        return total, get_catalog().get_many(ids)
+
+# Storefront sidebar filters: bitmaps per attribute value (furnicon.facets).
+@st.cache_resource
+def get_facet_index():
+    return facets.CatalogFacets(get_catalog())
+
+# Price and size range filters and sorts: sorted arrays per column (furnicon.dimensions).
+@st.cache_resource
+def get_range_index():
+    return dimensions.CatalogRanges(get_catalog())
+
+def range_bounds():
+    return get_range_index().bounds()
+
+def browse_products(text, filters, ranges=None, sort=None, page=1, page_size=config.STOREFRONT_PAGE_SIZE):
+    # (number of matches, products on this 1-based page, {facet: {value: count}})
+    # for the search box text, {facet: [values]} filters, {column: (low, high)}
+    # ranges and an optional (column, descending) sort. Otherwise search
+    # results keep their ranking and the rest are in catalog order.
+    with tracing.span("catalog.browse"):
+        offset = (page - 1) * page_size
+        range_index = get_range_index()
+        base = in_range = range_index.within(ranges or {})
+        if text.strip():
+            search_index = get_search_index()
+            base = search_index.matches(text, None if in_range is None else facets.id_mask(in_range))
+        ids, counts = get_facet_index().filter(filters, base)
+        if sort:
+            page_ids = range_index.order(sort[0], ids, sort[1])[offset:offset + page_size].tolist()
+        elif text.strip():
+            allowed = facets.id_mask(ids) if in_range is not None or any(filters.values()) else None
+            _, page_ids = search_index.search(text, offset, page_size, allowed)
+        else:
+            page_ids = ids[offset:offset + page_size].tolist()
+        return len(ids), get_catalog().get_many(page_ids), counts
+
+facet_label = facets.value_label
+
+def unparsed_sizes():
+    # [(product id, title, [text fields])] to fix in the admin.
+    return get_catalog().unparsed_sizes()
+
+unparsed_size_fields = dimensions.unparsed
+
+def get_recent_products(n=5):
+    return get_catalog().recent(n)
+
+def get_product(product_id):
+    return get_catalog().get(product_id)
+
+def save_asset(data):
+    with tracing.span("upload.save", bytes=len(data)):
+        return get_assets().put(data)
+
+def asset_path(asset_id):
+    # st.image() accepts a path and streams the file bytes as-is.
+    return get_assets().path(asset_id)
+
+def image_path(asset_id, display_width):
+    # Pre-encoded derivative sized for display_width CSS px; pages use this
+    # instead of asset_path so full-size originals are never shipped.
+    return derivatives.derivative_path(get_assets(), asset_id, display_width)
+
+# Near-duplicate uploads: perceptual hashes of published source photos.
+@st.cache_resource
+def get_duplicate_index():
+    return dedupe.DuplicateIndex(get_catalog())
+
+def source_hash(image_id):
+    with tracing.span("upload.phash"):
+        return dedupe.source_hash(get_assets(), image_id)
+
+def find_duplicates(phash):
+    # [(distance, product id)] of published look-alikes, nearest first.
+    with tracing.span("upload.dedupe"):
+        return get_duplicate_index().find(phash)
+
+duplicate_similarity = dedupe.similarity
+
+# "More like this": visual feature vectors of published products.
+@st.cache_resource
+def get_similar_index():
+    return similar.SimilarIndex(get_catalog())
+
+def similar_products(product_id, k=config.SIMILAR_COUNT):
+    with tracing.span("similar.query"):
+        ids = [pid for _, pid in get_similar_index().similar(product_id, k)]
+    return get_catalog().get_many(ids)
+
+# --- 4. BACKGROUND JOBS ---
+# Analysis and generation run on worker threads owned by the server process,
+# so a rerun, refresh or second click never blocks on (or loses) model work.
+@st.cache_resource
+def get_jobs():
+    return JobQueue(config.JOBS_PATH, max_attempts=config.JOB_MAX_ATTEMPTS)
+
+@st.cache_resource
+def get_job_workers():
+    return JobWorkers(get_jobs(), get_pipeline().job_handlers(), workers=config.JOB_WORKERS)
+
+def submit_job(kind, params, owner=""):
+    # Model calls made by the job are billed to this browser session.
+    get_job_workers()
+    return get_jobs().submit(kind, {"session": session_id(), **params}, owner)
+
+def get_job(job_id):
+    get_job_workers()
+    return get_jobs().get(job_id)
+
+def cancel_job(job_id):
+    get_jobs().cancel(job_id)
+
+def get_active_jobs(owner=None):
+    return get_jobs().active(owner)
+
+def save_draft(token, state):
+    get_jobs().save_draft(token, state)
+
+def load_draft(token):
+    return get_jobs().load_draft(token)
+
+# --- 5. MODEL USAGE ---
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
+
+def budget_status():
+    # Why model calls from this session are paused, or None.
+    return get_usage().over_budget(session_id())
+
+def session_spend():
+    return get_usage().spent(session_id())
+
+def spend_today():
+    return get_usage().spent(since=usage.day_start())
+
+def usage_totals(since=None):
+    return get_usage().totals(since)
+
+def cost_per_product():
+    # Average model spend of published products that carry a trace id.
+    costs = get_usage().product_costs()
+    spent = [costs[t] for t in get_catalog().trace_ids() if t in costs]
+    return sum(spent) / len(spent) if spent else None
+
+# --- 6. TRACING ---
+# Spans from every session and job worker land in one in-process tracer
+# (furnicon.tracing); pages/Performance.py shows and exports it.
+tracer = tracing.TRACER
+new_trace_id = tracing.new_trace_id
+
+def i2i_refusals():
+    # {model: {error class: {"since", "checked", "probing"}}}; see pipeline.I2I_REFUSALS.
+    return pipeline.I2I_REFUSALS.entries()
+
+def page_span(page, trace_id=None, **attrs):
+    # Wall time of one script run; call .finish() at the end of the page.
+    # Runs cut short by st.rerun()/st.stop() are simply not recorded.
+    return tracing.Span(f"render.{page}", trace_id=trace_id, **attrs)